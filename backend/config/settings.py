@@ -1,6 +1,7 @@
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from pathlib import Path
+from typing import Optional
 
 class DatabaseSettings(BaseSettings):
     """Database configuration settings."""
@@ -37,8 +38,22 @@ class DatabaseSettings(BaseSettings):
 class ETLSettings(BaseSettings):
     """ETL pipeline configuration settings."""
     
-    data_directory: str = str(Path(__file__).parent.parent.parent / "data")
+    data_directory: str = str(Path(__file__).parent.parent.parent / "data")  # Folder of export JSON files, or the export ZIP itself
     batch_size: int = 1000
+    streaming: bool = False  # Read and write in bounded batches instead of loading all files into memory
+    sort_run_size: int = 100000  # Max records sorted in memory per run before spilling to disk
+    spill_directory: Optional[str] = None  # Directory for spilled sort runs (system temp dir if unset)
+    batch_validation: bool = True  # Validate whole batches with a TypeAdapter instead of record by record
+    quarantine_file: Optional[str] = None  # JSON lines file receiving records that fail validation
+    parse_workers: int = 1  # Worker processes for parsing and validating files (1 = serial)
+    force_reload: bool = False  # Re-read files already recorded in the ingest manifest
+    write_method: str = "copy"  # "copy" for COPY FROM STDIN bulk loads, "orm" for ORM inserts, "staging" for a SQL-side merge
+    pipeline_queue_size: int = 4  # Batches buffered between ingest pipeline stages
+    bulk_load: str = "auto"  # Drop secondary stream indexes during a load: "auto" (empty table only), "on" or "off"
+    index_rebuild_workers: int = 1  # Connections rebuilding indexes in parallel after a bulk load
+    index_rebuild_concurrently: bool = False  # Rebuild indexes with CREATE INDEX CONCURRENTLY
+    profile_file: Optional[str] = None  # JSON file receiving the load stats with their per-stage profile
+    profile_memory: bool = False  # Trace peak Python memory per loader stage with tracemalloc (slows the load)
     log_level: str = "INFO"
     max_retries: int = 3
     retry_delay: int = 5
@@ -50,6 +65,22 @@ class ETLSettings(BaseSettings):
         if v.upper() not in valid_levels:
             raise ValueError(f"Invalid log level: {v}. Must be one of {valid_levels}")
         return v.upper()
+    
+    @field_validator('write_method')
+    def validate_write_method(cls, v):
+        """Validate stream write method."""
+        valid_methods = ["copy", "orm", "staging"]
+        if v.lower() not in valid_methods:
+            raise ValueError(f"Invalid write method: {v}. Must be one of {valid_methods}")
+        return v.lower()
+    
+    @field_validator('bulk_load')
+    def validate_bulk_load(cls, v):
+        """Validate bulk load mode."""
+        valid_modes = ["auto", "on", "off"]
+        if v.lower() not in valid_modes:
+            raise ValueError(f"Invalid bulk load mode: {v}. Must be one of {valid_modes}")
+        return v.lower()
 
     model_config = {
         "env_file": "../.env",
@@ -58,6 +89,20 @@ class ETLSettings(BaseSettings):
     }
 
 
+class ResultCacheSettings(BaseSettings):
+    """Server-side cache of analytics results."""
+    
+    enabled: bool = True
+    max_entries: int = 512  # Results kept before the least recently used ones are evicted
+    max_age: float = 3600.0  # Seconds a result is served for, even if no load changed the data
+    
+    model_config = {
+        "env_file": "../.env",
+        "env_prefix": "RESULT_CACHE_",
+        "extra": "ignore"
+    }
+
+
 class SpotifySettings(BaseSettings):
     """Spotify API configuration settings."""
     
@@ -78,6 +123,7 @@ class Settings(BaseSettings):
     database: DatabaseSettings = DatabaseSettings()
     etl: ETLSettings = ETLSettings()
     spotify: SpotifySettings = SpotifySettings()
+    result_cache: ResultCacheSettings = ResultCacheSettings()
     environment: str = "development"
     debug: bool = False
     
@@ -1,7 +1,11 @@
+from typing import Any, Callable, TypeVar
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from config.settings import get_settings
 
+T = TypeVar("T")
+
 settings = get_settings()
 engine = create_engine(settings.database.connection_string)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -12,4 +16,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the threadpool from an async route.
+    
+    Routes that only query the database are plain `def` functions, which
+    FastAPI already runs on the threadpool. Routes that also await the
+    Spotify API stay `async def` and must wrap every query execution and
+    commit, e.g. `rows = await run_db(query.all)`, so a slow query does not
+    block the event loop. A session must not be used by two calls at once.
+    """
+    return await run_in_threadpool(fn, *args, **kwargs)
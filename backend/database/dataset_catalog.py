@@ -0,0 +1,49 @@
+from sqlalchemy import Integer, cast, delete, extract, func, insert, select
+from sqlalchemy.engine import Connection
+
+from database.period_filters import ts_range, year_bounds
+from database.schema import StreamFact, DatasetCatalog, DatasetVersion
+
+# Calendar year of a stream in UTC, the year the catalog files it under
+FACT_YEAR = cast(extract('year', func.timezone('UTC', StreamFact.ts)), Integer)
+
+
+def refresh_dataset_catalog(connection: Connection, first_year: int, last_year: int) -> int:
+    """Recompute the catalog rows of the years from first_year to last_year, inclusive.
+
+    The rows are aggregated from stream_facts, so refresh the facts first.
+    Returns the number of rows written.
+    """
+    start, end = year_bounds(first_year)[0], year_bounds(last_year)[1]
+    connection.execute(delete(DatasetCatalog).where(DatasetCatalog.year.between(first_year, last_year)))
+
+    in_range = ts_range(start, end, column=StreamFact.ts)
+    totals = select(
+        FACT_YEAR.label("year"),
+        StreamFact.content_type,
+        func.count().label("stream_count"),
+        func.sum(StreamFact.ms_played).label("total_ms"),
+        func.min(StreamFact.ts).label("first_ts"),
+        func.max(StreamFact.ts).label("last_ts")
+    ).where(in_range).group_by(FACT_YEAR, StreamFact.content_type).subquery()
+    # Few streams share first_ts, so the BRIN index on ts finds them without another scan
+    first_stream_id = select(func.min(StreamFact.id)).where(
+        StreamFact.ts == totals.c.first_ts, StreamFact.content_type == totals.c.content_type
+    ).scalar_subquery()
+
+    rows = select(
+        totals.c.year, totals.c.content_type, totals.c.stream_count, totals.c.total_ms,
+        totals.c.first_ts, totals.c.last_ts, first_stream_id
+    )
+    columns = ["year", "content_type", "stream_count", "total_ms", "first_ts", "last_ts", "first_stream_id"]
+    return connection.execute(insert(DatasetCatalog).from_select(columns, rows)).rowcount
+
+
+def add_dataset_version(connection: Connection) -> int:
+    """Record that the streams changed and return the new dataset version."""
+    return connection.execute(insert(DatasetVersion).returning(DatasetVersion.version)).scalar_one()
+
+
+def current_dataset_version(db) -> int:
+    """Latest dataset version, or 0 before anything was loaded."""
+    return db.execute(select(func.coalesce(func.max(DatasetVersion.version), 0))).scalar_one()
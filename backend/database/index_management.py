@@ -0,0 +1,66 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from sqlalchemy import Index, Table, text
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
+
+
+def secondary_indexes(table: Table) -> List[Index]:
+    """Return the non-unique indexes declared for a table in schema.py.
+
+    Unique indexes are left alone because loads rely on them to skip
+    duplicate rows.
+    """
+    return sorted((index for index in table.indexes if not index.unique), key=lambda index: index.name)
+
+
+def drop_indexes(engine, indexes: List[Index]) -> None:
+    """Drop indexes if they exist, in one transaction."""
+    with engine.begin() as connection:
+        for index in indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    logger.info(f"Dropped {len(indexes)} indexes for bulk load: {', '.join(index.name for index in indexes)}")
+
+
+def _create_index(engine, index: Index, concurrently: bool) -> None:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+    if concurrently:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        ddl = ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text(ddl))
+    else:
+        with engine.begin() as connection:
+            connection.execute(text(ddl))
+
+
+def rebuild_indexes(engine, indexes: List[Index], workers: int = 1, concurrently: bool = False) -> None:
+    """Recreate indexes from their schema.py definitions.
+
+    With several workers each index is built on its own connection, so
+    Postgres builds them at the same time. Building concurrently keeps the
+    table writable while the indexes are created, at the cost of extra
+    table scans.
+    """
+    if workers <= 1:
+        for index in indexes:
+            _create_index(engine, index, concurrently)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # list() re-raises the first failed build
+            list(pool.map(lambda index: _create_index(engine, index, concurrently), indexes))
+    logger.info(f"Rebuilt {len(indexes)} indexes")
+
+
+def analyze_tables(engine, table_names: List[str], vacuum: bool = False) -> None:
+    """Refresh planner statistics after a bulk load.
+
+    With vacuum, the tables are also vacuumed so their visibility map is set
+    and covering indexes can answer queries with index-only scans.
+    """
+    command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        for table_name in table_names:
+            connection.execute(text(f"{command} {table_name}"))
@@ -0,0 +1,185 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from database.schema import (
+    SpotifyStream, StreamFact, Track, Episode, AudiobookChapter, DailyContentStats, HourlyContentStats, DatasetCatalog
+)
+from database.index_management import secondary_indexes
+from database.partitioning import (
+    is_partitioned, years_between, create_year_partitions, partition_name, partition_bounds
+)
+from database.rollups import rebuild_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+NATURAL_KEY_EXPRESSION = "COALESCE(spotify_track_uri, spotify_episode_uri, audiobook_chapter_uri, '')"
+
+
+def index_exists(connection: Connection, index_name: str) -> bool:
+    """Check whether an index exists in the current schema."""
+    result = connection.execute(
+        text("SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = :name"),
+        {"name": index_name}
+    )
+    return result.first() is not None
+
+
+def column_exists(connection: Connection, table_name: str, column_name: str) -> bool:
+    """Check whether a table in the current schema has a column."""
+    result = connection.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table_name, "column": column_name}
+    )
+    return result.first() is not None
+
+
+def ensure_stream_natural_key(connection: Connection) -> None:
+    """Add the stream natural key to installs created before it existed.
+
+    Duplicate streams loaded from overlapping exports are removed first,
+    keeping the earliest inserted row of each duplicate group.
+    """
+    if index_exists(connection, 'uq_spotify_streams_natural_key'):
+        return
+
+    logger.info("Removing duplicate streams before adding natural key index...")
+    result = connection.execute(text(f"""
+        DELETE FROM spotify_streams
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY ts, {NATURAL_KEY_EXPRESSION}, ms_played, platform
+                    ORDER BY id
+                ) AS row_num
+                FROM spotify_streams
+            ) ranked
+            WHERE row_num > 1
+        )
+    """))
+    logger.info(f"Removed {result.rowcount} duplicate streams")
+
+    connection.execute(text(f"""
+        CREATE UNIQUE INDEX uq_spotify_streams_natural_key
+        ON spotify_streams (ts, ({NATURAL_KEY_EXPRESSION}), ms_played, platform)
+    """))
+
+
+def ensure_ts_brin_index(connection: Connection) -> None:
+    """Replace the btree index on ts of installs created before the BRIN index.
+
+    Ordered ts lookups are served by the (ts, platform) index, so the btree
+    on ts alone is only dead weight on every insert.
+    """
+    if not index_exists(connection, 'idx_spotify_streams_ts_brin'):
+        logger.info("Adding BRIN index on spotify_streams.ts...")
+        connection.execute(text("CREATE INDEX idx_spotify_streams_ts_brin ON spotify_streams USING brin (ts)"))
+    if index_exists(connection, 'idx_spotify_streams_ts'):
+        logger.info("Dropping btree index idx_spotify_streams_ts, replaced by the BRIN index")
+        connection.execute(text("DROP INDEX idx_spotify_streams_ts"))
+
+
+def ensure_dimension_ids(connection: Connection) -> None:
+    """Add the integer surrogate keys of tracks, episodes and audiobook chapters to existing installs."""
+    for model in (Track, Episode, AudiobookChapter):
+        if column_exists(connection, model.__tablename__, 'id'):
+            continue
+        logger.info(f"Adding integer ids to {model.__tablename__}...")
+        # Postgres numbers the existing rows when the identity column is added
+        connection.execute(text(
+            f"ALTER TABLE {model.__tablename__} ADD COLUMN id INTEGER GENERATED BY DEFAULT AS IDENTITY NOT NULL UNIQUE"
+        ))
+
+
+def ensure_daily_rollups(connection: Connection) -> None:
+    """Fill the rollups of installs whose streams were loaded before (some of) the rollups existed."""
+    # Every stream has a fact and counts towards the content rollups and the catalog, so they are only empty without streams
+    filled = [
+        connection.execute(text(f"SELECT 1 FROM {model.__tablename__} LIMIT 1")).first() is not None
+        for model in (StreamFact, DailyContentStats, HourlyContentStats, DatasetCatalog)
+    ]
+    if all(filled):
+        return
+    if not connection.execute(text("SELECT 1 FROM spotify_streams LIMIT 1")).first():
+        return
+
+    logger.info("Building daily rollups from existing streams...")
+    written = rebuild_daily_rollups(connection)
+    logger.info(f"Built daily rollups: {written}")
+
+
+def partition_streams_by_year(connection: Connection) -> int:
+    """Convert a spotify_streams table created before partitioning into yearly partitions.
+
+    The old table is moved into a schema of its own, taking its indexes,
+    constraints and id sequence along, so their names are free for the
+    partitioned table created from schema.py. Its rows are then copied
+    partition by partition in timestamp order, keeping their ids, and the
+    old table is dropped with its schema.
+
+    This rewrites the whole table, so it is not part of MIGRATIONS and runs
+    from scripts/partition_streams.py instead. Run it inside a single
+    transaction, so a failed conversion leaves the old table as it was; the
+    table is locked against reads and writes until the transaction commits,
+    and needs room for a second copy of the streams meanwhile. Returns the
+    number of rows copied, or 0 if the table is already partitioned.
+    """
+    table = SpotifyStream.__table__
+    if is_partitioned(connection, table.name):
+        logger.info(f"{table.name} is already partitioned")
+        return 0
+
+    old_schema = f"{table.name}_unpartitioned"
+    old_table = f"{old_schema}.{table.name}"
+    connection.execute(text(f"CREATE SCHEMA {old_schema}"))
+    connection.execute(text(f"ALTER TABLE {table.name} SET SCHEMA {old_schema}"))
+
+    table.create(connection)
+    # Copy without the secondary indexes and build them once at the end
+    indexes = secondary_indexes(table)
+    for index in indexes:
+        connection.execute(text(f"DROP INDEX {index.name}"))
+
+    first_ts, last_ts = connection.execute(text(f"SELECT min(ts), max(ts) FROM {old_table}")).one()
+    years = years_between(first_ts, last_ts) if first_ts is not None else range(0)
+    create_year_partitions(connection, table.name, years)
+
+    column_list = ", ".join(column.name for column in table.columns)
+    copied = 0
+    for year in years:
+        # One year at a time, so progress shows in the log; ts and id order keeps each partition compact
+        start, end = partition_bounds(year)
+        year_rows = connection.execute(text(
+            f"INSERT INTO {partition_name(table.name, year)} ({column_list}) "
+            f"SELECT {column_list} FROM {old_table} WHERE ts >= :start AND ts < :end ORDER BY ts, id"
+        ), {"start": start, "end": end}).rowcount
+        copied += year_rows
+        logger.info(f"Copied {year_rows} streams of {year} into {partition_name(table.name, year)}")
+    connection.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+        f"COALESCE((SELECT max(id) FROM {table.name}), 0) + 1, false)"
+    ))
+
+    for index in indexes:
+        index.create(connection)
+    connection.execute(text(f"DROP SCHEMA {old_schema} CASCADE"))
+    logger.info(f"Copied {copied} streams into partitioned table {table.name}")
+    return copied
+
+
+MIGRATIONS = [
+    ensure_stream_natural_key,
+    ensure_ts_brin_index,
+    ensure_dimension_ids,
+    ensure_daily_rollups,
+]
+
+
+def run_migrations(engine) -> None:
+    """Apply idempotent schema upgrades for existing installs."""
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            migration(connection)
@@ -0,0 +1,62 @@
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Iterable, List, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+
+def partition_name(table: str, year: int) -> str:
+    """Name of the partition holding one calendar year (UTC) of a table."""
+    return f"{table}_y{year}"
+
+
+def years_between(first: datetime, last: datetime) -> range:
+    """Calendar years (UTC) spanned by two timestamps, inclusive."""
+    return range(first.astimezone(timezone.utc).year, last.astimezone(timezone.utc).year + 1)
+
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    """Check whether a table in the current schema is a partitioned table."""
+    result = connection.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table}
+    )
+    return result.first() is not None
+
+
+def partition_years(connection: Connection, table: str) -> Set[int]:
+    """Return the years that already have a partition of the table."""
+    result = connection.execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(:table)"),
+        {"table": table}
+    )
+    pattern = re.compile(rf"{re.escape(table)}_y(\d{{4}})$")
+    return {int(match.group(1)) for (name,) in result if (match := pattern.search(name))}
+
+
+def partition_bounds(year: int) -> Tuple[str, str]:
+    """Bounds of the partition of one year, as timestamp literals."""
+    return f"{year}-01-01 00:00:00+00", f"{year + 1}-01-01 00:00:00+00"
+
+
+def create_year_partitions(connection: Connection, table: str, years: Iterable[int]) -> List[str]:
+    """Create a partition per calendar year (UTC) unless it already exists.
+
+    Partitions inherit the indexes of the partitioned table, so each new year
+    gets its own, small copy of every stream index. Returns the partition names.
+    """
+    names = []
+    for year in sorted(years):
+        name = partition_name(table, year)
+        start, end = partition_bounds(year)
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        ))
+        names.append(name)
+    if names:
+        logger.info(f"Created partitions of {table}: {', '.join(names)}")
+    return names
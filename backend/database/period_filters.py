@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import and_, func
+from sqlalchemy.sql.elements import ColumnElement
+
+from database.schema import SpotifyStream
+
+# Relative periods accepted by the top-N endpoints, besides "all_time" and a 4-digit year
+PERIOD_DELTAS = {
+    "7d": timedelta(days=7),
+    "1m": timedelta(days=30),
+    "3m": timedelta(days=90),
+    "6m": timedelta(days=180),
+    "1y": timedelta(days=365)
+}
+
+# A range bound is either a literal timestamp or a SQL expression evaluated once per query
+Bound = Union[datetime, ColumnElement]
+
+
+def get_cutoff_date(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """Return the start of a relative period such as "7d", or None for any other period."""
+    if period not in PERIOD_DELTAS:
+        return None
+    return (now or datetime.now(dt_timezone.utc)) - PERIOD_DELTAS[period]
+
+
+def _start_of_year(year: int, timezone: str) -> Bound:
+    if timezone == "UTC":
+        return datetime(year, 1, 1, tzinfo=dt_timezone.utc)
+    # Postgres resolves the local midnight once per query, so the bound stays index friendly
+    return func.make_timestamptz(year, 1, 1, 0, 0, 0, timezone)
+
+
+def year_bounds(year: int, timezone: str = "UTC") -> Tuple[Bound, Bound]:
+    """Half-open [start, end) bounds of a calendar year in the given timezone."""
+    return _start_of_year(year, timezone), _start_of_year(year + 1, timezone)
+
+
+def period_bounds(period: str, now: Optional[datetime] = None) -> Tuple[Optional[Bound], Optional[Bound]]:
+    """Half-open [start, end) bounds of a period: "all_time", a 4-digit year or a relative period.
+
+    A None bound is open. Years are calendar years in UTC.
+    """
+    if period.isdigit() and len(period) == 4:
+        return year_bounds(int(period))
+    return get_cutoff_date(period, now), None
+
+
+def ts_range(start: Optional[Bound], end: Optional[Bound], column=SpotifyStream.ts) -> Optional[ColumnElement]:
+    """Build `column >= start AND column < end`, leaving out open bounds.
+
+    Comparing the bare column, rather than e.g. extract('year', ts), lets
+    Postgres use the ts indexes and prune ts partitions.
+    """
+    predicates = []
+    if start is not None:
+        predicates.append(column >= start)
+    if end is not None:
+        predicates.append(column < end)
+    if not predicates:
+        return None
+    return and_(*predicates)
+
+
+def filter_year(query, year: Optional[int], timezone: str = "UTC", column=SpotifyStream.ts):
+    """Restrict a query to a calendar year in the given timezone, if a year is given."""
+    if not year:
+        return query
+    return query.filter(ts_range(*year_bounds(year, timezone), column=column))
+
+
+def filter_period(query, period: str, column=SpotifyStream.ts):
+    """Restrict a query to a period: "all_time", a 4-digit year or a relative period."""
+    predicate = ts_range(*period_bounds(period), column=column)
+    if predicate is None:
+        return query
+    return query.filter(predicate)
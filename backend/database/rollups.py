@@ -0,0 +1,294 @@
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, Date, cast, delete, extract, func, insert, select, union_all
+from sqlalchemy.engine import Connection
+
+from database.period_filters import filter_year, period_bounds, ts_range
+from database.schema import (
+    SpotifyStream, StreamFact, ContentType, DailyContentStats, DailyCountryStats, DailyArtistStats,
+    DailyTrackStats, DailyEpisodeStats, DailyAudiobookStats, HourlyContentStats, DatasetCatalog
+)
+from database.dataset_catalog import refresh_dataset_catalog, add_dataset_version
+from database.stream_facts import refresh_stream_facts
+
+logger = logging.getLogger(__name__)
+
+
+def stream_day(source=SpotifyStream):
+    """Rollup day of a stream: its calendar day in UTC."""
+    return cast(func.timezone('UTC', source.ts), Date)
+
+
+def stream_hour(source=SpotifyStream):
+    """Start of the UTC hour of a stream, independent of the session timezone."""
+    return func.date_trunc('hour', source.ts, 'UTC')
+
+
+# [first, end) day range; None is open
+DayRange = Tuple[Optional[date], Optional[date]]
+
+
+@dataclass(frozen=True)
+class Rollup:
+    """A rollup table and how its rows are aggregated from spotify_streams or stream_facts.
+
+    Rows are bucketed by UTC day in a "day" column, or by UTC hour in an
+    "hour" column for hourly rollups.
+    """
+
+    model: Any
+    keys: Tuple[Tuple[str, Any], ...]  # Rollup column and the source expression it groups by
+    filters: Tuple[Any, ...] = ()
+    hourly: bool = False
+    source: Any = SpotifyStream
+
+    def key_expression(self, name: str):
+        return dict(self.keys)[name]
+
+    @property
+    def bucket(self) -> Tuple[str, Any]:
+        """Bucket column and the stream expression it is computed from."""
+        return ("hour", stream_hour(self.source)) if self.hourly else ("day", stream_day(self.source))
+
+
+# Content rollups take the ContentType the facts were classified with
+CONTENT_ROLLUP = Rollup(DailyContentStats, (("content_type", StreamFact.content_type),), source=StreamFact)
+HOURLY_CONTENT_ROLLUP = Rollup(HourlyContentStats, (("content_type", StreamFact.content_type),), hourly=True, source=StreamFact)
+COUNTRY_ROLLUP = Rollup(DailyCountryStats, (("country", func.upper(SpotifyStream.conn_country)),))
+# Entity rollups are keyed by the integer keys of stream_facts; names are joined in after aggregating
+ARTIST_ROLLUP = Rollup(
+    DailyArtistStats,
+    (("artist_id", StreamFact.artist_id),),
+    (StreamFact.content_type == ContentType.MUSIC, StreamFact.artist_id.isnot(None)),
+    source=StreamFact
+)
+TRACK_ROLLUP = Rollup(
+    DailyTrackStats,
+    (("track_id", StreamFact.track_id),),
+    (StreamFact.content_type == ContentType.MUSIC,),
+    source=StreamFact
+)
+EPISODE_ROLLUP = Rollup(
+    DailyEpisodeStats,
+    (("episode_id", StreamFact.episode_id), ("show_id", StreamFact.show_id)),
+    (StreamFact.content_type == ContentType.EPISODE,),
+    source=StreamFact
+)
+AUDIOBOOK_ROLLUP = Rollup(
+    DailyAudiobookStats,
+    (("chapter_id", StreamFact.chapter_id),),
+    (StreamFact.content_type == ContentType.AUDIOBOOK,),
+    source=StreamFact
+)
+
+ROLLUPS = [CONTENT_ROLLUP, HOURLY_CONTENT_ROLLUP, COUNTRY_ROLLUP, ARTIST_ROLLUP, TRACK_ROLLUP, EPISODE_ROLLUP, AUDIOBOOK_ROLLUP]
+
+
+def day_start(day: date) -> datetime:
+    """Midnight UTC at the start of a day."""
+    return datetime.combine(day, time(), tzinfo=timezone.utc)
+
+
+def utc_day(ts: datetime) -> date:
+    return ts.astimezone(timezone.utc).date()
+
+
+def rollup_aggregate(rollup: Rollup, start: datetime, end: datetime):
+    """Select the rollup rows of the streams from start to end: bucket, keys, stream count and total_ms."""
+    bucket_expression = rollup.bucket[1]
+    key_expressions = [expression for _, expression in rollup.keys]
+    return select(
+        bucket_expression,
+        *key_expressions,
+        func.count(),
+        func.sum(rollup.source.ms_played)
+    ).where(ts_range(start, end, column=rollup.source.ts), *rollup.filters).group_by(bucket_expression, *key_expressions)
+
+
+def refresh_daily_rollups(connection: Connection, first_day: date, last_day: date) -> Dict[str, int]:
+    """Recompute the stream facts, rollups and dataset catalog for the days from first_day to last_day, inclusive.
+
+    The days are replaced as a whole from spotify_streams, so refreshing a day
+    twice or after re-loading duplicates is harmless. Run this in the same
+    transaction for all rollups. Adds a dataset version and returns the number
+    of rows written per table.
+    """
+    start, end = day_start(first_day), day_start(last_day + timedelta(days=1))
+    written = {StreamFact.__tablename__: refresh_stream_facts(connection, start, end)}
+    for rollup in ROLLUPS:
+        table = rollup.model.__table__
+        bucket_name = rollup.bucket[0]
+        if rollup.hourly:
+            connection.execute(delete(table).where(ts_range(start, end, column=table.c.hour)))
+        else:
+            connection.execute(delete(table).where(table.c.day >= first_day, table.c.day <= last_day))
+
+        columns = [bucket_name, *(name for name, _ in rollup.keys), "stream_count", "total_ms"]
+        written[table.name] = connection.execute(
+            insert(table).from_select(columns, rollup_aggregate(rollup, start, end))
+        ).rowcount
+    written[DatasetCatalog.__tablename__] = refresh_dataset_catalog(connection, first_day.year, last_day.year)
+    add_dataset_version(connection)
+    return written
+
+
+def rebuild_daily_rollups(connection: Connection) -> Dict[str, int]:
+    """Recompute the stream facts, rollups and dataset catalog from the whole spotify_streams table."""
+    first_ts, last_ts = connection.execute(
+        select(func.min(SpotifyStream.ts), func.max(SpotifyStream.ts))
+    ).one()
+    if first_ts is None:
+        connection.execute(delete(StreamFact))
+        for rollup in ROLLUPS:
+            connection.execute(delete(rollup.model.__table__))
+        connection.execute(delete(DatasetCatalog))
+        add_dataset_version(connection)
+        return {}
+    return refresh_daily_rollups(connection, utc_day(first_ts), utc_day(last_ts))
+
+
+def merge_day_ranges(ranges: Iterable[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """Merge inclusive (first, last) day ranges that overlap or touch."""
+    merged: List[Tuple[date, date]] = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def year_days(year: Optional[int]) -> DayRange:
+    """Day range of a calendar year, or an open range if no year is given."""
+    if not year:
+        return None, None
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def split_days(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[DayRange], List[Tuple[datetime, datetime]]]:
+    """Split a [start, end) time range into whole days and the partial days around them.
+
+    Whole days can be read from the rollups; the partial days, e.g. the start
+    of a relative period like "7d", have to be aggregated from spotify_streams.
+    Returns the day range (None if no whole day is covered) and the partial
+    time ranges.
+    """
+    first_day = None
+    if start is not None:
+        first_day = utc_day(start)
+        if day_start(first_day) != start:
+            first_day += timedelta(days=1)
+    end_day = utc_day(end) if end is not None else None
+
+    if first_day is not None and end_day is not None and first_day >= end_day:
+        return None, [(start, end)]
+
+    partial = []
+    if start is not None and day_start(first_day) != start:
+        partial.append((start, day_start(first_day)))
+    if end is not None and day_start(end_day) != end:
+        partial.append((day_start(end_day), end))
+    return (first_day, end_day), partial
+
+
+def filter_days(query, days: DayRange, column):
+    """Restrict a rollup query to a [first, end) day range."""
+    first_day, end_day = days
+    if first_day is not None:
+        query = query.filter(column >= first_day)
+    if end_day is not None:
+        query = query.filter(column < end_day)
+    return query
+
+
+def period_totals(db, rollup: Rollup, keys: Sequence[str], period: str, required: Sequence[str] = ()):
+    """Query total_ms and play_count per combination of rollup keys over a period.
+
+    Whole UTC days come from the rollup and partial days from the rollup's
+    source table, so totals match aggregating the raw streams. Keys listed in
+    required must not be NULL. Returns an unordered query; callers add
+    ordering and limits.
+    """
+    days, partial_ranges = split_days(*period_bounds(period))
+    model = rollup.model
+    source = rollup.source
+    parts = []
+
+    if days is not None:
+        rollup_query = select(
+            *(getattr(model, name).label(name) for name in keys),
+            model.total_ms.label("total_ms"),
+            model.stream_count.label("play_count")
+        ).where(*(getattr(model, name).isnot(None) for name in required))
+        parts.append(filter_days(rollup_query, days, model.day))
+
+    key_expressions = [rollup.key_expression(name) for name in keys]
+    for start, end in partial_ranges:
+        parts.append(select(
+            *(expression.label(name) for name, expression in zip(keys, key_expressions)),
+            func.sum(source.ms_played).label("total_ms"),
+            func.count().label("play_count")
+        ).where(
+            ts_range(start, end, column=source.ts), *rollup.filters,
+            *(rollup.key_expression(name).isnot(None) for name in required)
+        ).group_by(*key_expressions))
+
+    combined = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    key_columns = [combined.c[name] for name in keys]
+    return db.query(
+        *key_columns,
+        cast(func.sum(combined.c.total_ms), BigInteger).label("total_ms"),
+        cast(func.sum(combined.c.play_count), BigInteger).label("play_count")
+    ).group_by(*key_columns)
+
+
+def named_totals(db, rollup: Rollup, key: str, period: str, dimension_key, names: Sequence, required: Sequence = ()):
+    """Query total_ms and play_count per dimension name over a period.
+
+    Totals are aggregated per integer rollup key first and the dimension is
+    joined in afterwards on dimension_key. The totals are then summed per
+    combination of names (labelled columns of the dimension), so entities
+    sharing a name are combined like when grouping the streams by text.
+    Names listed in required must not be NULL. Returns an unordered query;
+    callers add ordering and limits.
+    """
+    totals = period_totals(db, rollup, [key], period).subquery()
+    return db.query(
+        *names,
+        cast(func.sum(totals.c.total_ms), BigInteger).label("total_ms"),
+        cast(func.sum(totals.c.play_count), BigInteger).label("play_count")
+    ).select_from(totals).join(
+        dimension_key.class_, dimension_key == totals.c[key]
+    ).filter(
+        *(name.isnot(None) for name in required)
+    ).group_by(*names)
+
+
+def local_hour_totals(db, content_type: ContentType, year: Optional[int], timezone: str, fields: Dict[str, str]):
+    """Aggregate the hourly rollup by local calendar fields in a timezone.
+
+    fields maps result labels to extract() fields, e.g. {"hour_of_day": "hour"}.
+    Each UTC hour bucket is shifted into the timezone, so e.g. a heatmap or
+    monthly totals for any timezone with whole-hour offsets match aggregating
+    the raw streams. Returns rows with the fields, stream_count, total_ms and
+    avg_ms_per_stream ordered by the fields, or None if the timezone had a
+    sub-hour UTC offset (e.g. Asia/Kolkata) in the selected range; a bucket
+    then straddles two local hours and callers have to aggregate the streams.
+    """
+    local = func.timezone(timezone, HourlyContentStats.hour)
+    parts = [extract(field, local).label(label) for label, field in fields.items()]
+    query = db.query(
+        *parts,
+        cast(func.sum(HourlyContentStats.stream_count), BigInteger).label("stream_count"),
+        cast(func.sum(HourlyContentStats.total_ms), BigInteger).label("total_ms"),
+        (func.sum(HourlyContentStats.total_ms) / func.sum(HourlyContentStats.stream_count)).label("avg_ms_per_stream"),
+        func.bool_and(extract("minute", local) == 0).label("whole_hours")
+    ).filter(HourlyContentStats.content_type == content_type)
+    query = filter_year(query, year, timezone, column=HourlyContentStats.hour)
+    rows = query.group_by(*parts).order_by(*parts).all()
+    if not all(row.whole_hours for row in rows):
+        return None
+    return rows
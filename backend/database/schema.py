@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Text, Integer, BigInteger, Boolean, TIMESTAMP, ForeignKey, CheckConstraint, Index, JSON
+from enum import IntEnum
+from sqlalchemy import Column, String, Text, Integer, SmallInteger, BigInteger, Boolean, Date, TIMESTAMP, ForeignKey, CheckConstraint, Index, Identity, JSON
 from sqlalchemy.dialects.postgresql import INET
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -29,6 +30,7 @@ class Track(Base):
     __tablename__ = 'tracks'
     
     spotify_uri = Column(String(255), primary_key=True)
+    id = Column(Integer, Identity(), unique=True, nullable=False)  # Surrogate key used by stream_facts
     name = Column(Text)
     artist_name = Column(Text)
     album_name = Column(Text)
@@ -49,6 +51,7 @@ class Episode(Base):
     __tablename__ = 'episodes'
     
     spotify_uri = Column(String(255), primary_key=True)
+    id = Column(Integer, Identity(), unique=True, nullable=False)  # Surrogate key used by stream_facts
     name = Column(Text)
     show_name = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.current_timestamp())
@@ -65,6 +68,7 @@ class AudiobookChapter(Base):
     __tablename__ = 'audiobook_chapters'
     
     chapter_uri = Column(String(255), primary_key=True)
+    id = Column(Integer, Identity(), unique=True, nullable=False)  # Surrogate key used by stream_facts
     chapter_title = Column(Text)
     audiobook_title = Column(Text)
     audiobook_uri = Column(String(255))
@@ -78,11 +82,51 @@ class AudiobookChapter(Base):
     )
 
 
+# Lookup dimensions for the repeated text columns of spotify_streams, so
+# stream_facts can reference them by integer key. Rows are added by the loader.
+
+class StreamArtist(Base):
+    __tablename__ = 'stream_artists'
+    
+    # Artist names as they appear in the streams; artists holds the Spotify API metadata
+    id = Column(Integer, Identity(), primary_key=True)
+    name = Column(Text, nullable=False, unique=True)
+
+
+class PodcastShow(Base):
+    __tablename__ = 'podcast_shows'
+    
+    id = Column(Integer, Identity(), primary_key=True)
+    name = Column(Text, nullable=False, unique=True)
+
+
+class Platform(Base):
+    __tablename__ = 'platforms'
+    
+    id = Column(SmallInteger, Identity(), primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)
+
+
+class Country(Base):
+    __tablename__ = 'countries'
+    
+    id = Column(SmallInteger, Identity(), primary_key=True)
+    name = Column(String(2), nullable=False, unique=True)  # conn_country code as exported
+
+
+class PlaybackReason(Base):
+    __tablename__ = 'playback_reasons'
+    
+    id = Column(SmallInteger, Identity(), primary_key=True)
+    name = Column(String(100), nullable=False, unique=True)  # reason_start and reason_end values
+
+
 class SpotifyStream(Base):
     __tablename__ = 'spotify_streams'
     
+    # Partitioned by year of ts, so the partition key is part of the primary key
     id = Column(BigInteger, primary_key=True, autoincrement=True)
-    ts = Column(TIMESTAMP(timezone=True), nullable=False)
+    ts = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False)
     platform = Column(String(100), nullable=False)
     ms_played = Column(Integer, nullable=False)
     conn_country = Column(String(2), nullable=False)
@@ -126,8 +170,9 @@ class SpotifyStream(Base):
         CheckConstraint("LENGTH(conn_country) = 2", name='chk_conn_country_length'),
         CheckConstraint("ms_played >= 0", name='chk_ms_played_positive'),
         
-        # Indexes for performance
-        Index('idx_spotify_streams_ts', 'ts'),
+        # Indexes for performance; ts range scans use the BRIN index, since
+        # streams are written in timestamp order
+        Index('idx_spotify_streams_ts_brin', 'ts', postgresql_using='brin'),
         Index('idx_spotify_streams_platform', 'platform'),
         Index('idx_spotify_streams_country', 'conn_country'),
         Index('idx_spotify_streams_track_uri', 'spotify_track_uri'),
@@ -138,4 +183,199 @@ class SpotifyStream(Base):
         # Composite indexes for common queries
         Index('idx_spotify_streams_ts_platform', 'ts', 'platform'),
         Index('idx_spotify_streams_country_ts', 'conn_country', 'ts'),
-    )
\ No newline at end of file
+        
+        # Natural key used to skip streams already loaded from an earlier export
+        Index(
+            'uq_spotify_streams_natural_key',
+            'ts',
+            func.coalesce(spotify_track_uri, spotify_episode_uri, audiobook_chapter_uri, ''),
+            'ms_played',
+            'platform',
+            unique=True
+        ),
+        
+        # One partition per calendar year (UTC), created by the loader as needed
+        {'postgresql_partition_by': 'RANGE (ts)'},
+    )
+
+
+class ContentType(IntEnum):
+    """content_type codes of stream_facts and the tables aggregated from it.
+
+    A stream counts as the first kind of content it has a URI for.
+    """
+    OTHER = 0
+    MUSIC = 1
+    EPISODE = 2
+    AUDIOBOOK = 3
+
+
+class StreamFact(Base):
+    __tablename__ = 'stream_facts'
+    
+    # Narrow copy of spotify_streams with integer keys instead of text, kept up
+    # to date by the loader like the rollups. A row is about a third of the
+    # width of a stream, and grouping by integer keys is cheaper than by text.
+    id = Column(BigInteger, primary_key=True, autoincrement=False)  # spotify_streams.id
+    ts = Column(TIMESTAMP(timezone=True), nullable=False)
+    ms_played = Column(Integer, nullable=False)
+    track_id = Column(Integer)  # tracks.id
+    artist_id = Column(Integer)  # stream_artists.id
+    episode_id = Column(Integer)  # episodes.id
+    show_id = Column(Integer)  # podcast_shows.id
+    chapter_id = Column(Integer)  # audiobook_chapters.id
+    platform_id = Column(SmallInteger, nullable=False)
+    country_id = Column(SmallInteger, nullable=False)
+    reason_start_id = Column(SmallInteger, nullable=False)
+    reason_end_id = Column(SmallInteger, nullable=False)
+    content_type = Column(SmallInteger, nullable=False)  # ContentType
+    shuffle = Column(Boolean, nullable=False)
+    skipped = Column(Boolean, nullable=False)
+    offline = Column(Boolean, nullable=False)
+    incognito_mode = Column(Boolean, nullable=False)
+    
+    __table_args__ = (
+        # Facts are written in timestamp order, like the streams
+        Index('idx_stream_facts_ts_brin', 'ts', postgresql_using='brin'),
+        
+        # Partial covering indexes per content type, so time range aggregates
+        # over one kind of content can run as index-only scans
+        Index(
+            'idx_stream_facts_music_ts', 'ts',
+            postgresql_include=['ms_played', 'track_id', 'artist_id'],
+            postgresql_where=content_type == ContentType.MUSIC
+        ),
+        Index(
+            'idx_stream_facts_episode_ts', 'ts',
+            postgresql_include=['ms_played', 'episode_id', 'show_id'],
+            postgresql_where=content_type == ContentType.EPISODE
+        ),
+        Index(
+            'idx_stream_facts_audiobook_ts', 'ts',
+            postgresql_include=['ms_played', 'chapter_id'],
+            postgresql_where=content_type == ContentType.AUDIOBOOK
+        ),
+    )
+
+
+# Daily rollups of spotify_streams (days in UTC), kept up to date by the loader.
+# Each holds the stream count and played time per day and entity, so dashboard
+# aggregates scale with days and entities instead of stream rows.
+
+class DailyContentStats(Base):
+    __tablename__ = 'daily_content_stats'
+    
+    day = Column(Date, primary_key=True)
+    content_type = Column(SmallInteger, primary_key=True)  # ContentType
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+class HourlyContentStats(Base):
+    __tablename__ = 'hourly_content_stats'
+    
+    # Start of the UTC hour; local hours, days and months of any timezone are derived from it
+    hour = Column(TIMESTAMP(timezone=True), primary_key=True)
+    content_type = Column(SmallInteger, primary_key=True)  # ContentType
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+class DailyCountryStats(Base):
+    __tablename__ = 'daily_country_stats'
+    
+    day = Column(Date, primary_key=True)
+    country = Column(String(2), primary_key=True)
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+class DailyArtistStats(Base):
+    __tablename__ = 'daily_artist_stats'
+    
+    day = Column(Date, primary_key=True)
+    artist_id = Column(Integer, primary_key=True)  # stream_artists.id
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+class DailyTrackStats(Base):
+    __tablename__ = 'daily_track_stats'
+    
+    day = Column(Date, primary_key=True)
+    track_id = Column(Integer, primary_key=True)  # tracks.id
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+class DailyEpisodeStats(Base):
+    __tablename__ = 'daily_episode_stats'
+    
+    # The show is taken from the streams and may be missing, so it cannot be part of the key
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    episode_id = Column(Integer, nullable=False)  # episodes.id
+    show_id = Column(Integer)  # podcast_shows.id
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_daily_episode_stats_day', 'day'),
+    )
+
+
+class DailyAudiobookStats(Base):
+    __tablename__ = 'daily_audiobook_stats'
+    
+    day = Column(Date, primary_key=True)
+    chapter_id = Column(Integer, primary_key=True)  # audiobook_chapters.id
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+
+
+# Dataset catalog, maintained by the loader together with the rollups, so that
+# metadata endpoints read a handful of rows instead of scanning the streams.
+
+class DatasetCatalog(Base):
+    __tablename__ = 'dataset_catalog'
+
+    year = Column(Integer, primary_key=True)  # Calendar year in UTC
+    content_type = Column(SmallInteger, primary_key=True)  # ContentType
+    stream_count = Column(Integer, nullable=False)
+    total_ms = Column(BigInteger, nullable=False)
+    first_ts = Column(TIMESTAMP(timezone=True), nullable=False)
+    last_ts = Column(TIMESTAMP(timezone=True), nullable=False)
+    first_stream_id = Column(BigInteger, nullable=False)  # spotify_streams.id of the stream at first_ts
+
+
+class DatasetVersion(Base):
+    __tablename__ = 'dataset_versions'
+
+    # A new version is added whenever a load or rebuild changes the streams
+    version = Column(Integer, Identity(), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.current_timestamp())
+
+
+class IngestManifest(Base):
+    __tablename__ = 'ingest_manifest'
+    
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the source file
+    file_name = Column(Text, nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    record_count = Column(Integer, nullable=False)
+    valid_count = Column(Integer, nullable=False)
+    ingested_at = Column(TIMESTAMP, server_default=func.current_timestamp())
+
+
+class IngestCheckpoint(Base):
+    __tablename__ = 'ingest_checkpoints'
+    
+    # Content hash of the source file, or of the merged file set for global-order loads
+    source_key = Column(String(64), primary_key=True)
+    source_name = Column(Text, nullable=False)
+    committed_offset = Column(BigInteger, nullable=False)  # Records committed from the start of the source
+    # Records read and valid records up to the offset, for the manifest of a resumed file;
+    # not set for merged file sets, whose manifest counts come from parsing every file
+    record_count = Column(BigInteger)
+    valid_count = Column(BigInteger)
+    updated_at = Column(TIMESTAMP, server_default=func.current_timestamp())
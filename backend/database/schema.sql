@@ -1,6 +1,7 @@
 -- Dimension table for tracks
 CREATE TABLE tracks (
     spotify_uri VARCHAR(255) PRIMARY KEY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY NOT NULL UNIQUE,  -- Surrogate key used by stream_facts
     name TEXT,
     artist_name TEXT,
     album_name TEXT,
@@ -10,6 +11,7 @@ CREATE TABLE tracks (
 -- Dimension table for podcast episodes
 CREATE TABLE episodes (
     spotify_uri VARCHAR(255) PRIMARY KEY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY NOT NULL UNIQUE,
     name TEXT,
     show_name TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -18,15 +20,42 @@ CREATE TABLE episodes (
 -- Dimension table for audiobook chapters
 CREATE TABLE audiobook_chapters (
     chapter_uri VARCHAR(255) PRIMARY KEY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY NOT NULL UNIQUE,
     chapter_title TEXT,
     audiobook_title TEXT,
     audiobook_uri VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Main fact table for streaming history
+-- Lookup dimensions for the repeated text columns of spotify_streams
+CREATE TABLE stream_artists (
+    id INTEGER PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    name TEXT NOT NULL UNIQUE  -- Artist names as they appear in the streams
+);
+
+CREATE TABLE podcast_shows (
+    id INTEGER PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE platforms (
+    id SMALLINT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    name VARCHAR(100) NOT NULL UNIQUE
+);
+
+CREATE TABLE countries (
+    id SMALLINT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    name VARCHAR(2) NOT NULL UNIQUE
+);
+
+CREATE TABLE playback_reasons (
+    id SMALLINT PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    name VARCHAR(100) NOT NULL UNIQUE  -- reason_start and reason_end values
+);
+
+-- Main fact table for streaming history, range partitioned by year of ts
 CREATE TABLE spotify_streams (
-    id BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    id BIGINT GENERATED ALWAYS AS IDENTITY,
     ts TIMESTAMP WITH TIME ZONE NOT NULL,
     platform VARCHAR(50) NOT NULL,
     ms_played INTEGER NOT NULL,
@@ -59,7 +88,139 @@ CREATE TABLE spotify_streams (
     offline_timestamp BIGINT NOT NULL,
     incognito_mode BOOLEAN NOT NULL,
     
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    -- The partition key must be part of the primary key
+    PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+-- One partition per calendar year (UTC); the loader creates them as data arrives, e.g.
+-- CREATE TABLE spotify_streams_y2024 PARTITION OF spotify_streams
+--     FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2025-01-01 00:00:00+00');
+
+-- Narrow copy of spotify_streams with integer keys into the dimensions, kept up to date by the loader
+CREATE TABLE stream_facts (
+    id BIGINT PRIMARY KEY,  -- spotify_streams.id
+    ts TIMESTAMP WITH TIME ZONE NOT NULL,
+    ms_played INTEGER NOT NULL,
+    track_id INTEGER,  -- tracks.id
+    artist_id INTEGER,  -- stream_artists.id
+    episode_id INTEGER,  -- episodes.id
+    show_id INTEGER,  -- podcast_shows.id
+    chapter_id INTEGER,  -- audiobook_chapters.id
+    platform_id SMALLINT NOT NULL,
+    country_id SMALLINT NOT NULL,
+    reason_start_id SMALLINT NOT NULL,
+    reason_end_id SMALLINT NOT NULL,
+    content_type SMALLINT NOT NULL,  -- 0 other, 1 music, 2 episode, 3 audiobook
+    shuffle BOOLEAN NOT NULL,
+    skipped BOOLEAN NOT NULL,
+    offline BOOLEAN NOT NULL,
+    incognito_mode BOOLEAN NOT NULL
+);
+
+CREATE INDEX idx_stream_facts_ts_brin ON stream_facts USING BRIN (ts);
+-- Covering indexes per content type, answering the top-content queries with index-only scans
+CREATE INDEX idx_stream_facts_music_ts ON stream_facts (ts) INCLUDE (ms_played, track_id, artist_id) WHERE content_type = 1;
+CREATE INDEX idx_stream_facts_episode_ts ON stream_facts (ts) INCLUDE (ms_played, episode_id, show_id) WHERE content_type = 2;
+CREATE INDEX idx_stream_facts_audiobook_ts ON stream_facts (ts) INCLUDE (ms_played, chapter_id) WHERE content_type = 3;
+
+-- Daily rollups of spotify_streams (days in UTC), kept up to date by the loader
+CREATE TABLE daily_content_stats (
+    day DATE NOT NULL,
+    content_type SMALLINT NOT NULL,  -- 0 other, 1 music, 2 episode, 3 audiobook
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, content_type)
+);
+
+-- Content totals per UTC hour, from which local hours and months of any timezone are derived
+CREATE TABLE hourly_content_stats (
+    hour TIMESTAMPTZ NOT NULL,
+    content_type SMALLINT NOT NULL,  -- 0 other, 1 music, 2 episode, 3 audiobook
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (hour, content_type)
+);
+
+CREATE TABLE daily_country_stats (
+    day DATE NOT NULL,
+    country VARCHAR(2) NOT NULL,
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, country)
+);
+
+-- Entity rollups are aggregated from stream_facts and keyed by its integer keys
+CREATE TABLE daily_artist_stats (
+    day DATE NOT NULL,
+    artist_id INTEGER NOT NULL,
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, artist_id)
+);
+
+CREATE TABLE daily_track_stats (
+    day DATE NOT NULL,
+    track_id INTEGER NOT NULL,
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, track_id)
+);
+
+CREATE TABLE daily_episode_stats (
+    id BIGINT PRIMARY KEY GENERATED ALWAYS AS IDENTITY,
+    day DATE NOT NULL,
+    episode_id INTEGER NOT NULL,
+    show_id INTEGER,
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL
+);
+
+CREATE TABLE daily_audiobook_stats (
+    day DATE NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    PRIMARY KEY (day, chapter_id)
+);
+
+CREATE INDEX idx_daily_episode_stats_day ON daily_episode_stats(day);
+
+-- Per-year totals and first/last streams per content type, kept up to date by the loader
+CREATE TABLE dataset_catalog (
+    year INTEGER NOT NULL,  -- Calendar year in UTC
+    content_type SMALLINT NOT NULL,  -- 0 other, 1 music, 2 episode, 3 audiobook
+    stream_count INTEGER NOT NULL,
+    total_ms BIGINT NOT NULL,
+    first_ts TIMESTAMP WITH TIME ZONE NOT NULL,
+    last_ts TIMESTAMP WITH TIME ZONE NOT NULL,
+    first_stream_id BIGINT NOT NULL,  -- spotify_streams.id of the stream at first_ts
+    PRIMARY KEY (year, content_type)
+);
+
+-- One row per load or rebuild that changed the streams; the highest version is current
+CREATE TABLE dataset_versions (
+    version INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Source files already ingested, keyed by content hash
+CREATE TABLE ingest_manifest (
+    content_hash VARCHAR(64) PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    file_size BIGINT NOT NULL,
+    record_count INTEGER NOT NULL,
+    valid_count INTEGER NOT NULL,
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Progress of interrupted loads, so they can resume after the last committed batch
+CREATE TABLE ingest_checkpoints (
+    source_key VARCHAR(64) PRIMARY KEY,
+    source_name TEXT NOT NULL,
+    committed_offset BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Foreign key constraints
@@ -76,7 +237,7 @@ ADD CONSTRAINT fk_spotify_streams_audiobook_chapter
 FOREIGN KEY (audiobook_chapter_uri) REFERENCES audiobook_chapters(chapter_uri);
 
 -- Indexes for performance
-CREATE INDEX idx_spotify_streams_ts ON spotify_streams(ts);
+CREATE INDEX idx_spotify_streams_ts_brin ON spotify_streams USING BRIN (ts);
 CREATE INDEX idx_spotify_streams_platform ON spotify_streams(platform);
 CREATE INDEX idx_spotify_streams_country ON spotify_streams(conn_country);
 CREATE INDEX idx_spotify_streams_track_uri ON spotify_streams(spotify_track_uri);
@@ -88,6 +249,14 @@ CREATE INDEX idx_spotify_streams_ms_played ON spotify_streams(ms_played);
 CREATE INDEX idx_spotify_streams_ts_platform ON spotify_streams(ts, platform);
 CREATE INDEX idx_spotify_streams_country_ts ON spotify_streams(conn_country, ts);
 
+-- Natural key used to skip streams already loaded from an earlier export
+CREATE UNIQUE INDEX uq_spotify_streams_natural_key ON spotify_streams(
+    ts,
+    COALESCE(spotify_track_uri, spotify_episode_uri, audiobook_chapter_uri, ''),
+    ms_played,
+    platform
+);
+
 -- Check constraints
 ALTER TABLE spotify_streams 
 ADD CONSTRAINT chk_conn_country_length 
@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy import case, delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import aliased
+
+from database.period_filters import ts_range
+from database.schema import (
+    SpotifyStream, StreamFact, ContentType, Track, Episode, AudiobookChapter,
+    StreamArtist, PodcastShow, Platform, Country, PlaybackReason
+)
+
+logger = logging.getLogger(__name__)
+
+# Lookup dimension and the stream column whose values it holds
+LOOKUP_DIMENSIONS = [
+    (StreamArtist, SpotifyStream.master_metadata_album_artist_name),
+    (PodcastShow, SpotifyStream.episode_show_name),
+    (Platform, SpotifyStream.platform),
+    (Country, SpotifyStream.conn_country),
+    (PlaybackReason, SpotifyStream.reason_start),
+    (PlaybackReason, SpotifyStream.reason_end),
+]
+
+# The only place streams are classified; the rollups and catalog group by the facts' content_type
+STREAM_CONTENT_TYPE = case(
+    (SpotifyStream.spotify_track_uri.isnot(None), ContentType.MUSIC),
+    (SpotifyStream.spotify_episode_uri.isnot(None), ContentType.EPISODE),
+    (SpotifyStream.audiobook_chapter_uri.isnot(None), ContentType.AUDIOBOOK),
+    else_=ContentType.OTHER
+)
+
+
+def add_lookup_names(connection: Connection, start: datetime, end: datetime) -> Dict[str, int]:
+    """Add the values of streams in [start, end) that are missing from the lookup dimensions.
+
+    Only unknown names are inserted, so refreshing does not use up identity
+    values. Returns the number of new rows per dimension.
+    """
+    added: Dict[str, int] = {}
+    for model, column in LOOKUP_DIMENSIONS:
+        new_names = select(column).where(ts_range(start, end), column.isnot(None)).except_(select(model.name))
+        result = connection.execute(
+            pg_insert(model).from_select(["name"], new_names).on_conflict_do_nothing()
+        )
+        added[model.__tablename__] = added.get(model.__tablename__, 0) + result.rowcount
+    return added
+
+
+def refresh_stream_facts(connection: Connection, start: datetime, end: datetime) -> int:
+    """Recompute the stream facts of the streams in [start, end).
+
+    The range is replaced as a whole, like the rollup days. Tracks, episodes
+    and audiobook chapters are loaded before their streams, so every stream
+    finds its keys. Returns the number of facts written.
+    """
+    add_lookup_names(connection, start, end)
+    connection.execute(delete(StreamFact).where(ts_range(start, end, column=StreamFact.ts)))
+
+    reason_start = aliased(PlaybackReason)
+    reason_end = aliased(PlaybackReason)
+    facts = select(
+        SpotifyStream.id,
+        SpotifyStream.ts,
+        SpotifyStream.ms_played,
+        Track.id.label("track_id"),
+        StreamArtist.id.label("artist_id"),
+        Episode.id.label("episode_id"),
+        PodcastShow.id.label("show_id"),
+        AudiobookChapter.id.label("chapter_id"),
+        Platform.id.label("platform_id"),
+        Country.id.label("country_id"),
+        reason_start.id.label("reason_start_id"),
+        reason_end.id.label("reason_end_id"),
+        STREAM_CONTENT_TYPE.label("content_type"),
+        SpotifyStream.shuffle,
+        SpotifyStream.skipped,
+        SpotifyStream.offline,
+        SpotifyStream.incognito_mode
+    ).select_from(SpotifyStream).outerjoin(
+        Track, Track.spotify_uri == SpotifyStream.spotify_track_uri
+    ).outerjoin(
+        StreamArtist, StreamArtist.name == SpotifyStream.master_metadata_album_artist_name
+    ).outerjoin(
+        Episode, Episode.spotify_uri == SpotifyStream.spotify_episode_uri
+    ).outerjoin(
+        PodcastShow, PodcastShow.name == SpotifyStream.episode_show_name
+    ).outerjoin(
+        AudiobookChapter, AudiobookChapter.chapter_uri == SpotifyStream.audiobook_chapter_uri
+    ).join(
+        Platform, Platform.name == SpotifyStream.platform
+    ).join(
+        Country, Country.name == SpotifyStream.conn_country
+    ).join(
+        reason_start, reason_start.name == SpotifyStream.reason_start
+    ).join(
+        reason_end, reason_end.name == SpotifyStream.reason_end
+    ).where(ts_range(start, end)).order_by(SpotifyStream.ts, SpotifyStream.id)
+
+    columns = [
+        "id", "ts", "ms_played", "track_id", "artist_id", "episode_id", "show_id", "chapter_id",
+        "platform_id", "country_id", "reason_start_id", "reason_end_id", "content_type",
+        "shuffle", "skipped", "offline", "incognito_mode"
+    ]
+    return connection.execute(insert(StreamFact).from_select(columns, facts)).rowcount
@@ -0,0 +1,247 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from models.models import SpotifyStreamRecord
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Text columns of a stream record
+STRING_COLUMNS = (
+    "platform",
+    "conn_country",
+    "ip_addr",
+    "master_metadata_track_name",
+    "master_metadata_album_artist_name",
+    "master_metadata_album_album_name",
+    "spotify_track_uri",
+    "episode_name",
+    "episode_show_name",
+    "spotify_episode_uri",
+    "audiobook_title",
+    "audiobook_uri",
+    "audiobook_chapter_uri",
+    "audiobook_chapter_title",
+    "reason_start",
+    "reason_end",
+)
+
+# Low-cardinality text columns, stored as integer codes into a dictionary of their values
+DICTIONARY_COLUMNS = (
+    "platform",
+    "conn_country",
+    "master_metadata_album_artist_name",
+    "master_metadata_album_album_name",
+    "reason_start",
+    "reason_end",
+)
+
+# The other text columns, nearly distinct per stream, are kept as plain lists
+PLAIN_COLUMNS = tuple(name for name in STRING_COLUMNS if name not in DICTIONARY_COLUMNS)
+
+BOOL_COLUMNS = ("shuffle", "skipped", "offline", "incognito_mode")
+
+
+def timestamp_to_micros(value: datetime) -> int:
+    """Convert a timestamp to microseconds since the epoch, treating naive values as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def micros_to_timestamp(value: int) -> datetime:
+    """Convert microseconds since the epoch to an aware UTC timestamp."""
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class StreamColumns:
+    """A batch of stream records stored column by column.
+
+    Timestamps (as epoch microseconds), ms_played and offline_timestamp are
+    typed int64 arrays and booleans are bytearrays. The low-cardinality text
+    columns are int32 codes into a dictionary of distinct values (None
+    included) that is shared by every batch taken or sliced from the same
+    source; the other text columns are lists of their values. A row costs a
+    fraction of a full pydantic model.
+    """
+
+    def __init__(self, dictionaries: Optional[Dict[str, List[Optional[str]]]] = None):
+        self.ts = array("q")
+        self.ms_played = array("q")
+        self.offline_timestamp = array("q")
+        self.offline_timestamp_null = bytearray()
+        self.bools = {name: bytearray() for name in BOOL_COLUMNS}
+        self.codes = {name: array("i") for name in DICTIONARY_COLUMNS}
+        self.text: Dict[str, List[Optional[str]]] = {name: [] for name in PLAIN_COLUMNS}
+        self.dictionaries = dictionaries if dictionaries is not None else {name: [] for name in DICTIONARY_COLUMNS}
+        self._lookups: Optional[Dict[str, Dict[Optional[str], int]]] = None
+
+    @classmethod
+    def from_records(cls, records: Iterable[SpotifyStreamRecord]) -> "StreamColumns":
+        """Build a columnar batch from validated stream records, one column at a time."""
+        records = list(records)
+        columns = cls()
+        columns.ts = array("q", [timestamp_to_micros(record.ts) for record in records])
+        columns.ms_played = array("q", [record.ms_played for record in records])
+        offline_timestamps = [record.offline_timestamp for record in records]
+        columns.offline_timestamp = array("q", [value or 0 for value in offline_timestamps])
+        columns.offline_timestamp_null = bytearray([value is None for value in offline_timestamps])
+        for name in BOOL_COLUMNS:
+            get = attrgetter(name)
+            columns.bools[name] = bytearray([get(record) for record in records])
+        for name in PLAIN_COLUMNS:
+            get = attrgetter(name)
+            columns.text[name] = [get(record) for record in records]
+        for name in DICTIONARY_COLUMNS:
+            get = attrgetter(name)
+            # Insertion order of the lookup is the code order of the dictionary
+            lookup: Dict[Optional[str], int] = {}
+            assign = lookup.setdefault
+            columns.codes[name] = array("i", [assign(get(record), len(lookup)) for record in records])
+            columns.dictionaries[name] = list(lookup)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getstate__(self):
+        # The encoding lookups are rebuilt on demand and not worth pickling
+        state = self.__dict__.copy()
+        state["_lookups"] = None
+        return state
+
+    def _encode(self, name: str, value: Optional[str]) -> int:
+        if self._lookups is None:
+            self._lookups = {
+                column: {v: code for code, v in enumerate(values)}
+                for column, values in self.dictionaries.items()
+            }
+        lookup = self._lookups[name]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+            lookup[value] = code
+        return code
+
+    def append(self, record: SpotifyStreamRecord) -> None:
+        """Append one validated record."""
+        self.ts.append(timestamp_to_micros(record.ts))
+        self.ms_played.append(record.ms_played)
+        offline_timestamp = record.offline_timestamp
+        self.offline_timestamp.append(offline_timestamp or 0)
+        self.offline_timestamp_null.append(offline_timestamp is None)
+        for name in BOOL_COLUMNS:
+            self.bools[name].append(getattr(record, name))
+        for name in PLAIN_COLUMNS:
+            self.text[name].append(getattr(record, name))
+        for name in DICTIONARY_COLUMNS:
+            self.codes[name].append(self._encode(name, getattr(record, name)))
+
+    def value(self, name: str, row: int) -> Any:
+        """Decode a single value."""
+        if name == "ts":
+            return micros_to_timestamp(self.ts[row])
+        if name == "ms_played":
+            return self.ms_played[row]
+        if name == "offline_timestamp":
+            return None if self.offline_timestamp_null[row] else self.offline_timestamp[row]
+        if name in self.bools:
+            return bool(self.bools[name][row])
+        if name in self.text:
+            return self.text[name][row]
+        return self.dictionaries[name][self.codes[name][row]]
+
+    def take(self, indices: Sequence[int]) -> "StreamColumns":
+        """Return the given rows, in order, as a batch sharing this batch's dictionaries."""
+        result = StreamColumns(self.dictionaries)
+        result._lookups = self._lookups
+        result.ts = array("q", map(self.ts.__getitem__, indices))
+        result.ms_played = array("q", map(self.ms_played.__getitem__, indices))
+        result.offline_timestamp = array("q", map(self.offline_timestamp.__getitem__, indices))
+        result.offline_timestamp_null = bytearray(map(self.offline_timestamp_null.__getitem__, indices))
+        result.bools = {name: bytearray(map(column.__getitem__, indices)) for name, column in self.bools.items()}
+        result.codes = {name: array("i", map(column.__getitem__, indices)) for name, column in self.codes.items()}
+        result.text = {name: list(map(column.__getitem__, indices)) for name, column in self.text.items()}
+        return result
+
+    def slice(self, start: int, stop: int) -> "StreamColumns":
+        """Return rows start:stop as a batch sharing this batch's dictionaries."""
+        result = StreamColumns(self.dictionaries)
+        result._lookups = self._lookups
+        result.ts = self.ts[start:stop]
+        result.ms_played = self.ms_played[start:stop]
+        result.offline_timestamp = self.offline_timestamp[start:stop]
+        result.offline_timestamp_null = self.offline_timestamp_null[start:stop]
+        result.bools = {name: column[start:stop] for name, column in self.bools.items()}
+        result.codes = {name: column[start:stop] for name, column in self.codes.items()}
+        result.text = {name: column[start:stop] for name, column in self.text.items()}
+        return result
+
+    def sorted_by_ts(self) -> "StreamColumns":
+        """Return the rows in timestamp order; rows with equal timestamps keep their order."""
+        ts = self.ts
+        order = sorted(range(len(ts)), key=ts.__getitem__)
+        return self.take(order)
+
+    def first_rows(self, name: str) -> Dict[str, int]:
+        """Map each distinct non-empty value of a text column to the first row holding it."""
+        if name in self.text:
+            first: Dict[Optional[str], int] = {}
+            for row, value in enumerate(self.text[name]):
+                first.setdefault(value, row)
+            return {value: row for value, row in first.items() if value}
+        values = self.dictionaries[name]
+        first_codes: Dict[int, int] = {}
+        for row, code in enumerate(self.codes[name]):
+            first_codes.setdefault(code, row)
+        return {values[code]: row for code, row in first_codes.items() if values[code]}
+
+    @classmethod
+    def gather(cls, rows: Iterable[Tuple["StreamColumns", int]]) -> "StreamColumns":
+        """Build a batch from rows of other batches.
+
+        Works a column at a time. Each dictionary-encoded value is looked up
+        by its (source dictionary, code) key, so a value is re-encoded once
+        per source dictionary rather than once per row.
+        """
+        rows = list(rows)
+        result = cls()
+        result.ts = array("q", [source.ts[row] for source, row in rows])
+        result.ms_played = array("q", [source.ms_played[row] for source, row in rows])
+        result.offline_timestamp = array("q", [source.offline_timestamp[row] for source, row in rows])
+        result.offline_timestamp_null = bytearray([source.offline_timestamp_null[row] for source, row in rows])
+        for name in BOOL_COLUMNS:
+            result.bools[name] = bytearray([source.bools[name][row] for source, row in rows])
+        for name in PLAIN_COLUMNS:
+            result.text[name] = [source.text[name][row] for source, row in rows]
+
+        # Number the distinct source dictionaries; chunks of one run share theirs
+        sources: Dict[int, int] = {}
+        dictionaries = []
+        tags = []
+        for source, _ in rows:
+            tag = sources.get(id(source.dictionaries))
+            if tag is None:
+                tag = sources[id(source.dictionaries)] = len(dictionaries)
+                dictionaries.append(source.dictionaries)
+            tags.append(tag)
+        count = len(dictionaries)
+
+        for name in DICTIONARY_COLUMNS:
+            keys = [source.codes[name][row] * count + tag for (source, row), tag in zip(rows, tags)]
+            lookup: Dict[Optional[str], int] = {}
+            remap = {}
+            for key in dict.fromkeys(keys):
+                code, tag = divmod(key, count)
+                remap[key] = lookup.setdefault(dictionaries[tag][name][code], len(lookup))
+            result.codes[name] = array("i", map(remap.__getitem__, keys))
+            result.dictionaries[name] = list(lookup)
+        return result
+
+    def rows(self, columns: Sequence[str]) -> Iterator[tuple]:
+        """Yield decoded row tuples with the given columns."""
+        for row in range(len(self)):
+            yield tuple(self.value(name, row) for name in columns)
@@ -0,0 +1,114 @@
+import io
+from datetime import datetime
+from typing import Optional, Sequence
+from sqlalchemy import text
+
+from loaders.columnar import BOOL_COLUMNS, StreamColumns, micros_to_timestamp
+
+# Column order used for COPY into spotify_streams
+STREAM_COLUMNS = (
+    "ts",
+    "platform",
+    "ms_played",
+    "conn_country",
+    "ip_addr",
+    "master_metadata_track_name",
+    "master_metadata_album_artist_name",
+    "master_metadata_album_album_name",
+    "spotify_track_uri",
+    "episode_name",
+    "episode_show_name",
+    "spotify_episode_uri",
+    "audiobook_title",
+    "audiobook_uri",
+    "audiobook_chapter_uri",
+    "audiobook_chapter_title",
+    "reason_start",
+    "reason_end",
+    "shuffle",
+    "skipped",
+    "offline",
+    "offline_timestamp",
+    "incognito_mode",
+)
+
+
+def _csv_field(value) -> str:
+    """Format a single value for COPY's CSV format."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def build_stream_csv_buffer(batch: StreamColumns, source_order_start: Optional[int] = None) -> io.StringIO:
+    """Serialize a columnar stream batch into a CSV buffer ordered like STREAM_COLUMNS.
+
+    Each distinct value of a dictionary-encoded column is formatted once per
+    batch rather than once per row. With source_order_start, a leading column numbers the rows from it.
+    """
+    fields = []
+    if source_order_start is not None:
+        fields.append(map(str, range(source_order_start, source_order_start + len(batch))))
+    
+    for name in STREAM_COLUMNS:
+        if name == "ts":
+            fields.append([micros_to_timestamp(value).isoformat() for value in batch.ts])
+        elif name == "ms_played":
+            fields.append(map(str, batch.ms_played))
+        elif name == "offline_timestamp":
+            fields.append(["" if null else str(value)
+                           for value, null in zip(batch.offline_timestamp, batch.offline_timestamp_null)])
+        elif name in BOOL_COLUMNS:
+            fields.append(map(("f", "t").__getitem__, batch.bools[name]))
+        elif name in batch.text:
+            fields.append(map(_csv_field, batch.text[name]))
+        else:
+            codes = batch.codes[name]
+            values = batch.dictionaries[name]
+            formatted = {code: _csv_field(values[code]) for code in set(codes)}
+            fields.append(map(formatted.__getitem__, codes))
+    
+    buffer = io.StringIO()
+    buffer.writelines(",".join(row) + "\n" for row in zip(*fields))
+    buffer.seek(0)
+    return buffer
+
+
+def copy_buffer(dbapi_connection, table: str, columns: Sequence[str], buffer: io.StringIO) -> None:
+    """Bulk load a CSV buffer into a table with psycopg2's COPY FROM STDIN."""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def copy_buffer_skip_existing(connection, table: str, columns: Sequence[str], buffer: io.StringIO) -> int:
+    """COPY a CSV buffer into a temp staging table, then insert it skipping unique-key conflicts.
+
+    COPY itself cannot skip conflicting rows, so batches are staged first and moved
+    with INSERT ... ON CONFLICT DO NOTHING. Returns the number of rows inserted.
+    """
+    column_list = ", ".join(columns)
+    staging_table = f"tmp_{table}_batch"
+    
+    connection.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging_table} ON COMMIT DELETE ROWS AS "
+        f"SELECT {column_list} FROM {table} WITH NO DATA"
+    ))
+    connection.execute(text(f"TRUNCATE {staging_table}"))
+    copy_buffer(connection.connection, staging_table, columns, buffer)
+    
+    result = connection.execute(text(
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging_table} "
+        f"ON CONFLICT DO NOTHING"
+    ))
+    return result.rowcount
+
@@ -0,0 +1,69 @@
+import io
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from types import SimpleNamespace
+from typing import IO, List, Optional
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """A JSON file inside a Spotify export ZIP, usable wherever the loader takes a file path.
+
+    Mirrors the parts of pathlib.Path the loader relies on (name, open, stat and
+    read_bytes). Members are decompressed as they are read and never extracted
+    to disk. Instances only hold the archive path and member name, so they can
+    be sent to parse worker processes.
+    """
+
+    archive: Path
+    member: str
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+    def __str__(self) -> str:
+        return f"{self.archive}/{self.member}"
+
+    def open(self, mode: str = 'r', encoding: Optional[str] = None) -> IO:
+        """Open the member for streaming reads in text or binary mode."""
+        if mode not in ('r', 'rb'):
+            raise ValueError(f"Archive members are read-only, got mode {mode!r}")
+
+        with zipfile.ZipFile(self.archive) as archive:
+            # The member stream keeps the archive file open until it is closed
+            stream = archive.open(self.member)
+        if mode == 'rb':
+            return stream
+        return io.TextIOWrapper(stream, encoding=encoding or 'utf-8')
+
+    def stat(self) -> SimpleNamespace:
+        """Return the uncompressed member size as st_size."""
+        with zipfile.ZipFile(self.archive) as archive:
+            return SimpleNamespace(st_size=archive.getinfo(self.member).file_size)
+
+    def read_bytes(self) -> bytes:
+        with self.open('rb') as f:
+            return f.read()
+
+
+def is_export_archive(path: Path) -> bool:
+    """Return whether path is a ZIP file rather than a directory of JSON files."""
+    return path.is_file() and zipfile.is_zipfile(path)
+
+
+def list_json_members(archive: Path) -> List[ArchiveMember]:
+    """List the JSON files in an export archive, at any folder depth.
+
+    macOS resource fork entries (__MACOSX/, ._*) are skipped.
+    """
+    with zipfile.ZipFile(archive) as zf:
+        return [
+            ArchiveMember(archive, info.filename)
+            for info in zf.infolist()
+            if not info.is_dir()
+            and info.filename.endswith(".json")
+            and not info.filename.startswith("__MACOSX/")
+            and not PurePosixPath(info.filename).name.startswith("._")
+        ]
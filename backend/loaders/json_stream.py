@@ -0,0 +1,121 @@
+import json
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+_WHITESPACE = " \t\n\r"
+# Characters that may follow an array element
+_DELIMITERS = _WHITESPACE + ",]"
+_skip_whitespace = re.compile(r"[ \t\n\r]*").match
+# Characters that may continue a number, e.g. "1." of "1.5"
+_skip_number_chars = re.compile(r"[0-9.eE+-]*").match
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array one at a time.
+
+    Only a single chunk plus the element currently being decoded is held in
+    memory, so the file size does not affect peak memory usage. Malformed
+    arrays are rejected like json.load would, with a ValueError (or its
+    subclass json.JSONDecodeError).
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> Optional[str]:
+        """Skip whitespace and return the next character without consuming it, or None at EOF."""
+        nonlocal pos
+        while True:
+            pos = _skip_whitespace(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return None
+
+    def decode_value() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A value is only complete once a delimiter follows it: a number
+            # cut at the chunk edge ("12" of "1234", "1." of "1.5e10") decodes
+            # too, so only then does it take reading more and decoding again.
+            if end < len(buffer) and buffer[end] in _DELIMITERS:
+                break
+            cut_number = (isinstance(value, (int, float)) and not isinstance(value, bool)
+                          and _skip_number_chars(buffer, end).end() == len(buffer))
+            if end < len(buffer) and not cut_number:
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {buffer[end]!r}")
+            if not fill():
+                break
+        pos = end
+        return value
+
+    if next_char() is None:
+        raise ValueError("Expected a JSON array, got an empty document")
+    if buffer[pos] != "[":
+        raise ValueError(f"Expected a JSON array, got {buffer[pos]!r}")
+    pos += 1
+
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            if next_char() is None:
+                raise ValueError("Unexpected end of JSON array")
+            yield decode_value()
+            # Usually the delimiter directly follows the value, so skip the call
+            pos = _skip_whitespace(buffer, pos).end()
+            char = buffer[pos] if pos < len(buffer) else next_char()
+            if char is None:
+                raise ValueError("Unexpected end of JSON array")
+            pos += 1
+            if char == "]":
+                break
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+
+    char = next_char()
+    if char is not None:
+        raise ValueError(f"Unexpected data after JSON array: {char!r}")
+
+
+def iter_json_file(file_path: Path, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the records of a JSON array file without loading it whole.
+
+    file_path may also be an ArchiveMember, which is decompressed as it is read.
+    """
+    with file_path.open('r', encoding='utf-8') as f:
+        yield from iter_json_array(f, chunk_size)
+
+
+def iter_json_batches(file_path: Path, batch_size: int, start: int = 0) -> Iterator[List[Dict[str, Any]]]:
+    """Yield the records of a JSON array file in lists of at most batch_size.
+
+    The first start records are read but not returned.
+    """
+    records = islice(iter_json_file(file_path), start, None)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,233 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import Field, TypeAdapter, ValidationError
+from typing_extensions import Annotated
+
+from loaders.json_stream import iter_json_batches
+from loaders.columnar import StreamColumns
+from loaders.run_merge import SortedRun
+from loaders.profiling import LoadProfiler, StageProfile
+from models.models import SpotifyStreamRecord, TrackRecord, EpisodeRecord, AudiobookChapterRecord
+
+logger = logging.getLogger(__name__)
+
+# Lower bound on the size of an export record: with all values empty its 23 keys still
+# take over 500 bytes. A file up to run_size times this holds at most one run of records,
+# so it can be validated straight from its bytes with validate_json.
+MIN_RECORD_BYTES = 512
+
+# Valid items become SpotifyStreamRecord and anything else is passed through unchanged,
+# so a single bad record does not fail validation of the whole batch
+_BatchItem = Annotated[Union[SpotifyStreamRecord, Any], Field(union_mode='left_to_right')]
+_batch_adapter = TypeAdapter(List[_BatchItem])
+
+
+@dataclass
+class QuarantinedRecord:
+    """A raw record that failed validation, with its position in the source file."""
+    
+    index: int
+    error: str
+    record: Any
+
+
+@dataclass
+class ParsedFile:
+    """Compact result of parsing one export file into sorted runs plus its dimension rows."""
+    
+    file_path: Path
+    record_count: int = 0
+    valid_count: int = 0
+    runs: List[SortedRun] = field(default_factory=list)
+    tracks: Dict[str, TrackRecord] = field(default_factory=dict)
+    episodes: Dict[str, EpisodeRecord] = field(default_factory=dict)
+    audiobook_chapters: Dict[str, AudiobookChapterRecord] = field(default_factory=dict)
+    quarantined: List[QuarantinedRecord] = field(default_factory=list)
+    seconds: float = 0.0
+    profile: List[StageProfile] = field(default_factory=list)
+
+
+def validate_records(raw_data: List[Dict[str, Any]], start_index: int = 0,
+                     log: Optional[logging.Logger] = None, batch: bool = True,
+                     quarantine: Optional[List[QuarantinedRecord]] = None) -> List[SpotifyStreamRecord]:
+    """Validate and parse raw JSON data into Pydantic models.
+    
+    With batch=True the whole list is validated in one TypeAdapter call. Invalid
+    records are appended to quarantine (when given) with their index and error.
+    """
+    log = log or logger
+    
+    if batch:
+        items = _batch_adapter.validate_python(raw_data)
+    else:
+        items = []
+        for record in raw_data:
+            try:
+                items.append(SpotifyStreamRecord(**record))
+            except (ValidationError, TypeError):
+                items.append(record)
+    
+    return _split_valid(items, start_index, log, quarantine)
+
+
+def validate_json_bytes(data: bytes, log: Optional[logging.Logger] = None,
+                        quarantine: Optional[List[QuarantinedRecord]] = None) -> Tuple[int, List[SpotifyStreamRecord]]:
+    """Parse and validate a whole JSON array file in one validate_json call.
+    
+    Returns the number of raw records and the valid records.
+    """
+    items = _batch_adapter.validate_json(data)
+    return len(items), _split_valid(items, 0, log or logger, quarantine)
+
+
+def _split_valid(items: List[Any], start_index: int, log: logging.Logger,
+                 quarantine: Optional[List[QuarantinedRecord]]) -> List[SpotifyStreamRecord]:
+    """Separate validated records from items that failed validation."""
+    valid_records = []
+    error_count = 0
+    
+    for i, item in enumerate(items, start=start_index):
+        if isinstance(item, SpotifyStreamRecord):
+            valid_records.append(item)
+            continue
+        
+        # Re-validate the failed item on its own to get its error details
+        error_count += 1
+        try:
+            SpotifyStreamRecord.model_validate(item)
+            error = "Unknown validation error"
+        except ValidationError as e:
+            error = str(e)
+        log.warning(f"Validation error in record {i}: {error}")
+        if quarantine is not None:
+            quarantine.append(QuarantinedRecord(index=i, error=error, record=item))
+    
+    log.info(f"Validated {len(valid_records)} records, {error_count} errors")
+    return valid_records
+
+
+def extract_dimensions(columns: StreamColumns) -> Tuple[Dict[str, TrackRecord], Dict[str, EpisodeRecord], Dict[str, AudiobookChapterRecord]]:
+    """Extract unique tracks, episodes, and audiobook chapters keyed by URI.
+    
+    Each dimension row takes its metadata from the first row referencing it.
+    """
+    value = columns.value
+    tracks = {
+        uri: TrackRecord(
+            spotify_uri=uri,
+            name=value("master_metadata_track_name", row),
+            artist_name=value("master_metadata_album_artist_name", row),
+            album_name=value("master_metadata_album_album_name", row)
+        )
+        for uri, row in columns.first_rows("spotify_track_uri").items()
+    }
+    episodes = {
+        uri: EpisodeRecord(
+            spotify_uri=uri,
+            name=value("episode_name", row),
+            show_name=value("episode_show_name", row)
+        )
+        for uri, row in columns.first_rows("spotify_episode_uri").items()
+    }
+    audiobook_chapters = {
+        uri: AudiobookChapterRecord(
+            chapter_uri=uri,
+            chapter_title=value("audiobook_chapter_title", row),
+            audiobook_title=value("audiobook_title", row),
+            audiobook_uri=value("audiobook_uri", row)
+        )
+        for uri, row in columns.first_rows("audiobook_chapter_uri").items()
+    }
+    return tracks, episodes, audiobook_chapters
+
+
+def parse_file(file_path: Path, run_size: int, spill_dir: Path, keep_last_run: bool = False,
+               batch_validation: bool = True, trace_memory: bool = False) -> ParsedFile:
+    """Read, validate and sort one export file into runs of at most run_size records.
+    
+    Every run except (optionally) the last one is spilled to spill_dir, so the
+    result stays small enough to hand back from a worker process. The time
+    spent in each step is returned in the result's profile.
+    """
+    start = time.perf_counter()
+    result = ParsedFile(file_path=file_path)
+    profiler = LoadProfiler(trace_memory)
+    profiler.start()
+    
+    try:
+        batches = _iter_validated_batches(file_path, run_size, batch_validation, result.quarantined, profiler)
+        for raw_count, records in batches:
+            result.record_count += raw_count
+            result.valid_count += len(records)
+            if not records:
+                continue
+            
+            with profiler.stage("columnar", rows_in=len(records)) as call:
+                columns = StreamColumns.from_records(records)
+                call.rows_out = len(columns)
+            with profiler.stage("dimension_extract", rows_in=len(columns)) as call:
+                tracks, episodes, audiobook_chapters = extract_dimensions(columns)
+                result.tracks.update(tracks)
+                result.episodes.update(episodes)
+                result.audiobook_chapters.update(audiobook_chapters)
+                call.rows_out = len(tracks) + len(episodes) + len(audiobook_chapters)
+            
+            _spill_runs(result.runs, spill_dir, profiler)
+            with profiler.stage("sort", rows_in=len(columns)) as call:
+                result.runs.append(SortedRun(columns))
+                call.rows_out = len(columns)
+        
+        if not keep_last_run:
+            _spill_runs(result.runs, spill_dir, profiler)
+    finally:
+        profiler.stop()
+    
+    result.seconds = time.perf_counter() - start
+    result.profile = list(profiler.stages.values())
+    return result
+
+
+def _spill_runs(runs: List[SortedRun], spill_dir: Path, profiler: LoadProfiler) -> None:
+    """Spill the runs still held in memory."""
+    pending = [run for run in runs if not run.spilled]
+    if not pending:
+        return
+    rows = sum(run.count for run in pending)
+    with profiler.stage("spill", rows_in=rows) as call:
+        for run in pending:
+            run.spill(spill_dir)
+        call.rows_out = rows
+
+
+def _iter_validated_batches(file_path: Path, run_size: int, batch_validation: bool,
+                            quarantine: List[QuarantinedRecord], profiler: LoadProfiler):
+    """Yield (raw record count, valid records) for consecutive slices of a file.
+    
+    On the fast path JSON decoding happens inside validate_json, so the
+    "validate" stage includes it and "read" only covers reading the bytes.
+    Larger files are decoded incrementally and validated one run at a time.
+    """
+    if batch_validation and file_path.stat().st_size <= run_size * MIN_RECORD_BYTES:
+        # Fast path: parse and validate straight from the file bytes
+        with profiler.stage("read"):
+            data = file_path.read_bytes()
+        with profiler.stage("validate") as call:
+            raw_count, records = validate_json_bytes(data, quarantine=quarantine)
+            call.rows_in = raw_count
+            call.rows_out = len(records)
+        del data
+        for i in range(0, max(len(records), 1), run_size):
+            yield (raw_count if i == 0 else 0), records[i:i + run_size]
+        return
+    
+    offset = 0
+    for raw_batch in profiler.iterate("json_parse", iter_json_batches(file_path, run_size)):
+        with profiler.stage("validate", rows_in=len(raw_batch)) as call:
+            records = validate_records(raw_batch, start_index=offset, batch=batch_validation, quarantine=quarantine)
+            call.rows_out = len(records)
+        offset += len(raw_batch)
+        yield len(raw_batch), records
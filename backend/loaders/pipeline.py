@@ -0,0 +1,198 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from models.models import TrackRecord, EpisodeRecord, AudiobookChapterRecord
+from loaders.columnar import StreamColumns
+from loaders.parse_stage import QuarantinedRecord
+
+_END = object()
+
+
+@dataclass
+class StreamBatch:
+    """A batch of one source file as it moves through the ingest pipeline.
+
+    The reader fills in raw, the validator columns and quarantined, and the
+    dimension extractor the dimension rows not yet written. A batch with
+    end_of_file set carries no records and marks the end of its file.
+    """
+
+    file_path: Path
+    offset: int
+    raw: List[Dict[str, Any]]
+    end_of_file: bool = False
+    failed: bool = False
+    columns: StreamColumns = field(default_factory=StreamColumns)
+    quarantined: List[QuarantinedRecord] = field(default_factory=list)
+    tracks: List[TrackRecord] = field(default_factory=list)
+    episodes: List[EpisodeRecord] = field(default_factory=list)
+    audiobook_chapters: List[AudiobookChapterRecord] = field(default_factory=list)
+
+
+@dataclass
+class StageStats:
+    """Throughput and queue metrics for one pipeline stage."""
+
+    name: str
+    items: int = 0
+    rows: int = 0
+    busy_seconds: float = 0.0
+    wait_input_seconds: float = 0.0
+    wait_output_seconds: float = 0.0
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+    queue_depth_samples: int = 0
+
+    def sample_queue(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_depth_total += depth
+        self.queue_depth_samples += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "rows": self.rows,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "wait_input_seconds": round(self.wait_input_seconds, 3),
+            "wait_output_seconds": round(self.wait_output_seconds, 3),
+            "rows_per_sec": round(self.rows / self.busy_seconds, 1) if self.busy_seconds > 0 else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_queue_depth": (
+                round(self.queue_depth_total / self.queue_depth_samples, 2)
+                if self.queue_depth_samples else 0.0
+            )
+        }
+
+
+class Pipeline:
+    """Run a source and a chain of stages on threads connected by bounded queues.
+
+    Each stage is a (name, function) pair. A function takes one item and
+    returns the item for the next stage, or None to drop it. The last stage
+    is the sink. row_count maps an item to the number of rows it carries and
+    is used for per-stage throughput. Queue depth is sampled on the output
+    queue of each stage, so a stage whose output queue stays full is waiting
+    on a slower stage downstream.
+    """
+
+    def __init__(self, source_name: str, source: Iterable[Any],
+                 stages: List[Tuple[str, Callable[[Any], Any]]],
+                 queue_size: int = 4, row_count: Optional[Callable[[Any], int]] = None):
+        self.source_name = source_name
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.row_count = row_count or (lambda item: 1)
+        self.stats = [StageStats(source_name)] + [StageStats(name) for name, _ in stages]
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._error_lock = threading.Lock()
+
+    def _fail(self, error: BaseException) -> None:
+        with self._error_lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _put(self, out_queue: queue.Queue, item: Any, stats: StageStats) -> bool:
+        """Put an item downstream, giving up if the pipeline was stopped."""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.1)
+                if item is not _END:
+                    stats.sample_queue(out_queue.qsize())
+                stats.wait_output_seconds += time.perf_counter() - start
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_queue: queue.Queue, stats: StageStats) -> Any:
+        """Take the next item from upstream, returning _END once the pipeline stops."""
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = in_queue.get(timeout=0.1)
+                stats.wait_input_seconds += time.perf_counter() - start
+                return item
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_source(self) -> None:
+        stats = self.stats[0]
+        out_queue = self._queues[0] if self._queues else None
+        try:
+            iterator = iter(self.source)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy_seconds += time.perf_counter() - start
+                stats.items += 1
+                stats.rows += self.row_count(item)
+                if out_queue is not None and not self._put(out_queue, item, stats):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if out_queue is not None:
+                self._put(out_queue, _END, stats)
+
+    def _run_stage(self, index: int) -> None:
+        name, function = self.stages[index]
+        stats = self.stats[index + 1]
+        in_queue = self._queues[index]
+        out_queue = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        try:
+            while True:
+                item = self._get(in_queue, stats)
+                if item is _END:
+                    break
+                start = time.perf_counter()
+                result = function(item)
+                stats.busy_seconds += time.perf_counter() - start
+                stats.items += 1
+                stats.rows += self.row_count(item)
+                if result is not None and out_queue is not None:
+                    if not self._put(out_queue, result, stats):
+                        return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            if out_queue is not None:
+                self._put(out_queue, _END, stats)
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """Run the pipeline to completion and return per-stage statistics.
+
+        The first exception raised by any stage stops the pipeline and is
+        re-raised here.
+        """
+        threads = [threading.Thread(target=self._run_source, name=f"pipeline-{self.source_name}", daemon=True)]
+        for index, (name, _) in enumerate(self.stages):
+            threads.append(threading.Thread(target=self._run_stage, args=(index,),
+                                            name=f"pipeline-{name}", daemon=True))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            raise self._error
+        return self.stage_stats()
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage statistics, plus the name of the busiest (bottleneck) stage."""
+        result = {stats.name: stats.to_dict() for stats in self.stats}
+        busiest = max(self.stats, key=lambda stats: stats.busy_seconds)
+        result["bottleneck"] = busiest.name
+        return result
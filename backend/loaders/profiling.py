@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+_DONE = object()
+
+
+@dataclass
+class StageProfile:
+    """Accumulated cost of one loader stage over all of its calls."""
+
+    name: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_memory_bytes: Optional[int] = None
+
+    def add(self, other: "StageProfile") -> None:
+        self.calls += other.calls
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        if other.peak_memory_bytes is not None:
+            self.peak_memory_bytes = max(self.peak_memory_bytes or 0, other.peak_memory_bytes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        rows = self.rows_in or self.rows_out
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_sec": round(rows / self.wall_seconds, 1) if self.wall_seconds > 0 else 0.0,
+            "peak_memory_mb": (
+                round(self.peak_memory_bytes / (1024 * 1024), 2)
+                if self.peak_memory_bytes is not None else None
+            )
+        }
+
+
+@dataclass
+class StageCall:
+    """Handle for a running stage call; set its row counts before the call ends."""
+
+    rows_in: int = 0
+    rows_out: int = 0
+
+
+class LoadProfiler:
+    """Collect wall time, CPU time, row counts and peak memory per loader stage.
+
+    CPU time is measured on the calling thread, so stages running on
+    pipeline threads are charged only for their own work. With trace_memory,
+    each call also records the peak Python memory traced by tracemalloc
+    above what was allocated when it started. tracemalloc has a single peak
+    counter, so figures of stages overlapping on different threads are
+    approximate, and tracing slows the load down noticeably.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, StageProfile] = {}
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def start(self) -> None:
+        """Start tracemalloc if memory tracing is enabled and nothing else started it."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        """Stop tracemalloc if this profiler started it."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int = 0) -> Iterator[StageCall]:
+        """Time one call of a stage."""
+        call = StageCall(rows_in=rows_in)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            memory_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield call
+        finally:
+            self.record(StageProfile(
+                name=name,
+                calls=1,
+                wall_seconds=time.perf_counter() - wall_start,
+                cpu_seconds=time.thread_time() - cpu_start,
+                rows_in=call.rows_in,
+                rows_out=call.rows_out,
+                peak_memory_bytes=tracemalloc.get_traced_memory()[1] - memory_start if tracing else None
+            ))
+
+    def iterate(self, name: str, iterable: Iterable[Any],
+                row_count: Callable[[Any], int] = len) -> Iterator[Any]:
+        """Yield from iterable, timing each step as a call of the named stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as call:
+                item = next(iterator, _DONE)
+                if item is not _DONE:
+                    call.rows_out = row_count(item)
+            if item is _DONE:
+                return
+            yield item
+
+    def record(self, profile: StageProfile) -> None:
+        """Add a finished call, or the totals of a stage profiled elsewhere."""
+        with self._lock:
+            existing = self.stages.get(profile.name)
+            if existing is None:
+                self.stages[profile.name] = StageProfile(profile.name)
+                existing = self.stages[profile.name]
+            existing.add(profile)
+
+    def merge(self, profiles: Iterable[StageProfile]) -> None:
+        """Add stage totals collected by another profiler, e.g. in a parse worker process."""
+        for profile in profiles:
+            self.record(profile)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Per-stage results in first-seen order, plus the overall wall and process CPU time."""
+        with self._lock:
+            stages = {name: profile.to_dict() for name, profile in self.stages.items()}
+        return {
+            "wall_seconds": round(time.perf_counter() - self._wall_start, 3),
+            "cpu_seconds": round(time.process_time() - self._cpu_start, 3),
+            "memory_traced": self.trace_memory,
+            "stages": stages
+        }
+
+
+def write_profile(path: Path, stats: Dict[str, Any]) -> None:
+    """Write load statistics, including their profile, to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2, default=str)
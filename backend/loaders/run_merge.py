@@ -0,0 +1,75 @@
+import heapq
+import pickle
+import tempfile
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from loaders.columnar import StreamColumns
+
+# A merged row: (ts in epoch microseconds, batch holding the row, row index in that batch)
+MergedRow = Tuple[int, StreamColumns, int]
+
+# Number of rows pickled together when a run is spilled to disk
+SPILL_CHUNK_SIZE = 10000
+
+
+class SortedRun:
+    """A chronologically sorted run of stream rows, kept in memory or spilled to disk."""
+
+    def __init__(self, columns: StreamColumns):
+        # Export files are nearly sorted already, which timsort handles in close to linear time
+        self.columns: Optional[StreamColumns] = columns.sorted_by_ts()
+        self.count = len(columns)
+        self.path: Optional[Path] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def spill(self, directory: Path) -> None:
+        """Write the run to a temporary file and release its rows from memory.
+
+        The dictionaries of the encoded text columns are written once,
+        followed by the columns in chunks of SPILL_CHUNK_SIZE rows.
+        """
+        if self.spilled:
+            return
+        fd, path = tempfile.mkstemp(suffix=".run", dir=directory)
+        with open(fd, "wb") as f:
+            pickle.dump(self.columns.dictionaries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for i in range(0, self.count, SPILL_CHUNK_SIZE):
+                chunk = self.columns.slice(i, i + SPILL_CHUNK_SIZE)
+                chunk.dictionaries = None
+                pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path = Path(path)
+        self.columns = None
+
+    def chunks(self) -> Iterator[StreamColumns]:
+        """Yield the run as column batches, reading spilled chunks one at a time."""
+        if not self.spilled:
+            yield self.columns
+            return
+        with open(self.path, "rb") as f:
+            dictionaries = pickle.load(f)
+            while True:
+                try:
+                    chunk = pickle.load(f)
+                except EOFError:
+                    return
+                chunk.dictionaries = dictionaries
+                yield chunk
+
+    def __iter__(self) -> Iterator[MergedRow]:
+        for chunk in self.chunks():
+            for row, ts in enumerate(chunk.ts):
+                yield ts, chunk, row
+
+
+def merge_runs(runs: Iterable[SortedRun]) -> Iterator[MergedRow]:
+    """K-way merge sorted runs into a single chronological stream of rows.
+
+    Only one chunk per run is held in memory. Rows with equal timestamps keep
+    the order of their runs.
+    """
+    return heapq.merge(*runs, key=itemgetter(0))
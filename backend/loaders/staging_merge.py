@@ -0,0 +1,92 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import text
+
+from loaders.columnar import StreamColumns
+from loaders.copy_writer import STREAM_COLUMNS, build_stream_csv_buffer, copy_buffer
+
+STAGING_TABLE = "spotify_streams_staging"
+
+# Staging rows carry their position in the export so ties on ts keep file order
+STAGING_COLUMNS = ("source_order",) + STREAM_COLUMNS
+
+
+def prepare_staging_table(connection) -> None:
+    """Create the UNLOGGED staging table if needed and empty it.
+
+    The staging table skips the write-ahead log and has no indexes or
+    constraints, so COPY into it is as cheap as Postgres allows. Its contents
+    are disposable: a crash simply means the next load starts over.
+    """
+    connection.execute(text(
+        f"CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE} AS "
+        f"SELECT 0::bigint AS source_order, {', '.join(STREAM_COLUMNS)} FROM spotify_streams WITH NO DATA"
+    ))
+    connection.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+
+
+def copy_to_staging(connection, batch: StreamColumns, source_order_start: int) -> int:
+    """COPY a batch into the staging table, numbering its rows from source_order_start."""
+    copy_buffer(connection.connection, STAGING_TABLE, STAGING_COLUMNS,
+                build_stream_csv_buffer(batch, source_order_start))
+    return len(batch)
+
+
+def staged_ts_range(connection) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Return the earliest and latest staged timestamps, or (None, None) if nothing is staged."""
+    return tuple(connection.execute(text(f"SELECT min(ts), max(ts) FROM {STAGING_TABLE}")).one())
+
+
+def merge_staging(connection) -> Dict[str, int]:
+    """Move staged streams and their dimension rows into the permanent tables.
+
+    Dimension rows take the metadata of the first stream in export order that
+    references them, like the Python extraction does. Streams are inserted in
+    timestamp order so ids stay chronological, and rows matching an existing
+    natural key are skipped. Run this inside a single transaction so the merge
+    is all or nothing. Returns the number of new rows per table.
+    """
+    connection.execute(text(f"ANALYZE {STAGING_TABLE}"))
+    inserted = {}
+
+    inserted["tracks"] = connection.execute(text(f"""
+        INSERT INTO tracks (spotify_uri, name, artist_name, album_name)
+        SELECT DISTINCT ON (spotify_track_uri)
+            spotify_track_uri, master_metadata_track_name,
+            master_metadata_album_artist_name, master_metadata_album_album_name
+        FROM {STAGING_TABLE}
+        WHERE spotify_track_uri <> ''
+        ORDER BY spotify_track_uri, source_order
+        ON CONFLICT DO NOTHING
+    """)).rowcount
+
+    inserted["episodes"] = connection.execute(text(f"""
+        INSERT INTO episodes (spotify_uri, name, show_name)
+        SELECT DISTINCT ON (spotify_episode_uri)
+            spotify_episode_uri, episode_name, episode_show_name
+        FROM {STAGING_TABLE}
+        WHERE spotify_episode_uri <> ''
+        ORDER BY spotify_episode_uri, source_order
+        ON CONFLICT DO NOTHING
+    """)).rowcount
+
+    inserted["audiobook_chapters"] = connection.execute(text(f"""
+        INSERT INTO audiobook_chapters (chapter_uri, chapter_title, audiobook_title, audiobook_uri)
+        SELECT DISTINCT ON (audiobook_chapter_uri)
+            audiobook_chapter_uri, audiobook_chapter_title, audiobook_title, audiobook_uri
+        FROM {STAGING_TABLE}
+        WHERE audiobook_chapter_uri <> ''
+        ORDER BY audiobook_chapter_uri, source_order
+        ON CONFLICT DO NOTHING
+    """)).rowcount
+
+    column_list = ", ".join(STREAM_COLUMNS)
+    inserted["streams"] = connection.execute(text(f"""
+        INSERT INTO spotify_streams ({column_list})
+        SELECT {column_list} FROM {STAGING_TABLE}
+        ORDER BY ts, source_order
+        ON CONFLICT DO NOTHING
+    """)).rowcount
+
+    connection.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+    return inserted
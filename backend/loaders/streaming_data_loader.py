@@ -1,15 +1,36 @@
+import hashlib
 import json
 import logging
+import multiprocessing
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine
+from datetime import date, datetime
+from typing import Deque, List, Optional, Dict, Any, Iterator, Set, Tuple
+from sqlalchemy import create_engine, func, Index
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import IntegrityError
-from pydantic import ValidationError
 
-from database.schema import Base, Track, Episode, AudiobookChapter, SpotifyStream
+from database.schema import Base, Track, Episode, AudiobookChapter, SpotifyStream, StreamFact, IngestManifest, IngestCheckpoint
+from database.migrations import run_migrations, index_exists
+from database.index_management import secondary_indexes, drop_indexes, rebuild_indexes, analyze_tables
+from database.partitioning import is_partitioned, partition_years, years_between, create_year_partitions
+from database.rollups import refresh_daily_rollups, rebuild_daily_rollups, merge_day_ranges, utc_day
 from models.models import SpotifyStreamRecord, TrackRecord, EpisodeRecord, AudiobookChapterRecord
 from config.settings import get_settings
+from loaders.json_stream import iter_json_batches, iter_json_file
+from loaders.export_archive import is_export_archive, list_json_members
+from loaders.columnar import StreamColumns, micros_to_timestamp
+from loaders.copy_writer import STREAM_COLUMNS, build_stream_csv_buffer, copy_buffer_skip_existing
+from loaders.run_merge import SortedRun, merge_runs
+from loaders.parse_stage import ParsedFile, QuarantinedRecord, parse_file, validate_records, extract_dimensions
+from loaders.pipeline import Pipeline, StreamBatch
+from loaders.profiling import LoadProfiler, write_profile
+from loaders.staging_merge import prepare_staging_table, copy_to_staging, staged_ts_range, merge_staging
 
 
 class SpotifyDataLoader:
@@ -19,6 +40,14 @@ class SpotifyDataLoader:
         self.settings = get_settings()
         self.engine = create_engine(self.settings.database.connection_string)
         self.Session = sessionmaker(bind=self.engine)
+        # COPY FROM STDIN goes through psycopg2's cursor.copy_expert
+        self._copy_supported = self.engine.dialect.driver == "psycopg2"
+        self.write_counters = {"duplicates": 0, "failed": 0}
+        self.profiler = LoadProfiler()
+        # Years with a stream partition, or None if the table is not partitioned
+        self._partition_years: Optional[Set[int]] = None
+        # UTC day ranges that received new streams and need their rollups refreshed
+        self._rollup_days: List[Tuple[date, date]] = []
         
         # Setup logging
         logging.basicConfig(
@@ -26,20 +55,48 @@ class SpotifyDataLoader:
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         self.logger = logging.getLogger(__name__)
+        if not self._copy_supported and self.settings.etl.write_method != "orm":
+            self.logger.warning(f"Database driver {self.engine.dialect.driver} does not support COPY, "
+                                f"using ORM inserts")
     
     def create_tables(self):
         """Create database tables if they don't exist."""
         self.logger.info("Creating database tables...")
         Base.metadata.create_all(self.engine)
+        run_migrations(self.engine)
+        
+        table_name = SpotifyStream.__tablename__
+        with self.engine.connect() as connection:
+            if is_partitioned(connection, table_name):
+                self._partition_years = partition_years(connection, table_name)
+            else:
+                self._partition_years = None
+                self.logger.info(f"{table_name} is not partitioned; run scripts/partition_streams.py to partition it by year")
         self.logger.info("Database tables created successfully")
     
+    def ensure_stream_partitions(self, connection, first_ts: datetime, last_ts: datetime):
+        """Create and commit the missing yearly stream partitions between two timestamps.
+        
+        Inserting a row without a matching partition fails, so every write path
+        calls this before writing streams. Takes a session or a connection.
+        """
+        if self._partition_years is None:
+            return
+        missing = set(years_between(first_ts, last_ts)) - self._partition_years
+        if not missing:
+            return
+        with self.profiler.stage("partition", rows_in=len(missing)) as call:
+            call.rows_out = len(create_year_partitions(connection, SpotifyStream.__tablename__, missing))
+            connection.commit()
+        self._partition_years |= missing
+    
     def load_json_file(self, file_path: Path) -> List[Dict[str, Any]]:
         """Load and parse a JSON file."""
         self.logger.info(f"Loading JSON file: {file_path}")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # Streamed, so only the parsed records are held in memory, not the file text as well
+            data = list(iter_json_file(file_path))
             
             self.logger.info(f"Loaded {len(data)} records from {file_path.name}")
             return data
@@ -48,184 +105,313 @@ class SpotifyDataLoader:
             self.logger.error(f"Error loading {file_path}: {e}")
             raise
     
-    def validate_and_parse_records(self, raw_data: List[Dict[str, Any]]) -> List[SpotifyStreamRecord]:
+    def iter_json_batches(self, file_path: Path, batch_size: Optional[int] = None,
+                          start: int = 0) -> Iterator[List[Dict[str, Any]]]:
+        """Stream a JSON file as bounded batches of raw records, starting at record start."""
+        self.logger.info(f"Streaming JSON file: {file_path}")
+        return iter_json_batches(file_path, batch_size or self.settings.etl.batch_size, start)
+    
+    def validate_and_parse_records(self, raw_data: List[Dict[str, Any]], start_index: int = 0,
+                                   quarantine: Optional[List[QuarantinedRecord]] = None) -> List[SpotifyStreamRecord]:
         """Validate and parse raw JSON data into Pydantic models."""
-        valid_records = []
-        error_count = 0
-        
-        for i, record in enumerate(raw_data):
-            try:
-                validated_record = SpotifyStreamRecord(**record)
-                valid_records.append(validated_record)
-            except ValidationError as e:
-                error_count += 1
-                self.logger.warning(f"Validation error in record {i}: {e}")
-                continue
-        
-        self.logger.info(f"Validated {len(valid_records)} records, {error_count} errors")
-        return valid_records
-    
-    def extract_dimension_data(self, records: List[SpotifyStreamRecord]) -> tuple:
-        """Extract unique tracks, episodes, and audiobook chapters from stream records."""
-        tracks = {}
-        episodes = {}
-        audiobook_chapters = {}
-        
-        for record in records:
-            # Extract track data
-            if record.is_track and record.spotify_track_uri:
-                if record.spotify_track_uri not in tracks:
-                    tracks[record.spotify_track_uri] = TrackRecord(
-                        spotify_uri=record.spotify_track_uri,
-                        name=record.master_metadata_track_name,
-                        artist_name=record.master_metadata_album_artist_name,
-                        album_name=record.master_metadata_album_album_name
-                    )
-            
-            # Extract episode data
-            if record.is_episode and record.spotify_episode_uri:
-                if record.spotify_episode_uri not in episodes:
-                    episodes[record.spotify_episode_uri] = EpisodeRecord(
-                        spotify_uri=record.spotify_episode_uri,
-                        name=record.episode_name,
-                        show_name=record.episode_show_name
-                    )
-            
-            # Extract audiobook chapter data
-            if record.is_audiobook and record.audiobook_chapter_uri:
-                if record.audiobook_chapter_uri not in audiobook_chapters:
-                    audiobook_chapters[record.audiobook_chapter_uri] = AudiobookChapterRecord(
-                        chapter_uri=record.audiobook_chapter_uri,
-                        chapter_title=record.audiobook_chapter_title,
-                        audiobook_title=record.audiobook_title,
-                        audiobook_uri=record.audiobook_uri
-                    )
+        with self.profiler.stage("validate", rows_in=len(raw_data)) as call:
+            records = validate_records(raw_data, start_index, self.logger,
+                                       batch=self.settings.etl.batch_validation, quarantine=quarantine)
+            call.rows_out = len(records)
+        return records
+    
+    def write_quarantine(self, quarantined: Dict[str, List[QuarantinedRecord]]) -> int:
+        """Append invalid records to the quarantine file as JSON lines, if one is configured."""
+        total = sum(len(entries) for entries in quarantined.values())
+        quarantine_file = self.settings.etl.quarantine_file
+        if not total or not quarantine_file:
+            return total
         
+        with open(quarantine_file, 'a', encoding='utf-8') as f:
+            for file_name, entries in quarantined.items():
+                for entry in entries:
+                    f.write(json.dumps({
+                        "file": file_name,
+                        "index": entry.index,
+                        "error": entry.error,
+                        "record": entry.record
+                    }, default=str) + "\n")
+        self.logger.warning(f"Quarantined {total} invalid records to {quarantine_file}")
+        return total
+    
+    def extract_dimension_data(self, columns: StreamColumns) -> tuple:
+        """Extract unique tracks, episodes, and audiobook chapters from a columnar stream batch."""
+        tracks, episodes, audiobook_chapters = extract_dimensions(columns)
         self.logger.info(f"Extracted {len(tracks)} tracks, {len(episodes)} episodes, {len(audiobook_chapters)} audiobook chapters")
         return list(tracks.values()), list(episodes.values()), list(audiobook_chapters.values())
     
     def load_dimension_tables(self, session: Session, tracks: List[TrackRecord], 
                             episodes: List[EpisodeRecord], 
-                            audiobook_chapters: List[AudiobookChapterRecord]):
-        """Load dimension table data, handling duplicates gracefully."""
+                            audiobook_chapters: List[AudiobookChapterRecord]) -> bool:
+        """Load dimension table data with set-based upserts, skipping rows that already exist.
         
-        # Load tracks
-        for track in tracks:
-            try:
-                existing = session.get(Track, track.spotify_uri)
-                if not existing:
-                    db_track = Track(
-                        spotify_uri=track.spotify_uri,
-                        name=track.name,
-                        artist_name=track.artist_name,
-                        album_name=track.album_name
-                    )
-                    session.add(db_track)
-            except Exception as e:
-                self.logger.warning(f"Error adding track {track.spotify_uri}: {e}")
+        Returns whether the rows were committed.
+        """
+        track_rows = [
+            {
+                "spotify_uri": track.spotify_uri,
+                "name": track.name,
+                "artist_name": track.artist_name,
+                "album_name": track.album_name
+            }
+            for track in tracks
+        ]
+        episode_rows = [
+            {
+                "spotify_uri": episode.spotify_uri,
+                "name": episode.name,
+                "show_name": episode.show_name
+            }
+            for episode in episodes
+        ]
+        chapter_rows = [
+            {
+                "chapter_uri": chapter.chapter_uri,
+                "chapter_title": chapter.chapter_title,
+                "audiobook_title": chapter.audiobook_title,
+                "audiobook_uri": chapter.audiobook_uri
+            }
+            for chapter in audiobook_chapters
+        ]
         
-        # Load episodes
-        for episode in episodes:
+        rows_in = len(track_rows) + len(episode_rows) + len(chapter_rows)
+        with self.profiler.stage("dimension_load", rows_in=rows_in) as call:
             try:
-                existing = session.get(Episode, episode.spotify_uri)
-                if not existing:
-                    db_episode = Episode(
-                        spotify_uri=episode.spotify_uri,
-                        name=episode.name,
-                        show_name=episode.show_name
-                    )
-                    session.add(db_episode)
-            except Exception as e:
-                self.logger.warning(f"Error adding episode {episode.spotify_uri}: {e}")
+                inserted = {
+                    "tracks": self._upsert_dimension_rows(session, Track, track_rows),
+                    "episodes": self._upsert_dimension_rows(session, Episode, episode_rows),
+                    "audiobook_chapters": self._upsert_dimension_rows(session, AudiobookChapter, chapter_rows)
+                }
+                session.commit()
+                call.rows_out = sum(inserted.values())
+                self.logger.info(f"Successfully loaded dimension table data (new rows: {inserted})")
+                return True
+            except IntegrityError as e:
+                session.rollback()
+                self.logger.warning(f"Integrity error in dimension tables: {e}")
+                return False
+    
+    def _upsert_dimension_rows(self, session: Session, model, rows: List[Dict[str, Any]]) -> int:
+        """Insert dimension rows in batches with INSERT ... ON CONFLICT DO NOTHING."""
+        batch_size = self.settings.etl.batch_size
+        inserted = 0
         
-        # Load audiobook chapters
-        for chapter in audiobook_chapters:
-            try:
-                existing = session.get(AudiobookChapter, chapter.chapter_uri)
-                if not existing:
-                    db_chapter = AudiobookChapter(
-                        chapter_uri=chapter.chapter_uri,
-                        chapter_title=chapter.chapter_title,
-                        audiobook_title=chapter.audiobook_title,
-                        audiobook_uri=chapter.audiobook_uri
-                    )
-                    session.add(db_chapter)
-            except Exception as e:
-                self.logger.warning(f"Error adding audiobook chapter {chapter.chapter_uri}: {e}")
+        for i in range(0, len(rows), batch_size):
+            result = session.execute(
+                pg_insert(model).values(rows[i:i + batch_size]).on_conflict_do_nothing()
+            )
+            inserted += result.rowcount
         
-        try:
-            session.commit()
-            self.logger.info("Successfully loaded dimension table data")
-        except IntegrityError as e:
-            session.rollback()
-            self.logger.warning(f"Integrity error in dimension tables: {e}")
+        return inserted
     
-    def load_stream_data(self, session: Session, records: List[SpotifyStreamRecord]):
-        """Load streaming history data in batches."""
+    def load_stream_data(self, session: Session, columns: StreamColumns):
+        """Load streaming history data in batches, skipping streams that already exist."""
+        with self.profiler.stage("fact_insert", rows_in=len(columns)) as call:
+            call.rows_out = self._load_stream_batches(session, columns)
+        return call.rows_out
+    
+    def _load_stream_batches(self, session: Session, columns: StreamColumns) -> int:
         batch_size = self.settings.etl.batch_size
-        total_records = len(records)
+        total_records = len(columns)
         loaded_count = 0
         
         for i in range(0, total_records, batch_size):
-            batch = records[i:i + batch_size]
-            batch_streams = []
+            batch = columns.slice(i, i + batch_size)
             
-            for record in batch:
-                try:
-                    # Set foreign keys to None if the referenced record doesn't exist
-                    track_uri = record.spotify_track_uri if record.is_track else None
-                    episode_uri = record.spotify_episode_uri if record.is_episode else None
-                    audiobook_uri = record.audiobook_chapter_uri if record.is_audiobook else None
-                    
-                    db_stream = SpotifyStream(
-                        ts=record.ts,
-                        platform=record.platform,
-                        ms_played=record.ms_played,
-                        conn_country=record.conn_country,
-                        ip_addr=record.ip_addr,
-                        master_metadata_track_name=record.master_metadata_track_name,
-                        master_metadata_album_artist_name=record.master_metadata_album_artist_name,
-                        master_metadata_album_album_name=record.master_metadata_album_album_name,
-                        spotify_track_uri=track_uri,
-                        episode_name=record.episode_name,
-                        episode_show_name=record.episode_show_name,
-                        spotify_episode_uri=episode_uri,
-                        audiobook_title=record.audiobook_title,
-                        audiobook_uri=record.audiobook_uri,
-                        audiobook_chapter_uri=audiobook_uri,
-                        audiobook_chapter_title=record.audiobook_chapter_title,
-                        reason_start=record.reason_start,
-                        reason_end=record.reason_end,
-                        shuffle=record.shuffle,
-                        skipped=record.skipped,
-                        offline=record.offline,
-                        offline_timestamp=record.offline_timestamp,
-                        incognito_mode=record.incognito_mode
-                    )
-                    batch_streams.append(db_stream)
-                
-                except Exception as e:
-                    self.logger.warning(f"Error creating stream record: {e}")
-                    continue
+            batch_loaded = self._write_stream_batch(session, batch)
+            if batch_loaded is None:
+                self.write_counters["failed"] += len(batch)
+                continue
             
+            loaded_count += batch_loaded
+            self.write_counters["duplicates"] += len(batch) - batch_loaded
+            self.logger.info(f"Loaded batch {i//batch_size + 1}/{(total_records + batch_size - 1)//batch_size} "
+                           f"({loaded_count}/{total_records} records)")
+        
+        self.logger.info(f"Successfully loaded {loaded_count} streaming records")
+        return loaded_count
+    
+    def _write_stream_batch(self, session: Session, batch: StreamColumns) -> Optional[int]:
+        """Write and commit one batch, retrying failed attempts.
+        
+        Returns the number of rows inserted, or None if every attempt failed.
+        """
+        max_retries = max(1, self.settings.etl.max_retries)
+        retry_delay = self.settings.etl.retry_delay
+        
+        if not len(batch):
+            return 0
+        first_ts = micros_to_timestamp(min(batch.ts))
+        last_ts = micros_to_timestamp(max(batch.ts))
+        self.ensure_stream_partitions(session, first_ts, last_ts)
+        
+        for attempt in range(max_retries):
             try:
-                session.add_all(batch_streams)
+                if self.settings.etl.write_method != "orm" and self._copy_supported:
+                    batch_loaded = self._copy_stream_batch(session, batch)
+                else:
+                    batch_loaded = self._insert_stream_batch(session, batch)
                 session.commit()
-                loaded_count += len(batch_streams)
-                self.logger.info(f"Loaded batch {i//batch_size + 1}/{(total_records + batch_size - 1)//batch_size} "
-                               f"({loaded_count}/{total_records} records)")
+                if batch_loaded:
+                    self._rollup_days.append((utc_day(first_ts), utc_day(last_ts)))
+                return batch_loaded
             
             except Exception as e:
                 session.rollback()
-                self.logger.error(f"Error loading batch: {e}")
-                continue
+                if attempt == max_retries - 1:
+                    self.logger.error(f"Error loading batch, giving up after {max_retries} attempts: {e}")
+                    return None
+                self.logger.warning(f"Error loading batch (attempt {attempt + 1}/{max_retries}), "
+                                    f"retrying in {retry_delay}s: {e}")
+                time.sleep(retry_delay)
+    
+    def _copy_stream_batch(self, session: Session, batch: StreamColumns) -> int:
+        """Write a batch with COPY FROM STDIN."""
+        buffer = build_stream_csv_buffer(batch)
+        return copy_buffer_skip_existing(session.connection(), SpotifyStream.__tablename__, STREAM_COLUMNS, buffer)
+    
+    def _insert_stream_batch(self, session: Session, batch: StreamColumns) -> int:
+        """Write a batch through SQLAlchemy with INSERT ... ON CONFLICT DO NOTHING."""
+        rows = [dict(zip(STREAM_COLUMNS, row)) for row in batch.rows(STREAM_COLUMNS)]
+        if not rows:
+            return 0
         
-        self.logger.info(f"Successfully loaded {loaded_count} streaming records")
-        return loaded_count
+        result = session.execute(
+            pg_insert(SpotifyStream).values(rows).on_conflict_do_nothing()
+        )
+        return result.rowcount
+    
+    def file_content_hash(self, file_path: Path) -> str:
+        """Compute the SHA-256 hash of a source file."""
+        digest = hashlib.sha256()
+        with file_path.open('rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
     
-    def load_file(self, file_path: Path) -> Dict[str, int]:
+    def filter_ingested_files(self, audio_files: List[Path]) -> tuple:
+        """Split files into those still to load and those already in the ingest manifest."""
+        file_hashes = {file_path: self.file_content_hash(file_path) for file_path in audio_files}
+        
+        if self.settings.etl.force_reload:
+            return audio_files, [], file_hashes
+        
+        with self.Session() as session:
+            ingested = set(
+                row[0] for row in session.query(IngestManifest.content_hash).filter(
+                    IngestManifest.content_hash.in_(list(file_hashes.values()))
+                ).all()
+            )
+        
+        pending = [f for f in audio_files if file_hashes[f] not in ingested]
+        skipped = [f for f in audio_files if file_hashes[f] in ingested]
+        for file_path in skipped:
+            self.logger.info(f"Skipping unchanged file already ingested: {file_path.name}")
+        return pending, skipped, file_hashes
+    
+    def record_ingested_files(self, file_entries: List[Dict[str, Any]]):
+        """Add fully loaded files to the ingest manifest."""
+        if not file_entries:
+            return
+        with self.Session() as session:
+            stmt = pg_insert(IngestManifest).values(file_entries)
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[IngestManifest.content_hash],
+                    set_={
+                        "file_name": stmt.excluded.file_name,
+                        "record_count": stmt.excluded.record_count,
+                        "valid_count": stmt.excluded.valid_count,
+                        "ingested_at": func.current_timestamp()
+                    }
+                )
+            )
+            session.commit()
+        self.logger.info(f"Recorded {len(file_entries)} files in ingest manifest")
+    
+    def load_checkpoints(self, source_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the committed offset and record counts of each source with a checkpoint."""
+        if not source_keys:
+            return {}
+        with self.Session() as session:
+            rows = session.query(
+                IngestCheckpoint.source_key, IngestCheckpoint.committed_offset,
+                IngestCheckpoint.record_count, IngestCheckpoint.valid_count
+            ).filter(IngestCheckpoint.source_key.in_(source_keys)).all()
+        return {
+            row.source_key: {
+                "committed_offset": row.committed_offset,
+                "record_count": row.record_count,
+                "valid_count": row.valid_count
+            }
+            for row in rows
+        }
+    
+    def save_checkpoint(self, session: Session, source_key: str, source_name: str, committed_offset: int,
+                        record_count: Optional[int] = None, valid_count: Optional[int] = None):
+        """Record that all records of a source before committed_offset are committed.
+        
+        record_count and valid_count are the records read and the valid records
+        up to the offset, when the source is a single file.
+        """
+        with self.profiler.stage("checkpoint"):
+            stmt = pg_insert(IngestCheckpoint).values(
+                source_key=source_key,
+                source_name=source_name,
+                committed_offset=committed_offset,
+                record_count=record_count,
+                valid_count=valid_count
+            )
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=[IngestCheckpoint.source_key],
+                    set_={
+                        "source_name": stmt.excluded.source_name,
+                        "committed_offset": stmt.excluded.committed_offset,
+                        "record_count": stmt.excluded.record_count,
+                        "valid_count": stmt.excluded.valid_count,
+                        "updated_at": func.current_timestamp()
+                    }
+                )
+            )
+            session.commit()
+    
+    def clear_checkpoints(self, source_keys: List[str]):
+        """Remove the checkpoints of sources that finished loading."""
+        if not source_keys:
+            return
+        with self.Session() as session:
+            session.query(IngestCheckpoint).filter(
+                IngestCheckpoint.source_key.in_(source_keys)
+            ).delete(synchronize_session=False)
+            session.commit()
+    
+    def _manifest_entry(self, file_path: Path, content_hash: str, record_count: int, valid_count: int) -> Dict[str, Any]:
+        """Build an ingest manifest row for a processed file."""
+        return {
+            "content_hash": content_hash,
+            "file_name": file_path.name,
+            "file_size": file_path.stat().st_size,
+            "record_count": record_count,
+            "valid_count": valid_count
+        }
+    
+    def start_load(self):
+        """Create missing tables, look up the stream partitions and reset the per-load counters."""
+        with self.profiler.stage("schema"):
+            self.create_tables()
+        self.write_counters = {"duplicates": 0, "failed": 0}
+        self._rollup_days = []
+    
+    def load_file(self, file_path: Path) -> Dict[str, Any]:
         """Load a single JSON file into the database."""
         self.logger.info(f"Starting load for file: {file_path}")
+        self.start_load()
         
         # Load and validate data
         raw_data = self.load_json_file(file_path)
@@ -236,19 +422,22 @@ class SpotifyDataLoader:
             return {"total": 0, "loaded": 0}
         
         # Sort records by timestamp to ensure proper chronological order
-        records.sort(key=lambda x: x.ts)
-        self.logger.info(f"Sorted {len(records)} records by timestamp")
+        columns = StreamColumns.from_records(records).sorted_by_ts()
+        self.logger.info(f"Sorted {len(columns)} records by timestamp")
         
         # Extract dimension data
-        tracks, episodes, audiobook_chapters = self.extract_dimension_data(records)
+        tracks, episodes, audiobook_chapters = self.extract_dimension_data(columns)
         
         # Load data
-        with self.Session() as session:
-            # Load dimension tables first
-            self.load_dimension_tables(session, tracks, episodes, audiobook_chapters)
-            
-            # Load streaming data
-            loaded_count = self.load_stream_data(session, records)
+        try:
+            with self.Session() as session:
+                # Load dimension tables first
+                self.load_dimension_tables(session, tracks, episodes, audiobook_chapters)
+                
+                # Load streaming data
+                loaded_count = self.load_stream_data(session, columns)
+        finally:
+            finish_stats = self.finish_load()
         
         stats = {
             "total": len(raw_data),
@@ -256,21 +445,25 @@ class SpotifyDataLoader:
             "loaded": loaded_count,
             "tracks": len(tracks),
             "episodes": len(episodes),
-            "audiobook_chapters": len(audiobook_chapters)
+            "audiobook_chapters": len(audiobook_chapters),
+            **finish_stats
         }
         
         self.logger.info(f"Completed load for {file_path.name}: {stats}")
         return stats
     
-    def load_all_files(self, data_dir: Optional[Path] = None) -> Dict[str, Any]:
-        """Load all JSON files from the data directory with global timestamp ordering."""
-        if data_dir is None:
-            data_dir = Path(self.settings.etl.data_directory)
+    def find_audio_files(self, data_dir: Path) -> List[Path]:
+        """Find audio history files in the data directory, ordered by number suffix.
         
-        json_files = list(data_dir.glob("*.json"))
+        data_dir may also be the export ZIP itself, in which case its JSON members
+        are returned as ArchiveMember objects and read straight from the archive.
+        """
+        if is_export_archive(data_dir):
+            json_files = list_json_members(data_dir)
+        else:
+            json_files = list(data_dir.glob("*.json"))
         if not json_files:
-            self.logger.warning(f"No JSON files found in {data_dir}")
-            return {}
+            return []
         
         # Filter to audio files only and sort by number suffix
         audio_files = [f for f in json_files if "Audio" in f.name and "Video" not in f.name]
@@ -282,74 +475,628 @@ class SpotifyDataLoader:
             return int(match.group(1)) if match else 0
         
         audio_files.sort(key=get_file_number)
+        return audio_files
+    
+    def load_all_files(self, data_dir: Optional[Path] = None, resume: bool = False) -> Dict[str, Any]:
+        """Load all JSON files from the data directory with global timestamp ordering.
+        
+        With resume, files interrupted by an earlier run continue after their
+        last committed batch instead of being written again from the start.
+        
+        The returned stats include a per-stage profile of the load, which is
+        also written to ETL_PROFILE_FILE when that is set.
+        """
+        if data_dir is None:
+            data_dir = Path(self.settings.etl.data_directory)
+        
+        self.profiler = LoadProfiler(trace_memory=self.settings.etl.profile_memory)
+        self.profiler.start()
+        try:
+            total_stats = self._load_all_files(data_dir, resume)
+        finally:
+            self.profiler.stop()
+        if not total_stats:
+            return total_stats
+        
+        total_stats["profile"] = self.profiler.to_dict()
+        if self.settings.etl.profile_file:
+            write_profile(Path(self.settings.etl.profile_file), total_stats)
+            self.logger.info(f"Wrote load profile to {self.settings.etl.profile_file}")
+        return total_stats
+    
+    def _load_all_files(self, data_dir: Path, resume: bool) -> Dict[str, Any]:
+        """Find, filter and load the export files; the body of load_all_files."""
+        with self.profiler.stage("discover") as call:
+            audio_files = self.find_audio_files(data_dir)
+            call.rows_out = len(audio_files)
+        if not audio_files:
+            self.logger.warning(f"No JSON files found in {data_dir}")
+            return {}
         
         self.logger.info(f"Found {len(audio_files)} audio files to process (ignoring video files)")
+        self.start_load()
+        
+        # Skip files whose exact content was already ingested
+        with self.profiler.stage("hash", rows_in=len(audio_files)) as call:
+            audio_files, skipped_files, file_hashes = self.filter_ingested_files(audio_files)
+            call.rows_out = len(audio_files)
+        
+        bulk_indexes = self.drop_indexes_for_bulk_load() if audio_files else []
+        if resume and not bulk_indexes:
+            # A crash during a bulk load leaves the dropped indexes missing
+            bulk_indexes = self.missing_secondary_indexes()
+        try:
+            if self.settings.etl.write_method == "staging" and self._copy_supported:
+                if resume:
+                    self.logger.info("Staging loads are all or nothing; reloading all pending files")
+                total_stats = self.load_files_staged(audio_files, file_hashes, len(skipped_files))
+            elif self.settings.etl.streaming:
+                total_stats = self.load_files_streaming(audio_files, file_hashes, len(skipped_files), resume)
+            else:
+                total_stats = self.load_files_merged(audio_files, file_hashes, len(skipped_files), resume)
+        finally:
+            finish_stats = self.finish_load(bulk_indexes)
+        
+        total_stats.update(finish_stats)
+        return total_stats
+    
+    def finish_load(self, bulk_indexes: Optional[List[Index]] = None) -> Dict[str, Any]:
+        """Rebuild the indexes dropped for a bulk load and refresh the rollups; every load ends with this.
         
-        # Create tables
+        Run it even if the load failed, so committed batches are rolled up and
+        get a dataset version. Returns the stats to add to the load's stats.
+        """
+        stats: Dict[str, Any] = {}
+        if bulk_indexes:
+            stats["bulk_load"] = True
+            stats["index_rebuild_seconds"] = self.rebuild_bulk_load_indexes(bulk_indexes)
+        stats["rollup_rows"] = self.refresh_rollups(analyze=bool(bulk_indexes))
+        return stats
+    
+    def refresh_rollups(self, analyze: bool = False) -> int:
+        """Recompute the stream facts and daily rollups of the days that received new streams during this load.
+        
+        With analyze, the planner statistics of stream_facts are refreshed
+        afterwards, e.g. after a bulk load filled it. Returns the number of
+        rows written.
+        """
+        day_ranges = merge_day_ranges(self._rollup_days)
+        self._rollup_days = []
+        if not day_ranges:
+            return 0
+        
+        with self.profiler.stage("rollup") as call:
+            with self.engine.begin() as connection:
+                for first_day, last_day in day_ranges:
+                    call.rows_out += sum(refresh_daily_rollups(connection, first_day, last_day).values())
+            if analyze:
+                analyze_tables(self.engine, [StreamFact.__tablename__], vacuum=True)
+        days = sum((last_day - first_day).days + 1 for first_day, last_day in day_ranges)
+        self.logger.info(f"Refreshed daily rollups for {days} days ({call.rows_out} rows)")
+        return call.rows_out
+    
+    def rebuild_rollups(self) -> int:
+        """Recompute the daily rollups from all streams, e.g. after streams were edited by hand."""
         self.create_tables()
+        with self.profiler.stage("rollup") as call:
+            with self.engine.begin() as connection:
+                call.rows_out = sum(rebuild_daily_rollups(connection).values())
+            analyze_tables(self.engine, [StreamFact.__tablename__], vacuum=True)
+        self.logger.info(f"Rebuilt daily rollups ({call.rows_out} rows)")
+        return call.rows_out
+    
+    def drop_indexes_for_bulk_load(self) -> List[Index]:
+        """Drop secondary stream indexes before a large load, if bulk load mode applies.
         
-        # Load and collect all records from all files first
-        all_records = []
+        In "auto" mode indexes are only dropped for the initial load into an
+        empty table; incremental loads keep them. Returns the dropped indexes.
+        """
+        mode = self.settings.etl.bulk_load
+        if mode == "off":
+            return []
+        if mode == "auto":
+            with self.Session() as session:
+                if session.query(SpotifyStream.id).first() is not None:
+                    return []
+        
+        indexes = secondary_indexes(SpotifyStream.__table__)
+        with self.profiler.stage("index_drop"):
+            drop_indexes(self.engine, indexes)
+        return indexes
+    
+    def missing_secondary_indexes(self) -> List[Index]:
+        """Return the secondary stream indexes declared in schema.py that do not exist."""
+        with self.engine.connect() as connection:
+            return [index for index in secondary_indexes(SpotifyStream.__table__)
+                    if not index_exists(connection, index.name)]
+    
+    def rebuild_bulk_load_indexes(self, indexes: List[Index]) -> float:
+        """Rebuild indexes dropped for a bulk load and refresh planner statistics."""
+        self.logger.info(f"Rebuilding {len(indexes)} indexes after bulk load...")
+        start = time.perf_counter()
+        concurrently = self.settings.etl.index_rebuild_concurrently
+        if concurrently and self._partition_years is not None:
+            self.logger.warning("Indexes of a partitioned table cannot be built concurrently; "
+                                "rebuilding them with a regular CREATE INDEX")
+            concurrently = False
+        with self.profiler.stage("index_rebuild"):
+            rebuild_indexes(self.engine, indexes,
+                            workers=self.settings.etl.index_rebuild_workers,
+                            concurrently=concurrently)
+        with self.profiler.stage("analyze"):
+            analyze_tables(self.engine, [SpotifyStream.__tablename__, Track.__tablename__,
+                                         Episode.__tablename__, AudiobookChapter.__tablename__])
+        seconds = round(time.perf_counter() - start, 3)
+        self.logger.info(f"Rebuilt indexes and analyzed tables in {seconds}s")
+        return seconds
+    
+    def load_files_merged(self, audio_files: List[Path], file_hashes: Dict[Path, str],
+                          files_skipped: int = 0, resume: bool = False) -> Dict[str, Any]:
+        """Load files in global timestamp order.
+        
+        Each file is sorted into bounded runs, which are then k-way merged and
+        written to the fact table in timestamp order. Progress through the
+        merged stream is checkpointed after every committed batch; the merge
+        order only depends on the parsed files, so a resumed run skips the
+        records already committed.
+        """
+        runs: List[SortedRun] = []
         all_tracks = {}
         all_episodes = {}
         all_audiobook_chapters = {}
+        manifest_entries = []
+        quarantined = {}
         
         total_stats = {
             "files_processed": 0,
+            "files_skipped": files_skipped,
             "total_records": 0,
-            "total_loaded": 0
+            "total_loaded": 0,
+            "parse_workers": self.settings.etl.parse_workers,
+            "parse_file_seconds": 0.0
         }
         
-        self.logger.info("Loading all files into memory for global timestamp sorting...")
+        run_size = self.settings.etl.sort_run_size
+        self.logger.info(f"Sorting files into runs of up to {run_size} records for global timestamp ordering...")
         
-        for file_path in audio_files:
-            try:
-                self.logger.info(f"Loading file: {file_path}")
-                raw_data = self.load_json_file(file_path)
-                records = self.validate_and_parse_records(raw_data)
-                
-                if records:
-                    all_records.extend(records)
-                    
-                    # Collect dimension data
-                    tracks, episodes, audiobook_chapters = self.extract_dimension_data(records)
-                    
-                    # Merge dimension data
-                    for track in tracks:
-                        all_tracks[track.spotify_uri] = track
-                    for episode in episodes:
-                        all_episodes[episode.spotify_uri] = episode  
-                    for chapter in audiobook_chapters:
-                        all_audiobook_chapters[chapter.chapter_uri] = chapter
+        with tempfile.TemporaryDirectory(prefix="spotify_runs_", dir=self.settings.etl.spill_directory) as spill_dir:
+            spill_path = Path(spill_dir)
+            
+            parse_start = time.perf_counter()
+            for parsed in self.parse_files(audio_files, run_size, spill_path):
+                runs.extend(parsed.runs)
+                all_tracks.update(parsed.tracks)
+                all_episodes.update(parsed.episodes)
+                all_audiobook_chapters.update(parsed.audiobook_chapters)
+                if parsed.quarantined:
+                    quarantined[parsed.file_path.name] = parsed.quarantined
+                manifest_entries.append(
+                    self._manifest_entry(parsed.file_path, file_hashes[parsed.file_path],
+                                         parsed.record_count, parsed.valid_count)
+                )
                 
                 total_stats["files_processed"] += 1
-                total_stats["total_records"] += len(raw_data)
+                total_stats["total_records"] += parsed.record_count
+                total_stats["parse_file_seconds"] += parsed.seconds
+                self.profiler.merge(parsed.profile)
+            
+            total_stats["parse_seconds"] = round(time.perf_counter() - parse_start, 3)
+            total_stats["parse_file_seconds"] = round(total_stats["parse_file_seconds"], 3)
+            # Average number of files being parsed at once; not a speedup over a serial run,
+            # since parsing a file takes longer while other workers compete for the CPU
+            total_stats["parse_parallelism"] = (
+                round(total_stats["parse_file_seconds"] / total_stats["parse_seconds"], 2)
+                if total_stats["parse_seconds"] > 0 else 1.0
+            )
+            self.logger.info(f"Parsed {total_stats['files_processed']} files in {total_stats['parse_seconds']}s "
+                             f"({total_stats['parse_parallelism']} files parsed at once on average)")
+            total_stats["quarantined_records"] = self.write_quarantine(quarantined)
+            
+            total_valid = sum(run.count for run in runs)
+            if not total_valid:
+                self.logger.warning("No valid records found across all files")
+                return total_stats
+            
+            # The merged order is determined by the parsed files and their order
+            merge_key = hashlib.sha256(
+                "".join(entry["content_hash"] for entry in manifest_entries).encode()
+            ).hexdigest()
+            merge_name = f"merge of {len(manifest_entries)} files"
+            checkpoint = self.load_checkpoints([merge_key]).get(merge_key) if resume else None
+            start = checkpoint["committed_offset"] if checkpoint else 0
+            if start:
+                self.logger.info(f"Resuming from checkpoint: skipping {start} committed records")
+            
+            self.logger.info(f"Merging {len(runs)} sorted runs ({total_valid} records) by timestamp...")
+            
+            # Load dimension tables first
+            with self.Session() as session:
+                self.load_dimension_tables(session, list(all_tracks.values()), 
+                                         list(all_episodes.values()), 
+                                         list(all_audiobook_chapters.values()))
                 
+                # Stream the merged runs into the fact table in timestamp order,
+                # merging the next batch while the previous one is written
+                write_totals = {"loaded": 0, "seconds": 0.0}
+                # Batches after the first one that could not be written are not written either,
+                # so the checkpoint covers exactly the committed records and a resume replays none
+                progress = {"offset": start, "blocked": False}
+                
+                def write(chunk: StreamColumns) -> None:
+                    if progress["blocked"]:
+                        self.write_counters["failed"] += len(chunk)
+                        return
+                    failed_before = self.write_counters["failed"]
+                    write_start = time.perf_counter()
+                    write_totals["loaded"] += self.load_stream_data(session, chunk)
+                    write_totals["seconds"] += time.perf_counter() - write_start
+                    
+                    if self.write_counters["failed"] != failed_before:
+                        progress["blocked"] = True
+                    if not progress["blocked"]:
+                        progress["offset"] += len(chunk)
+                        self.save_checkpoint(session, merge_key, merge_name, progress["offset"])
+                
+                pipeline = Pipeline(
+                    "merge", self._merged_batches(runs, start), [("writer", write)],
+                    queue_size=self.settings.etl.pipeline_queue_size, row_count=len
+                )
+                total_stats["pipeline"] = pipeline.run()
+                loaded_count = write_totals["loaded"]
+                write_seconds = write_totals["seconds"]
+                self.logger.info(f"Pipeline bottleneck: {total_stats['pipeline']['bottleneck']} stage")
+        
+        # Only remember files whose streams were all written, so failed files are retried
+        if self.write_counters["failed"]:
+            self.logger.warning(f"{self.write_counters['failed']} streams failed to load; "
+                                f"files will not be marked as ingested. Run again with --resume "
+                                f"to continue from record {progress['offset']}")
+        else:
+            self.record_ingested_files(manifest_entries)
+            self.clear_checkpoints([merge_key])
+        
+        total_stats["total_loaded"] = loaded_count
+        total_stats["total_duplicates"] = self.write_counters["duplicates"]
+        total_stats.update(self._write_stats(loaded_count, write_seconds))
+        total_stats["tracks"] = len(all_tracks)
+        total_stats["episodes"] = len(all_episodes)
+        total_stats["audiobook_chapters"] = len(all_audiobook_chapters)
+        
+        self.logger.info(f"Load complete: {total_stats}")
+        return total_stats
+    
+    def _merged_batches(self, runs: List[SortedRun], start: int = 0) -> Iterator[StreamColumns]:
+        """Merge sorted runs and yield the result in write batches, skipping the first start records."""
+        merged = islice(merge_runs(runs), start, None)
+        batch_size = self.settings.etl.batch_size
+        while True:
+            with self.profiler.stage("merge") as call:
+                rows = [(chunk, row) for _, chunk, row in islice(merged, batch_size)]
+                batch = StreamColumns.gather(rows)
+                call.rows_out = len(batch)
+            if not rows:
+                return
+            yield batch
+    
+    def parse_files(self, audio_files: List[Path], run_size: int, spill_dir: Path) -> Iterator[ParsedFile]:
+        """Parse and validate files into sorted runs, in worker processes when configured.
+        
+        Results are yielded in the order of audio_files so that the merge keeps
+        the export order for streams with equal timestamps.
+        """
+        workers = min(self.settings.etl.parse_workers, len(audio_files))
+        
+        if workers <= 1:
+            for file_path in audio_files:
+                try:
+                    self.logger.info(f"Loading file: {file_path}")
+                    # Only the final file's last run can stay in memory until the merge
+                    yield parse_file(file_path, run_size, spill_dir, keep_last_run=file_path == audio_files[-1],
+                                     batch_validation=self.settings.etl.batch_validation,
+                                     trace_memory=self.settings.etl.profile_memory)
+                except Exception as e:
+                    self.logger.error(f"Failed to process {file_path}: {e}")
+            return
+        
+        self.logger.info(f"Parsing {len(audio_files)} files with {workers} worker processes...")
+        # Spawned workers do not inherit this process's database connections
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            remaining = iter(audio_files)
+            pending: Deque[Tuple[Path, Future]] = deque()
+            
+            def submit_next() -> None:
+                file_path = next(remaining, None)
+                if file_path is not None:
+                    pending.append((file_path, pool.submit(
+                        parse_file, file_path, run_size, spill_dir,
+                        batch_validation=self.settings.etl.batch_validation,
+                        trace_memory=self.settings.etl.profile_memory
+                    )))
+            
+            # At most one file per worker is in flight, so finished results with their
+            # dimension rows do not pile up while the caller consumes earlier ones
+            for _ in range(workers):
+                submit_next()
+            while pending:
+                file_path, future = pending.popleft()
+                submit_next()
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    self.logger.error(f"Failed to process {file_path}: {e}")
+                    continue
+                self.logger.info(f"Parsed {file_path.name}: {parsed.valid_count}/{parsed.record_count} valid records")
+                yield parsed
+    
+    def load_files_streaming(self, audio_files: List[Path], file_hashes: Dict[Path, str],
+                             files_skipped: int = 0, resume: bool = False) -> Dict[str, Any]:
+        """Load files batch by batch so peak memory is bounded by the batch size.
+        
+        Batches flow through reader, validator, dimension extractor and writer
+        stages running on their own threads, so database writes overlap with
+        reading and validating the following batches. Only the URIs of dimension
+        rows already committed by the writer are kept across batches. Records are
+        ordered within each batch and files are processed in export order, which
+        keeps inserts close to chronological.
+        
+        The offset of each file up to which all batches are committed is
+        checkpointed together with the record counts up to it, so a resumed run
+        starts each file after its checkpoint and still records the counts of
+        the whole file. Once a batch of a file could not be written, its later
+        batches are not written either, so the committed records are exactly
+        those before the checkpoint.
+        """
+        total_stats = {
+            "files_processed": 0,
+            "files_skipped": files_skipped,
+            "total_records": 0,
+            "total_loaded": 0,
+            "quarantined_records": 0
+        }
+        seen_tracks = set()
+        seen_episodes = set()
+        seen_audiobook_chapters = set()
+        write_totals = {"loaded": 0, "seconds": 0.0}
+        file_state: Dict[Path, Dict[str, Any]] = {}
+        
+        start_offsets = {}
+        checkpoints = {}
+        if resume:
+            checkpoints = self.load_checkpoints([file_hashes[file_path] for file_path in audio_files])
+            for file_path in audio_files:
+                checkpoint = checkpoints.get(file_hashes[file_path])
+                if checkpoint and checkpoint["committed_offset"]:
+                    start_offsets[file_path] = checkpoint["committed_offset"]
+                    self.logger.info(f"Resuming {file_path.name} from checkpoint at record {start_offsets[file_path]}")
+        
+        def validate(batch: StreamBatch) -> StreamBatch:
+            if batch.raw:
+                records = self.validate_and_parse_records(batch.raw, start_index=batch.offset,
+                                                          quarantine=batch.quarantined)
+                with self.profiler.stage("columnar", rows_in=len(records)) as call:
+                    columns = StreamColumns.from_records(records)
+                    call.rows_out = len(columns)
+                with self.profiler.stage("sort", rows_in=len(columns)) as call:
+                    batch.columns = columns.sorted_by_ts()
+                    call.rows_out = len(batch.columns)
+            return batch
+        
+        def extract(batch: StreamBatch) -> StreamBatch:
+            # Only write dimension rows not already written by an earlier batch
+            if len(batch.columns):
+                with self.profiler.stage("dimension_extract", rows_in=len(batch.columns)) as call:
+                    tracks, episodes, audiobook_chapters = extract_dimensions(batch.columns)
+                    batch.tracks = [t for uri, t in tracks.items() if uri not in seen_tracks]
+                    batch.episodes = [e for uri, e in episodes.items() if uri not in seen_episodes]
+                    batch.audiobook_chapters = [c for uri, c in audiobook_chapters.items()
+                                                if uri not in seen_audiobook_chapters]
+                    call.rows_out = len(batch.tracks) + len(batch.episodes) + len(batch.audiobook_chapters)
+            return batch
+        
+        def write(batch: StreamBatch) -> None:
+            if batch.file_path not in file_state:
+                checkpoint = checkpoints.get(file_hashes[batch.file_path]) or {}
+                file_state[batch.file_path] = {
+                    "blocked": False,
+                    "record_count": checkpoint.get("record_count") or 0,
+                    "valid_count": checkpoint.get("valid_count") or 0,
+                    "quarantined": []
+                }
+            state = file_state[batch.file_path]
+            total_stats["total_records"] += len(batch.raw)
+            
+            if batch.end_of_file:
+                self._finish_streamed_file(batch, state, file_hashes, total_stats)
+                del file_state[batch.file_path]
+                return
+            if state["blocked"]:
+                self.write_counters["failed"] += len(batch.columns)
+                return
+            
+            # The extractor runs ahead of the writer, so rows committed since it filtered the batch are dropped here
+            tracks = [t for t in batch.tracks if t.spotify_uri not in seen_tracks]
+            episodes = [e for e in batch.episodes if e.spotify_uri not in seen_episodes]
+            audiobook_chapters = [c for c in batch.audiobook_chapters if c.chapter_uri not in seen_audiobook_chapters]
+            failed_before = self.write_counters["failed"]
+            if tracks or episodes or audiobook_chapters:
+                # URIs are only skipped by later batches once their rows are committed
+                if self.load_dimension_tables(session, tracks, episodes, audiobook_chapters):
+                    seen_tracks.update(t.spotify_uri for t in tracks)
+                    seen_episodes.update(e.spotify_uri for e in episodes)
+                    seen_audiobook_chapters.update(c.chapter_uri for c in audiobook_chapters)
+            if len(batch.columns):
+                write_start = time.perf_counter()
+                write_totals["loaded"] += self.load_stream_data(session, batch.columns)
+                write_totals["seconds"] += time.perf_counter() - write_start
+            
+            if self.write_counters["failed"] != failed_before:
+                state["blocked"] = True
+                return
+            state["record_count"] += len(batch.raw)
+            state["valid_count"] += len(batch.columns)
+            state["quarantined"].extend(batch.quarantined)
+            self.save_checkpoint(session, file_hashes[batch.file_path], batch.file_path.name,
+                                 batch.offset + len(batch.raw), record_count=state["record_count"],
+                                 valid_count=state["valid_count"])
+        
+        self.logger.info("Streaming files in bounded batches through the ingest pipeline...")
+        
+        with self.Session() as session:
+            pipeline = Pipeline(
+                "reader", self._read_file_batches(audio_files, start_offsets),
+                [("validator", validate), ("dimensions", extract), ("writer", write)],
+                queue_size=self.settings.etl.pipeline_queue_size,
+                row_count=lambda batch: len(batch.raw)
+            )
+            total_stats["pipeline"] = pipeline.run()
+        
+        total_stats["total_loaded"] = write_totals["loaded"]
+        total_stats["total_duplicates"] = self.write_counters["duplicates"]
+        total_stats.update(self._write_stats(write_totals["loaded"], write_totals["seconds"]))
+        total_stats["tracks"] = len(seen_tracks)
+        total_stats["episodes"] = len(seen_episodes)
+        total_stats["audiobook_chapters"] = len(seen_audiobook_chapters)
+        
+        self.logger.info(f"Pipeline bottleneck: {total_stats['pipeline']['bottleneck']} stage")
+        self.logger.info(f"Load complete: {total_stats}")
+        return total_stats
+    
+    def _read_file_batches(self, audio_files: List[Path],
+                           start_offsets: Optional[Dict[Path, int]] = None) -> Iterator[StreamBatch]:
+        """Read each file as raw batches, followed by an end-of-file marker.
+        
+        Files listed in start_offsets are read from that record onwards.
+        """
+        start_offsets = start_offsets or {}
+        for file_path in audio_files:
+            offset = start_offsets.get(file_path, 0)
+            try:
+                for raw_batch in self.profiler.iterate("json_parse", self.iter_json_batches(file_path, start=offset)):
+                    yield StreamBatch(file_path, offset, raw_batch)
+                    offset += len(raw_batch)
             except Exception as e:
                 self.logger.error(f"Failed to process {file_path}: {e}")
+                yield StreamBatch(file_path, offset, [], end_of_file=True, failed=True)
                 continue
+            yield StreamBatch(file_path, offset, [], end_of_file=True)
+    
+    def _finish_streamed_file(self, marker: StreamBatch, state: Dict[str, Any],
+                              file_hashes: Dict[Path, str], total_stats: Dict[str, Any]):
+        """Write quarantine entries and the manifest row once a streamed file is complete."""
+        file_path = marker.file_path
+        total_stats["quarantined_records"] += self.write_quarantine({file_path.name: state["quarantined"]})
+        if marker.failed:
+            return
+        if not state["blocked"]:
+            self.record_ingested_files([
+                self._manifest_entry(file_path, file_hashes[file_path], state["record_count"], state["valid_count"])
+            ])
+            self.clear_checkpoints([file_hashes[file_path]])
+        else:
+            self.logger.warning(f"Some streams of {file_path.name} failed to load; "
+                                f"run again with --resume to continue from its checkpoint")
+        total_stats["files_processed"] += 1
+    
+    def load_files_staged(self, audio_files: List[Path], file_hashes: Dict[Path, str],
+                          files_skipped: int = 0) -> Dict[str, Any]:
+        """Load files through an UNLOGGED staging table and merge them in SQL.
         
-        if not all_records:
-            self.logger.warning("No valid records found across all files")
-            return total_stats
+        Validated records are copied batch by batch into the staging table
+        without building dimension rows or sorting in Python. Dimension tables
+        and the fact table are then filled from the staging table by a few
+        set-based statements in one transaction, so a failed load leaves the
+        permanent tables untouched.
+        """
+        total_stats = {
+            "files_processed": 0,
+            "files_skipped": files_skipped,
+            "total_records": 0,
+            "total_loaded": 0,
+            "quarantined_records": 0
+        }
+        manifest_entries = []
+        file_state: Dict[Path, Dict[str, Any]] = {}
+        staged = {"rows": 0}
         
-        # Sort all records globally by timestamp for proper chronological order
-        self.logger.info(f"Sorting {len(all_records)} records globally by timestamp...")
-        all_records.sort(key=lambda x: x.ts)
+        def validate(batch: StreamBatch) -> StreamBatch:
+            if batch.raw:
+                records = self.validate_and_parse_records(batch.raw, start_index=batch.offset,
+                                                          quarantine=batch.quarantined)
+                with self.profiler.stage("columnar", rows_in=len(records)) as call:
+                    batch.columns = StreamColumns.from_records(records)
+                    call.rows_out = len(batch.columns)
+            return batch
         
-        # Load dimension tables first
-        with self.Session() as session:
-            self.load_dimension_tables(session, list(all_tracks.values()), 
-                                     list(all_episodes.values()), 
-                                     list(all_audiobook_chapters.values()))
+        def stage(batch: StreamBatch) -> None:
+            state = file_state.setdefault(batch.file_path, {"valid_count": 0, "quarantined": []})
+            total_stats["total_records"] += len(batch.raw)
+            state["valid_count"] += len(batch.columns)
+            state["quarantined"].extend(batch.quarantined)
             
-            # Load all streaming data in timestamp order
-            loaded_count = self.load_stream_data(session, all_records)
+            if batch.end_of_file:
+                total_stats["quarantined_records"] += self.write_quarantine(
+                    {batch.file_path.name: state["quarantined"]}
+                )
+                if not batch.failed:
+                    manifest_entries.append(self._manifest_entry(
+                        batch.file_path, file_hashes[batch.file_path], batch.offset, state["valid_count"]
+                    ))
+                    total_stats["files_processed"] += 1
+                del file_state[batch.file_path]
+                return
             
-        total_stats["total_loaded"] = loaded_count
-        total_stats["tracks"] = len(all_tracks)
-        total_stats["episodes"] = len(all_episodes)
-        total_stats["audiobook_chapters"] = len(all_audiobook_chapters)
+            with self.profiler.stage("staging_copy", rows_in=len(batch.columns)) as call:
+                call.rows_out = copy_to_staging(connection, batch.columns, staged["rows"])
+            staged["rows"] += call.rows_out
+        
+        self.logger.info("Copying validated records into the staging table...")
+        
+        with self.engine.connect() as connection:
+            prepare_staging_table(connection)
+            stage_start = time.perf_counter()
+            pipeline = Pipeline(
+                "reader", self._read_file_batches(audio_files),
+                [("validator", validate), ("staging", stage)],
+                queue_size=self.settings.etl.pipeline_queue_size,
+                row_count=lambda batch: len(batch.raw)
+            )
+            total_stats["pipeline"] = pipeline.run()
+            connection.commit()
+            total_stats["staging_seconds"] = round(time.perf_counter() - stage_start, 3)
+            
+            self.logger.info(f"Merging {staged['rows']} staged records into permanent tables...")
+            merge_start = time.perf_counter()
+            try:
+                first_ts, last_ts = staged_ts_range(connection)
+                if first_ts is not None:
+                    self.ensure_stream_partitions(connection, first_ts, last_ts)
+                with self.profiler.stage("staging_merge", rows_in=staged["rows"]) as call:
+                    inserted = merge_staging(connection)
+                    connection.commit()
+                    call.rows_out = sum(inserted.values())
+                if inserted["streams"]:
+                    self._rollup_days.append((utc_day(first_ts), utc_day(last_ts)))
+            except Exception:
+                connection.rollback()
+                raise
+            merge_seconds = time.perf_counter() - merge_start
+        
+        self.record_ingested_files(manifest_entries)
+        
+        total_stats["total_loaded"] = inserted["streams"]
+        total_stats["total_duplicates"] = staged["rows"] - inserted["streams"]
+        total_stats.update(self._write_stats(inserted["streams"], merge_seconds))
+        total_stats["tracks"] = inserted["tracks"]
+        total_stats["episodes"] = inserted["episodes"]
+        total_stats["audiobook_chapters"] = inserted["audiobook_chapters"]
         
         self.logger.info(f"Load complete: {total_stats}")
-        return total_stats
\ No newline at end of file
+        return total_stats
+    
+    def _write_stats(self, loaded_count: int, write_seconds: float) -> Dict[str, Any]:
+        """Summarize fact table write throughput."""
+        return {
+            "write_method": self.settings.etl.write_method if self._copy_supported else "orm",
+            "write_seconds": round(write_seconds, 3),
+            "rows_per_sec": round(loaded_count / write_seconds, 1) if write_seconds > 0 else 0.0
+        }
\ No newline at end of file
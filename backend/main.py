@@ -1,7 +1,10 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from config.settings import get_settings
+from services.event_loop_monitor import event_loop_monitor
+from services.result_cache import result_cache
 from routers import basicAnalytics, musicAnalytics, podcastAnalytics, listeningPatternsAnalytics, discoveryAndVarietyAnalytics
 from datetime import datetime, timezone
 from fastapi.exceptions import RequestValidationError
@@ -9,10 +12,17 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 settings = get_settings()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    event_loop_monitor.start()
+    yield
+    await event_loop_monitor.stop()
+
 app = FastAPI(
     title="Spotify Listening Intelligence API",
     description="API for analyzing personal Spotify streaming data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -75,7 +85,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "event_loop_lag": event_loop_monitor.get_stats(),
+        "result_cache": result_cache.get_stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func
 from database.connection import get_db
-from database.schema import SpotifyStream
+from database.schema import SpotifyStream, DatasetCatalog, ContentType
+from services.result_cache import result_cache
 from pydantic import BaseModel, Field, computed_field, ConfigDict
 from typing import Optional, List
 
@@ -54,6 +55,15 @@ class StatsOverviewResponse(BaseModel):
     episodes: ContentStats = Field(..., description="Podcast episode statistics")
     audiobooks: ContentStats = Field(..., description="Audiobook statistics")
 
+class YearStatsOverview(StatsOverviewResponse):
+    year: int = Field(..., description="Calendar year of the statistics")
+
+class StatsOverviewByYearResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    all_time: StatsOverviewResponse = Field(..., description="Listening statistics of all years")
+    years: List[YearStatsOverview] = Field(..., description="Listening statistics per year, latest first")
+
 class AvailableYearsResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
@@ -74,8 +84,64 @@ class FirstPlayResponse(BaseModel):
     played_at: Optional[str] = Field(None, description="ISO timestamp of first play")
 
 
+def _overview_query(db: Session):
+    """Totals per content type and the date range of the catalog rows, aggregated in one pass."""
+    
+    def content_totals(label, *conditions):
+        total_ms = func.sum(DatasetCatalog.total_ms)
+        stream_count = func.sum(DatasetCatalog.stream_count)
+        if conditions:
+            total_ms, stream_count = total_ms.filter(*conditions), stream_count.filter(*conditions)
+        return func.coalesce(total_ms, 0).label(f'{label}_ms'), func.coalesce(stream_count, 0).label(f'{label}_count')
+    
+    return db.query(
+        func.min(DatasetCatalog.first_ts).label('first_stream'),
+        func.max(DatasetCatalog.last_ts).label('last_stream'),
+        *content_totals('total'),
+        *content_totals('music', DatasetCatalog.content_type == ContentType.MUSIC),
+        *content_totals('episodes', DatasetCatalog.content_type == ContentType.EPISODE),
+        *content_totals('audiobooks', DatasetCatalog.content_type == ContentType.AUDIOBOOK)
+    )
+
+def _ms_to_time_units(ms):
+    if not ms:
+        return TimeUnits(hours=0, days=0.0)
+    hours = round(ms / (1000 * 60 * 60))
+    days = round(hours / 24, 1)
+    return TimeUnits(hours=hours, days=days)
+
+def _overview_response(row, model=StatsOverviewResponse, **fields) -> StatsOverviewResponse:
+    """Build the overview from a row of _overview_query."""
+    
+    # Calculate days between first and last stream
+    streaming_days = 0
+    if row.first_stream and row.last_stream:
+        streaming_days = (row.last_stream - row.first_stream).days + 1
+    
+    def content_stats(label):
+        total_ms = int(getattr(row, f'{label}_ms'))
+        return ContentStats(
+            listening_time=_ms_to_time_units(total_ms),
+            total_ms=total_ms,
+            stream_count=int(getattr(row, f'{label}_count'))
+        )
+    
+    return model(
+        time_period=TimePeriod(
+            first_stream=row.first_stream.isoformat() if row.first_stream else None,
+            last_stream=row.last_stream.isoformat() if row.last_stream else None,
+            streaming_days=streaming_days
+        ),
+        total=content_stats('total'),
+        music=content_stats('music'),
+        episodes=content_stats('episodes'),
+        audiobooks=content_stats('audiobooks'),
+        **fields
+    )
+
 @router.get("/stats/overview", response_model=StatsOverviewResponse)
-async def get_stats_overview(
+@result_cache.cached
+def get_stats_overview(
     year: Optional[int] = None, 
     db: Session = Depends(get_db)
 ) -> StatsOverviewResponse:
@@ -87,96 +153,35 @@ async def get_stats_overview(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    # Base query with optional year filter
-    base_query = db.query(SpotifyStream)
+    overview_query = _overview_query(db)
     if query_params.year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == query_params.year)
-    
-    # Get date range of streaming data
-    date_range = base_query.with_entities(
-        func.min(SpotifyStream.ts).label('first_stream'),
-        func.max(SpotifyStream.ts).label('last_stream')
-    ).first()
-    
-    # Total stats for all content
-    total_stats = base_query.with_entities(
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('total_streams')
-    ).first()
-    
-    # Music tracks stats  
-    music_stats = base_query.filter(
-        SpotifyStream.spotify_track_uri.isnot(None)
-    ).with_entities(
-        func.sum(SpotifyStream.ms_played).label('music_ms'),
-        func.count(SpotifyStream.id).label('music_streams')
-    ).first()
-    
-    # Episodes stats
-    episode_stats = base_query.filter(
-        SpotifyStream.spotify_episode_uri.isnot(None)
-    ).with_entities(
-        func.sum(SpotifyStream.ms_played).label('episode_ms'),
-        func.count(SpotifyStream.id).label('episode_streams')
-    ).first()
-    
-    # Audiobook stats
-    audiobook_stats = base_query.filter(
-        SpotifyStream.audiobook_chapter_uri.isnot(None)
-    ).with_entities(
-        func.sum(SpotifyStream.ms_played).label('audiobook_ms'),
-        func.count(SpotifyStream.id).label('audiobook_streams')
-    ).first()
+        overview_query = overview_query.filter(DatasetCatalog.year == query_params.year)
     
-    # Calculate days between first and last stream
-    streaming_days = 0
-    if date_range.first_stream and date_range.last_stream:
-        streaming_days = (date_range.last_stream - date_range.first_stream).days + 1
-    
-    # Helper function to convert ms to hours and days
-    def ms_to_time_units(ms):
-        if not ms:
-            return TimeUnits(hours=0, days=0.0)
-        hours = round(ms / (1000 * 60 * 60))
-        days = round(hours / 24, 1)
-        return TimeUnits(hours=hours, days=days)
-    
-    return StatsOverviewResponse(
-        time_period=TimePeriod(
-            first_stream=date_range.first_stream.isoformat() if date_range.first_stream else None,
-            last_stream=date_range.last_stream.isoformat() if date_range.last_stream else None,
-            streaming_days=streaming_days
-        ),
-        total=ContentStats(
-            listening_time=ms_to_time_units(total_stats.total_ms or 0),
-            total_ms=total_stats.total_ms or 0,
-            stream_count=total_stats.total_streams or 0
-        ),
-        music=ContentStats(
-            listening_time=ms_to_time_units(music_stats.music_ms or 0),
-            total_ms=music_stats.music_ms or 0,
-            stream_count=music_stats.music_streams or 0
-        ),
-        episodes=ContentStats(
-            listening_time=ms_to_time_units(episode_stats.episode_ms or 0),
-            total_ms=episode_stats.episode_ms or 0,
-            stream_count=episode_stats.episode_streams or 0
-        ),
-        audiobooks=ContentStats(
-            listening_time=ms_to_time_units(audiobook_stats.audiobook_ms or 0),
-            total_ms=audiobook_stats.audiobook_ms or 0,
-            stream_count=audiobook_stats.audiobook_streams or 0
-        )
+    return _overview_response(overview_query.one())
+
+@router.get("/stats/overview/by-year", response_model=StatsOverviewByYearResponse)
+@result_cache.cached
+def get_stats_overview_by_year(db: Session = Depends(get_db)) -> StatsOverviewByYearResponse:
+    """Get the listening statistics overview of all time and of every year at once"""
+    
+    # ROLLUP puts the all-time row, whose year is NULL, first; it is returned even without data
+    rows = _overview_query(db).add_columns(DatasetCatalog.year).\
+        group_by(func.rollup(DatasetCatalog.year)).\
+        order_by(DatasetCatalog.year.desc().nulls_first()).\
+        all()
+    
+    return StatsOverviewByYearResponse(
+        all_time=_overview_response(rows[0]),
+        years=[_overview_response(row, YearStatsOverview, year=row.year) for row in rows[1:]]
     )
 
 @router.get("/stats/available-years", response_model=AvailableYearsResponse)
-async def get_available_years(db: Session = Depends(get_db)) -> AvailableYearsResponse:
+@result_cache.cached
+def get_available_years(db: Session = Depends(get_db)) -> AvailableYearsResponse:
     """Get list of years with streaming data"""
     
-    # Get distinct years from streaming data
-    years_query = db.query(
-        extract('year', SpotifyStream.ts).label('year')
-    ).distinct().order_by(extract('year', SpotifyStream.ts).desc())
+    # Years with streams from the dataset catalog
+    years_query = db.query(DatasetCatalog.year).distinct().order_by(DatasetCatalog.year.desc())
     
     years = [int(year[0]) for year in years_query.all()]
     
@@ -186,15 +191,19 @@ async def get_available_years(db: Session = Depends(get_db)) -> AvailableYearsRe
     )
 
 @router.get("/stats/first-play", response_model=FirstPlayResponse)
-async def get_first_play(
+@result_cache.cached
+def get_first_play(
     db: Session = Depends(get_db)
 ) -> FirstPlayResponse:
     """Return the first played song (track, artist) and when it began."""
 
-    first_row = db.query(SpotifyStream).\
-        filter(SpotifyStream.spotify_track_uri.isnot(None)).\
-        order_by(SpotifyStream.ts.asc()).\
-        limit(1).\
+    # The catalog knows the first music stream of every year, so only one stream is read
+    first_music = db.query(DatasetCatalog.first_stream_id, DatasetCatalog.first_ts).\
+        filter(DatasetCatalog.content_type == ContentType.MUSIC).\
+        order_by(DatasetCatalog.first_ts.asc(), DatasetCatalog.first_stream_id.asc()).\
+        first()
+    first_row = first_music and db.query(SpotifyStream).\
+        filter(SpotifyStream.id == first_music.first_stream_id, SpotifyStream.ts == first_music.first_ts).\
         first()
     if not first_row:
         return FirstPlayResponse(track_name=None, artist_name=None, played_at=None)
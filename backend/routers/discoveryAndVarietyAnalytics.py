@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from database.connection import get_db
-from database.schema import SpotifyStream, Track, Artist
+from sqlalchemy import func, cast, BigInteger
+from database.connection import get_db, run_db
+from database.period_filters import filter_year
+from database.rollups import filter_days, year_days
+from database.schema import StreamFact, ContentType, Track, Artist, DailyCountryStats
 from pydantic import BaseModel, Field, field_validator, computed_field, ConfigDict, ValidationError
 from typing import Optional, List
 from services.spotify_batch_service import spotify_batch_service
+from services.result_cache import result_cache
 
 router = APIRouter()
 
@@ -75,7 +78,8 @@ class TopGernesResponse(BaseModel):
 
 
 @router.get("/worldmap", response_model=GeoListeningResponse)
-async def get_listening_worldmap(
+@result_cache.cached
+def get_listening_worldmap(
     year: Optional[int] = None,
     db: Session = Depends(get_db)
 ) -> GeoListeningResponse:
@@ -90,20 +94,16 @@ async def get_listening_worldmap(
     except ValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
-    # Base query with optional year filter
-    base_query = db.query(SpotifyStream)
-    if year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == year)
-
-    # Aggregate by country
-    rows = base_query.with_entities(
-        func.upper(SpotifyStream.conn_country).label('country'),
-        func.count(SpotifyStream.id).label('stream_count'),
-        func.sum(SpotifyStream.ms_played).label('total_ms')
-    ).group_by(
-        func.upper(SpotifyStream.conn_country)
+    # Aggregate by country from the daily rollup, with optional year filter
+    query = db.query(
+        DailyCountryStats.country.label('country'),
+        func.sum(DailyCountryStats.stream_count).label('stream_count'),
+        func.sum(DailyCountryStats.total_ms).label('total_ms')
+    )
+    rows = filter_days(query, year_days(year), DailyCountryStats.day).group_by(
+        DailyCountryStats.country
     ).order_by(
-        func.sum(SpotifyStream.ms_played).desc()
+        func.sum(DailyCountryStats.total_ms).desc()
     ).all()
 
     countries: List[GeoCountryStat] = []
@@ -133,6 +133,7 @@ async def get_listening_worldmap(
     )
 
 @router.get("/topGenres", response_model=TopGernesResponse)
+@result_cache.cached
 async def get_top_genres(
     year: Optional[int] = None,
     limit: int = 50,
@@ -151,32 +152,43 @@ async def get_top_genres(
     except (ValidationError, ValueError) as e:
         raise HTTPException(status_code=422, detail=str(e))
 
-    # Aggregate at artist level (streams -> track -> artist)
-    query = db.query(
-        Artist.spotify_id.label('artist_id'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('stream_count')
-    ).select_from(SpotifyStream).join(
-        Track, SpotifyStream.spotify_track_uri == Track.spotify_uri
-    ).join(
-        Artist, Track.artist_spotify_id == Artist.spotify_id
+    # Aggregate per track on the integer keys of stream_facts
+    track_totals = db.query(
+        StreamFact.track_id,
+        func.sum(StreamFact.ms_played).label('total_ms'),
+        func.count().label('stream_count')
     ).filter(
-        SpotifyStream.spotify_track_uri.isnot(None),
-        SpotifyStream.ms_played >= 5000
+        StreamFact.content_type == ContentType.MUSIC,
+        StreamFact.ms_played >= 5000
     )
 
-    if year is not None:
-        query = query.filter(extract('year', SpotifyStream.ts) == year)
+    track_totals = filter_year(track_totals, year, column=StreamFact.ts)
+
+    track_totals = track_totals.group_by(
+        StreamFact.track_id
+    ).subquery()
 
-    artist_rows = query.group_by(
+    # Then at artist level (tracks -> artist)
+    query = db.query(
+        Artist.spotify_id.label('artist_id'),
+        cast(func.sum(track_totals.c.total_ms), BigInteger).label('total_ms'),
+        cast(func.sum(track_totals.c.stream_count), BigInteger).label('stream_count')
+    ).select_from(track_totals).join(
+        Track, Track.id == track_totals.c.track_id
+    ).join(
+        Artist, Track.artist_spotify_id == Artist.spotify_id
+    ).group_by(
         Artist.spotify_id
-    ).all()
+    )
+    artist_rows = await run_db(query.all)
 
     # Build mapping of artist_id -> genres, first from DB
     artist_id_to_genres = {}
     artist_ids = [row.artist_id for row in artist_rows]
     if artist_ids:
-        db_artists = db.query(Artist.spotify_id, Artist.genres).filter(Artist.spotify_id.in_(artist_ids)).all()
+        db_artists = await run_db(
+            db.query(Artist.spotify_id, Artist.genres).filter(Artist.spotify_id.in_(artist_ids)).all
+        )
         for spotify_id, genres in db_artists:
             if isinstance(genres, list) and len(genres) > 0:
                 artist_id_to_genres[spotify_id] = genres
@@ -188,14 +200,17 @@ async def get_top_genres(
             spotify_id_to_artist = {artist.id: artist for artist in batch_artists}
 
             # Persist fetched genres back into DB for future queries
-            for artist_id in missing_artist_ids:
-                spotify_artist = spotify_id_to_artist.get(artist_id)
-                if spotify_artist and spotify_artist.genres:
-                    artist_id_to_genres[artist_id] = spotify_artist.genres
-                    db_artist = db.query(Artist).filter(Artist.spotify_id == artist_id).first()
-                    if db_artist:
-                        db_artist.genres = spotify_artist.genres
-            db.commit()
+            def save_genres():
+                for artist_id in missing_artist_ids:
+                    spotify_artist = spotify_id_to_artist.get(artist_id)
+                    if spotify_artist and spotify_artist.genres:
+                        artist_id_to_genres[artist_id] = spotify_artist.genres
+                        db_artist = db.query(Artist).filter(Artist.spotify_id == artist_id).first()
+                        if db_artist:
+                            db_artist.genres = spotify_artist.genres
+                db.commit()
+
+            await run_db(save_genres)
         except Exception as e:
             # If external fetch fails, proceed with available data
             pass
@@ -224,13 +239,12 @@ async def get_top_genres(
     sorted_items = sorted(genre_totals.items(), key=lambda kv: kv[1]['total_ms'], reverse=True)[:limit]
 
     # Denominator: total streamed music time for the selected period (all tracks with Spotify URI)
-    total_ms_all_query = db.query(func.sum(SpotifyStream.ms_played)).filter(
-        SpotifyStream.spotify_track_uri.isnot(None),
-        SpotifyStream.ms_played >= 5000
+    total_ms_all_query = db.query(func.sum(StreamFact.ms_played)).filter(
+        StreamFact.content_type == ContentType.MUSIC,
+        StreamFact.ms_played >= 5000
     )
-    if year is not None:
-        total_ms_all_query = total_ms_all_query.filter(extract('year', SpotifyStream.ts) == year)
-    total_ms_all = int(total_ms_all_query.scalar() or 0) or 1
+    total_ms_all_query = filter_year(total_ms_all_query, year, column=StreamFact.ts)
+    total_ms_all = int(await run_db(total_ms_all_query.scalar) or 0) or 1
 
     genres = [
         GenreStat(
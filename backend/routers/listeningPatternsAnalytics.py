@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, desc
-from database.connection import get_db
-from database.schema import SpotifyStream, Track, Artist
+from sqlalchemy import func, extract, desc, cast, BigInteger
+from database.connection import get_db, run_db
+from database.period_filters import filter_year
+from database.rollups import filter_days, local_hour_totals, year_days
+from database.schema import StreamFact, ContentType, StreamArtist, Track, Artist, DailyContentStats
 from services.spotify_batch_service import spotify_batch_service
 from services.spotify_service import spotify_service
+from services.result_cache import result_cache
 from pydantic import BaseModel, Field, field_validator, computed_field, ConfigDict
 from typing import Optional, List
 from datetime import datetime, timezone as dt_timezone
@@ -220,7 +223,8 @@ class ErrorResponse(BaseModel):
 
 
 @router.get("/listening-heatmap", response_model=ListeningHeatmapResponse)
-async def get_listening_heatmap(
+@result_cache.cached
+def get_listening_heatmap(
     year: Optional[int] = None, 
     timezone: str = "UTC", 
     db: Session = Depends(get_db)
@@ -233,32 +237,28 @@ async def get_listening_heatmap(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    # Base query with optional year filter
-    base_query = db.query(SpotifyStream).filter(
-      SpotifyStream.spotify_track_uri.isnot(None)
-      )
+    # Listening data grouped by day of week (PostgreSQL: 0=Sunday..6=Saturday) and hour of day,
+    # from the hourly rollup unless the timezone has sub-hour offsets
+    heatmap_data = local_hour_totals(
+        db, ContentType.MUSIC, query_params.year, query_params.timezone,
+        {'day_of_week': 'dow', 'hour_of_day': 'hour'}
+    )
     
-    if query_params.year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == query_params.year)
-    
-    # Convert timestamps to specified timezone for analysis
-    if query_params.timezone == "UTC":
-        # Use timestamps as-is (they're already in UTC)
-        ts_converted = SpotifyStream.ts
-    else:
-        # Convert UTC timestamps to specified timezone
-        ts_converted = func.timezone(query_params.timezone, SpotifyStream.ts)
-    
-    # Get listening data grouped by day of week (PostgreSQL: 0=Sunday..6=Saturday) and hour of day
-    heatmap_data = base_query.with_entities(
-        extract('dow', ts_converted).label('day_of_week'),  # PostgreSQL: 0=Sunday..6=Saturday
-        extract('hour', ts_converted).label('hour_of_day'),
-        func.count(SpotifyStream.id).label('stream_count'),
-        func.sum(SpotifyStream.ms_played).label('total_ms')
-    ).group_by(
-        extract('dow', ts_converted),
-        extract('hour', ts_converted)
-    ).all()
+    if heatmap_data is None:
+        base_query = db.query(StreamFact).filter(
+          StreamFact.content_type == ContentType.MUSIC
+          )
+        base_query = filter_year(base_query, query_params.year, query_params.timezone, column=StreamFact.ts)
+        ts_converted = func.timezone(query_params.timezone, StreamFact.ts)
+        heatmap_data = base_query.with_entities(
+            extract('dow', ts_converted).label('day_of_week'),  # PostgreSQL: 0=Sunday..6=Saturday
+            extract('hour', ts_converted).label('hour_of_day'),
+            func.count().label('stream_count'),
+            func.sum(StreamFact.ms_played).label('total_ms')
+        ).group_by(
+            extract('dow', ts_converted),
+            extract('hour', ts_converted)
+        ).all()
     
     # Initialize 7x24 matrix (7 days x 24 hours)
     # Convert Sunday (0) to index 6, Monday (1) to 0, etc.
@@ -322,8 +322,51 @@ async def get_listening_heatmap(
     )
 
 
+def _monthly_music_totals(db: Session, year: Optional[int], timezone: str):
+    """Music streams, played time and average per stream by calendar month in a timezone.
+    
+    UTC months consist of whole UTC days, so they are summed from the daily
+    rollup; other timezones are shifted from the hourly rollup, or aggregated
+    from the streams if the timezone has sub-hour offsets.
+    """
+    if timezone != "UTC":
+        totals = local_hour_totals(db, ContentType.MUSIC, year, timezone, {'year': 'year', 'month': 'month'})
+        if totals is not None:
+            return totals
+    
+    if timezone == "UTC":
+        month_year = extract('year', DailyContentStats.day)
+        month = extract('month', DailyContentStats.day)
+        query = db.query(
+            month_year.label('year'),
+            month.label('month'),
+            cast(func.sum(DailyContentStats.stream_count), BigInteger).label('stream_count'),
+            cast(func.sum(DailyContentStats.total_ms), BigInteger).label('total_ms'),
+            (func.sum(DailyContentStats.total_ms) / func.sum(DailyContentStats.stream_count)).label('avg_ms_per_stream')
+        ).filter(
+            DailyContentStats.content_type == ContentType.MUSIC
+        )
+        query = filter_days(query, year_days(year), DailyContentStats.day)
+    else:
+        ts_converted = func.timezone(timezone, StreamFact.ts)
+        month_year = extract('year', ts_converted)
+        month = extract('month', ts_converted)
+        query = db.query(
+            month_year.label('year'),
+            month.label('month'),
+            func.count().label('stream_count'),
+            func.sum(StreamFact.ms_played).label('total_ms'),
+            func.avg(StreamFact.ms_played).label('avg_ms_per_stream')
+        ).filter(
+            StreamFact.content_type == ContentType.MUSIC
+        )
+        query = filter_year(query, year, timezone, column=StreamFact.ts)
+    
+    return query.group_by(month_year, month).order_by(month_year, month).all()
+
 @router.get("/monthly-trends", response_model=MonthlyTrendsResponse)
-async def get_monthly_trends(
+@result_cache.cached
+def get_monthly_trends(
     year: Optional[int] = None, 
     timezone: str = "UTC", 
     db: Session = Depends(get_db)
@@ -336,34 +379,8 @@ async def get_monthly_trends(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    # Base query
-    base_query = db.query(SpotifyStream).filter(
-        SpotifyStream.spotify_track_uri.isnot(None)
-    )
-    
-    if year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == year)
-    
-    # Convert timestamps to specified timezone for analysis
-    if timezone == "UTC":
-        ts_converted = SpotifyStream.ts
-    else:
-        ts_converted = func.timezone(timezone, SpotifyStream.ts)
-    
     # Get monthly data
-    monthly_data = base_query.with_entities(
-        extract('year', ts_converted).label('year'),
-        extract('month', ts_converted).label('month'),
-        func.count(SpotifyStream.id).label('stream_count'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.avg(SpotifyStream.ms_played).label('avg_ms_per_stream')
-    ).group_by(
-        extract('year', ts_converted),
-        extract('month', ts_converted)
-    ).order_by(
-        extract('year', ts_converted),
-        extract('month', ts_converted)
-    ).all()
+    monthly_data = _monthly_music_totals(db, year, timezone)
     
     # Format the data
     monthly_trends = []
@@ -413,7 +430,8 @@ async def get_monthly_trends(
     )
 
 @router.get("/seasonal-trends", response_model=SeasonalTrendsResponse)
-async def get_seasonal_trends(
+@result_cache.cached
+def get_seasonal_trends(
     year: Optional[int] = None, 
     timezone: str = "UTC", 
     db: Session = Depends(get_db)
@@ -426,30 +444,8 @@ async def get_seasonal_trends(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    # Base query
-    base_query = db.query(SpotifyStream).filter(
-        SpotifyStream.spotify_track_uri.isnot(None)
-    )
-    
-    if year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == year)
-    
-    # Convert timestamps to specified timezone for analysis
-    if timezone == "UTC":
-        ts_converted = SpotifyStream.ts
-    else:
-        ts_converted = func.timezone(timezone, SpotifyStream.ts)
-    
     # Get data grouped by month first
-    monthly_data = base_query.with_entities(
-        extract('year', ts_converted).label('year'),
-        extract('month', ts_converted).label('month'),
-        func.count(SpotifyStream.id).label('stream_count'),
-        func.sum(SpotifyStream.ms_played).label('total_ms')
-    ).group_by(
-        extract('year', ts_converted),
-        extract('month', ts_converted)
-    ).all()
+    monthly_data = _monthly_music_totals(db, year, timezone)
     
     # Group by seasons
     # Spring: March, April, May (3, 4, 5)
@@ -528,6 +524,7 @@ async def get_seasonal_trends(
     )
 
 @router.get("/seasonal-top-content", response_model=SeasonalTopContentResponse)
+@result_cache.cached
 async def get_seasonal_top_content(
     season: Season,
     year: Optional[int] = None,
@@ -556,28 +553,35 @@ async def get_seasonal_top_content(
 
     months = months_by_season[season]
 
-    # Base query and time conversions
-    base_query = db.query(SpotifyStream).filter(
-        SpotifyStream.spotify_track_uri.isnot(None)
+    # Base query on the integer keys of stream_facts; names are joined in after aggregating
+    base_query = db.query(StreamFact).filter(
+        StreamFact.content_type == ContentType.MUSIC
     )
 
-    if year:
-        base_query = base_query.filter(extract('year', SpotifyStream.ts) == year)
+    base_query = filter_year(base_query, year, column=StreamFact.ts)
 
     # For month filtering (UTC timestamps stored in DB)
-    ts_converted = SpotifyStream.ts
+    ts_converted = StreamFact.ts
+    base_query = base_query.filter(extract('month', ts_converted).in_(months))
 
     # Top Artist within season
-    top_artist_row = base_query.with_entities(
-        SpotifyStream.master_metadata_album_artist_name.label('artist_name'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
+    artist_totals = base_query.with_entities(
+        StreamFact.artist_id,
+        func.sum(StreamFact.ms_played).label('total_ms'),
+        func.count().label('play_count')
     ).filter(
-        extract('month', ts_converted).in_(months),
-        SpotifyStream.master_metadata_album_artist_name.isnot(None)
+        StreamFact.artist_id.isnot(None)
     ).group_by(
-        SpotifyStream.master_metadata_album_artist_name
-    ).order_by(desc('total_ms')).limit(1).first()
+        StreamFact.artist_id
+    ).subquery()
+    top_artist_query = db.query(
+        StreamArtist.name.label('artist_name'),
+        artist_totals.c.total_ms,
+        artist_totals.c.play_count
+    ).select_from(artist_totals).join(
+        StreamArtist, StreamArtist.id == artist_totals.c.artist_id
+    ).order_by(desc('total_ms')).limit(1)
+    top_artist_row = await run_db(top_artist_query.first)
 
     top_artist_model: Optional[SeasonalTopArtist] = None
     if top_artist_row:
@@ -589,7 +593,7 @@ async def get_seasonal_top_content(
 
         # Enrich with genres and image if requested
         try:
-            artist_record = db.query(Artist).filter(Artist.name == top_artist_model.artist_name).first()
+            artist_record = await run_db(db.query(Artist).filter(Artist.name == top_artist_model.artist_name).first)
             if artist_record:
                 top_artist_model.genres = artist_record.genres
                 if include_images and artist_record.spotify_id:
@@ -615,22 +619,26 @@ async def get_seasonal_top_content(
             print(f"Failed to enrich top artist: {e}")
 
     # Top Track within season
-    top_track_row = base_query.with_entities(
-        SpotifyStream.master_metadata_track_name.label('track_name'),
-        SpotifyStream.master_metadata_album_artist_name.label('artist_name'),
-        SpotifyStream.master_metadata_album_album_name.label('album_name'),
-        SpotifyStream.spotify_track_uri.label('track_uri'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        extract('month', ts_converted).in_(months),
-        SpotifyStream.master_metadata_track_name.isnot(None)
+    track_totals = base_query.with_entities(
+        StreamFact.track_id,
+        func.sum(StreamFact.ms_played).label('total_ms'),
+        func.count().label('play_count')
     ).group_by(
-        SpotifyStream.master_metadata_track_name,
-        SpotifyStream.master_metadata_album_artist_name,
-        SpotifyStream.master_metadata_album_album_name,
-        SpotifyStream.spotify_track_uri
-    ).order_by(desc('total_ms')).limit(1).first()
+        StreamFact.track_id
+    ).subquery()
+    top_track_query = db.query(
+        Track.name.label('track_name'),
+        Track.artist_name.label('artist_name'),
+        Track.album_name.label('album_name'),
+        Track.spotify_uri.label('track_uri'),
+        track_totals.c.total_ms,
+        track_totals.c.play_count
+    ).select_from(track_totals).join(
+        Track, Track.id == track_totals.c.track_id
+    ).filter(
+        Track.name.isnot(None)
+    ).order_by(desc('total_ms')).limit(1)
+    top_track_row = await run_db(top_track_query.first)
 
     top_track_model: Optional[SeasonalTopTrack] = None
     if top_track_row:
@@ -661,18 +669,21 @@ async def get_seasonal_top_content(
     # Top genres within season
     genre_minutes: dict[str, int] = {}
     try:
-        artist_minutes_rows = db.query(
+        # Sum the track totals per artist first; genres are JSON and cannot be grouped by
+        artist_totals = db.query(
+            Track.artist_spotify_id.label('artist_id'),
+            func.sum(track_totals.c.total_ms).label('total_ms')
+        ).select_from(track_totals).join(
+            Track, Track.id == track_totals.c.track_id
+        ).group_by(Track.artist_spotify_id).subquery()
+        artist_minutes_query = db.query(
             Artist.name,
             Artist.genres,
-            func.sum(SpotifyStream.ms_played).label('total_ms')
-        ).join(
-            Track, Artist.spotify_id == Track.artist_spotify_id
+            artist_totals.c.total_ms
         ).join(
-            SpotifyStream, SpotifyStream.spotify_track_uri == Track.spotify_uri
-        ).filter(
-            SpotifyStream.spotify_track_uri.isnot(None),
-            extract('month', ts_converted).in_(months)
-        ).group_by(Artist.name, Artist.genres).all()
+            artist_totals, Artist.spotify_id == artist_totals.c.artist_id
+        )
+        artist_minutes_rows = await run_db(artist_minutes_query.all)
 
         for row in artist_minutes_rows:
             total_ms = int(row.total_ms or 0)
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract
-from database.connection import get_db
-from database.schema import SpotifyStream, Artist
+from sqlalchemy import desc
+from database.connection import get_db, run_db
+from database.rollups import ARTIST_ROLLUP, TRACK_ROLLUP, named_totals
+from database.schema import Artist, StreamArtist, Track
 from services.spotify_service import spotify_service
 from services.spotify_batch_service import spotify_batch_service
+from services.result_cache import result_cache
 from typing import Optional, List, Dict
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field, field_validator, computed_field, ConfigDict
 from enum import Enum
 
@@ -292,6 +294,7 @@ async def get_batch_images(request: ImageRequest) -> ImageBatchResponse:
     return ImageBatchResponse(**results)
 
 @router.get("/top/artists", response_model=List[ArtistData])
+@result_cache.cached
 async def get_top_artists(
     db: Session = Depends(get_db),
     period: str = Query("all_time", description="Time period: 7d, 1m, 3m, 6m, 1y, all_time, or year (e.g., 2024)"),
@@ -311,31 +314,16 @@ async def get_top_artists(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    query = db.query(
-        SpotifyStream.master_metadata_album_artist_name.label('artist_name'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        SpotifyStream.spotify_track_uri.isnot(None),
-        SpotifyStream.master_metadata_album_artist_name.isnot(None)
+    # Totals per artist over the period, from the daily rollup
+    query = named_totals(
+        db, ARTIST_ROLLUP, 'artist_id', query_params.period,
+        StreamArtist.id, [StreamArtist.name.label('artist_name')]
     )
     
-    # Apply time filter
-    if period != "all_time":
-        # Check if period is a year (4 digits)
-        if period.isdigit() and len(period) == 4:
-            year = int(period)
-            query = query.filter(extract('year', SpotifyStream.ts) == year)
-        else:
-            cutoff_date = _get_cutoff_date(period)
-            if cutoff_date:
-                query = query.filter(SpotifyStream.ts >= cutoff_date)
-    
-    results = query.group_by(
-        SpotifyStream.master_metadata_album_artist_name
-    ).order_by(
+    query = query.order_by(
         desc('total_ms')
-    ).limit(query_params.limit).all()
+    ).limit(query_params.limit)
+    results = await run_db(query.all)
     
     # Basic artist data using Pydantic models
     artist_data_list = []
@@ -354,10 +342,10 @@ async def get_top_artists(
             artist_names = [artist_data.artist_name for artist_data in artist_data_list]
             
             # Fast: batch lookup of artist IDs from database
-            artist_id_data = db.query(Artist.name, Artist.spotify_id).filter(
+            artist_id_data = await run_db(db.query(Artist.name, Artist.spotify_id).filter(
                 Artist.name.in_(artist_names),
                 Artist.spotify_id.isnot(None)
-            ).all()
+            ).all)
             
             # Create name -> ID mapping
             name_to_id = {artist.name: artist.spotify_id for artist in artist_id_data}
@@ -400,6 +388,7 @@ async def get_top_artists(
     return artist_data_list
 
 @router.get("/top/tracks", response_model=List[TrackData])
+@result_cache.cached
 async def get_top_tracks(
     db: Session = Depends(get_db),
     period: str = Query("all_time", description="Time period: 7d, 1m, 3m, 6m, 1y, all_time, or year (e.g., 2024)"),
@@ -419,37 +408,22 @@ async def get_top_tracks(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    query = db.query(
-        SpotifyStream.master_metadata_track_name.label('track_name'),
-        SpotifyStream.master_metadata_album_artist_name.label('artist_name'),
-        SpotifyStream.master_metadata_album_album_name.label('album_name'),
-        SpotifyStream.spotify_track_uri.label('track_uri'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        SpotifyStream.spotify_track_uri.isnot(None),
-        SpotifyStream.master_metadata_track_name.isnot(None)
+    # Totals per track over the period, from the daily rollup
+    query = named_totals(
+        db, TRACK_ROLLUP, 'track_id', query_params.period, Track.id,
+        [
+            Track.name.label('track_name'),
+            Track.artist_name.label('artist_name'),
+            Track.album_name.label('album_name'),
+            Track.spotify_uri.label('spotify_track_uri')
+        ],
+        required=[Track.name]
     )
     
-    # Apply time filter
-    if query_params.period != "all_time":
-        # Check if period is a year (4 digits)
-        if query_params.period.isdigit() and len(query_params.period) == 4:
-            year = int(query_params.period)
-            query = query.filter(extract('year', SpotifyStream.ts) == year)
-        else:
-            cutoff_date = _get_cutoff_date(query_params.period)
-            if cutoff_date:
-                query = query.filter(SpotifyStream.ts >= cutoff_date)
-    
-    results = query.group_by(
-        SpotifyStream.master_metadata_track_name,
-        SpotifyStream.master_metadata_album_artist_name,
-        SpotifyStream.master_metadata_album_album_name,
-        SpotifyStream.spotify_track_uri
-    ).order_by(
+    query = query.order_by(
         desc('total_ms')
-    ).limit(query_params.limit).all()
+    ).limit(query_params.limit)
+    results = await run_db(query.all)
     
     # Basic track data using Pydantic models
     track_data_list = []
@@ -464,8 +438,8 @@ async def get_top_tracks(
             play_count=result.play_count
         )
         track_data_list.append(track_data)
-        if result.track_uri:
-            track_uris.append(result.track_uri)
+        if result.spotify_track_uri:
+            track_uris.append(result.spotify_track_uri)
     
     # Only fetch images if explicitly requested
     if query_params.include_images:
@@ -515,19 +489,3 @@ async def clear_null_caches() -> CacheClearResponse:
         message="Null cache entries cleared",
         stats=CacheStats(**updated_stats)
     )
-
-def _get_cutoff_date(period: str) -> Optional[datetime]:
-    now = datetime.now(timezone.utc)
-    
-    period_mapping = {
-        "7d": timedelta(days=7),
-        "1m": timedelta(days=30),
-        "3m": timedelta(days=90),
-        "6m": timedelta(days=180),
-        "1y": timedelta(days=365)
-    }
-    
-    if period in period_mapping:
-        return now - period_mapping[period]
-    
-    return None
\ No newline at end of file
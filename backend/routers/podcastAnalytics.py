@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, extract
-from database.connection import get_db
-from database.schema import SpotifyStream
+from sqlalchemy import desc
+from database.connection import get_db, run_db
+from database.rollups import EPISODE_ROLLUP, AUDIOBOOK_ROLLUP, named_totals
+from database.schema import Episode, PodcastShow, AudiobookChapter
 from services.spotify_service import spotify_service
+from services.result_cache import result_cache
 from typing import Optional, List, Dict
-from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, Field, field_validator, computed_field, ConfigDict
 
 router = APIRouter()
@@ -203,6 +204,7 @@ async def get_batch_podcast_images(request: PodcastImageRequest) -> PodcastImage
 
 
 @router.get("/top/episodes", response_model=List[EpisodeData])
+@result_cache.cached
 async def get_top_episodes(
     db: Session = Depends(get_db),
     period: str = Query("all_time", description="Time period: 7d, 1m, 3m, 6m, 1y, all_time, or year (e.g., 2024)"),
@@ -216,33 +218,17 @@ async def get_top_episodes(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    query = db.query(
-        SpotifyStream.episode_name.label('episode_name'),
-        SpotifyStream.episode_show_name.label('show_name'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        SpotifyStream.spotify_episode_uri.isnot(None),
-        SpotifyStream.episode_name.isnot(None)
+    # Totals per episode over the period, from the daily rollup
+    query = named_totals(
+        db, EPISODE_ROLLUP, 'episode_id', query_params.period, Episode.id,
+        [Episode.name.label('episode_name'), Episode.show_name.label('show_name')],
+        required=[Episode.name]
     )
     
-    # Apply time filter
-    if query_params.period != "all_time":
-        # Check if period is a year (4 digits)
-        if query_params.period.isdigit() and len(query_params.period) == 4:
-            year = int(query_params.period)
-            query = query.filter(extract('year', SpotifyStream.ts) == year)
-        else:
-            cutoff_date = _get_cutoff_date(query_params.period)
-            if cutoff_date:
-                query = query.filter(SpotifyStream.ts >= cutoff_date)
-    
-    results = query.group_by(
-        SpotifyStream.episode_name,
-        SpotifyStream.episode_show_name
-    ).order_by(
+    query = query.order_by(
         desc('total_ms')
-    ).limit(query_params.limit).all()
+    ).limit(query_params.limit)
+    results = await run_db(query.all)
     
     # Basic episode data using Pydantic models
     episode_data_list = []
@@ -275,6 +261,7 @@ async def get_top_episodes(
 
 
 @router.get("/top/shows", response_model=List[ShowData])
+@result_cache.cached
 async def get_top_shows(
     db: Session = Depends(get_db),
     period: str = Query("all_time", description="Time period: 7d, 1m, 3m, 6m, 1y, all_time, or year (e.g., 2024)"),
@@ -288,31 +275,16 @@ async def get_top_shows(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    query = db.query(
-        SpotifyStream.episode_show_name.label('show_name'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        SpotifyStream.spotify_episode_uri.isnot(None),
-        SpotifyStream.episode_show_name.isnot(None)
+    # Totals per show over the period, from the daily episode rollup
+    query = named_totals(
+        db, EPISODE_ROLLUP, 'show_id', query_params.period,
+        PodcastShow.id, [PodcastShow.name.label('show_name')]
     )
     
-    # Apply time filter
-    if query_params.period != "all_time":
-        # Check if period is a year (4 digits)
-        if query_params.period.isdigit() and len(query_params.period) == 4:
-            year = int(query_params.period)
-            query = query.filter(extract('year', SpotifyStream.ts) == year)
-        else:
-            cutoff_date = _get_cutoff_date(query_params.period)
-            if cutoff_date:
-                query = query.filter(SpotifyStream.ts >= cutoff_date)
-    
-    results = query.group_by(
-        SpotifyStream.episode_show_name
-    ).order_by(
+    query = query.order_by(
         desc('total_ms')
-    ).limit(query_params.limit).all()
+    ).limit(query_params.limit)
+    results = await run_db(query.all)
     
     # Basic show data using Pydantic models
     show_data_list = []
@@ -358,7 +330,8 @@ async def get_top_shows(
 
 
 @router.get("/top/audiobooks", response_model=List[AudiobookData])
-async def get_top_audiobooks(
+@result_cache.cached
+def get_top_audiobooks(
     db: Session = Depends(get_db),
     period: str = Query("all_time", description="Time period: 7d, 1m, 3m, 6m, 1y, all_time, or year (e.g., 2024)"),
     limit: int = Query(50, ge=1, le=500, description="Number of results to return")
@@ -370,29 +343,14 @@ async def get_top_audiobooks(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
     
-    query = db.query(
-        SpotifyStream.audiobook_title.label('audiobook_title'),
-        func.sum(SpotifyStream.ms_played).label('total_ms'),
-        func.count(SpotifyStream.id).label('play_count')
-    ).filter(
-        SpotifyStream.audiobook_chapter_uri.isnot(None),
-        SpotifyStream.audiobook_title.isnot(None)
+    # Totals per audiobook over the period, from the daily rollup
+    query = named_totals(
+        db, AUDIOBOOK_ROLLUP, 'chapter_id', query_params.period, AudiobookChapter.id,
+        [AudiobookChapter.audiobook_title.label('audiobook_title')],
+        required=[AudiobookChapter.audiobook_title]
     )
     
-    # Apply time filter
-    if query_params.period != "all_time":
-        # Check if period is a year (4 digits)
-        if query_params.period.isdigit() and len(query_params.period) == 4:
-            year = int(query_params.period)
-            query = query.filter(extract('year', SpotifyStream.ts) == year)
-        else:
-            cutoff_date = _get_cutoff_date(query_params.period)
-            if cutoff_date:
-                query = query.filter(SpotifyStream.ts >= cutoff_date)
-    
-    results = query.group_by(
-        SpotifyStream.audiobook_title
-    ).order_by(
+    results = query.order_by(
         desc('total_ms')
     ).limit(query_params.limit).all()
     
@@ -404,20 +362,3 @@ async def get_top_audiobooks(
         )
         for result in results
     ]
-
-
-def _get_cutoff_date(period: str) -> Optional[datetime]:
-    now = datetime.now(timezone.utc)
-    
-    period_mapping = {
-        "7d": timedelta(days=7),
-        "1m": timedelta(days=30),
-        "3m": timedelta(days=90),
-        "6m": timedelta(days=180),
-        "1y": timedelta(days=365)
-    }
-    
-    if period in period_mapping:
-        return now - period_mapping[period]
-    
-    return None
\ No newline at end of file
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Script to benchmark SpotifyDataLoader ingest throughput.
+
+Loads a streaming history export (or a synthetic one generated on the fly)
+into the configured database and reports records/sec, peak RSS and the
+time spent in each loader stage. Loader options are taken from the usual
+ETL_* environment variables, so two configurations can be compared by
+running the script twice and comparing the JSON results.
+
+The benchmark writes to the database configured by POSTGRES_*; point it at
+a scratch database. Use --truncate to empty the stream, dimension and
+manifest tables before each run so every run is a full initial load.
+
+Example:
+    POSTGRES_DB=spotify_bench python scripts/benchmark_ingest.py --streams 1000000 --truncate
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import text
+
+from database.rollups import ROLLUPS
+from loaders.streaming_data_loader import SpotifyDataLoader
+from scripts.generate_synthetic_export import generate_export
+
+
+def truncate_tables(loader: SpotifyDataLoader):
+    """Empty the tables filled by the loader so the next run is an initial load."""
+    loader.create_tables()
+    rollup_tables = ", ".join(rollup.model.__tablename__ for rollup in ROLLUPS)
+    with loader.engine.begin() as connection:
+        connection.execute(text(
+            f"TRUNCATE spotify_streams, tracks, episodes, audiobook_chapters, ingest_manifest, ingest_checkpoints, "
+            f"dataset_versions, stream_facts, dataset_catalog, "
+            f"stream_artists, podcast_shows, platforms, countries, playback_reasons, {rollup_tables} "
+            f"RESTART IDENTITY"
+        ))
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its finished child processes."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+def stage_times(stats: Dict[str, Any]) -> Dict[str, float]:
+    """Collect the per-stage wall times reported by the loader."""
+    stages = {}
+    for stage, stage_stats in stats.get("profile", {}).get("stages", {}).items():
+        stages[stage] = stage_stats["wall_seconds"]
+    for stage, stage_stats in stats.get("pipeline", {}).items():
+        if stage != "bottleneck":
+            stages[f"pipeline.{stage}"] = stage_stats["busy_seconds"]
+    return stages
+
+
+def run_benchmark(data_dir: Path, truncate: bool) -> Dict[str, Any]:
+    """Run one full load of data_dir and return its measurements."""
+    loader = SpotifyDataLoader()
+    if truncate:
+        truncate_tables(loader)
+
+    start = time.perf_counter()
+    stats = loader.load_all_files(data_dir)
+    seconds = time.perf_counter() - start
+    loader.engine.dispose()
+
+    records = stats.get("total_records", 0)
+    return {
+        "records": records,
+        "loaded": stats.get("total_loaded", 0),
+        "seconds": round(seconds, 3),
+        "records_per_sec": round(records / seconds, 1) if seconds > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stage_times(stats),
+        "settings": loader.settings.etl.model_dump(),
+        "stats": stats
+    }
+
+
+def print_result(run: int, result: Dict[str, Any]):
+    """Print a human readable summary of one benchmark run."""
+    print("\n" + "=" * 50)
+    print(f"BENCHMARK RUN {run}")
+    print("=" * 50)
+    print(f"Records: {result['records']} ({result['loaded']} loaded)")
+    print(f"Wall time: {result['seconds']}s")
+    print(f"Throughput: {result['records_per_sec']} records/sec")
+    print(f"Peak RSS: {result['peak_rss_mb']['self']} MB "
+          f"(worker processes: {result['peak_rss_mb']['children']} MB)")
+    print("Stage times:")
+    for stage, seconds in result["stages"].items():
+        print(f"  {stage:<24} {seconds:>10}s")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Benchmark Spotify export ingest throughput.")
+    parser.add_argument("data_dir", type=Path, nargs="?",
+                        help="Export directory to load (default: generate a synthetic export)")
+    parser.add_argument("--streams", type=int, default=100000,
+                        help="Streams in the generated export when no data_dir is given (default: 100000)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the generated export (default: 42)")
+    parser.add_argument("--runs", type=int, default=1, help="Number of runs (default: 1)")
+    parser.add_argument("--truncate", action="store_true",
+                        help="Empty stream, dimension and manifest tables before each run")
+    parser.add_argument("--output", type=Path, help="Append results as JSON lines to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="spotify_bench_") as tmp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = Path(tmp_dir)
+            print(f"Generating synthetic export with {args.streams} streams...")
+            generate_export(data_dir, args.streams, seed=args.seed)
+
+        for run in range(1, args.runs + 1):
+            started_at = datetime.now().isoformat()
+            result = run_benchmark(data_dir, args.truncate)
+            result["run"] = run
+            result["started_at"] = started_at
+            result["data_dir"] = str(args.data_dir) if args.data_dir else f"synthetic:{args.streams}:{args.seed}"
+            print_result(run, result)
+
+            if args.output:
+                with open(args.output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result, default=str) + "\n")
+
+    if args.runs > 1:
+        print("\nNote: peak RSS is the maximum over all runs in this process.")
+
+
+if __name__ == "__main__":
+    main()
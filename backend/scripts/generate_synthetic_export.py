@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Script to generate a synthetic Spotify extended streaming history export.
+
+Writes Streaming_History_Audio_*.json files shaped like a real export so
+the loader can be tested and benchmarked without personal data:
+1. Music, podcast and audiobook streams in a configurable mix
+2. Track, artist, show and audiobook catalogs sized from the stream count,
+   with Zipf-distributed popularity
+3. Listening sessions with daily rhythm, skips, shuffle and offline plays
+4. Chronologically ordered files of a fixed number of streams each
+
+Example:
+    python scripts/generate_synthetic_export.py /tmp/export --streams 1000000
+"""
+
+import argparse
+import json
+import random
+import string
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+_WORDS = [
+    "midnight", "echo", "summer", "river", "neon", "golden", "paper", "wild", "silent", "blue",
+    "fire", "ocean", "city", "ghost", "velvet", "electric", "winter", "honey", "broken", "crystal",
+    "shadow", "dream", "stone", "light", "north", "garden", "signal", "static", "orbit", "harbor"
+]
+
+_COUNTRIES = {"DE": 0.86, "CH": 0.06, "AT": 0.03, "FR": 0.02, "IT": 0.02, "US": 0.01}
+
+_PLATFORMS = [
+    "android",
+    "ios",
+    "windows",
+    "osx",
+    "web_player",
+    "Android OS 13 API 33 (samsung, SM-S911B)",
+    "iOS 17.1 (iPhone15,2)",
+    "Windows 10 (10.0.19045; x64)",
+]
+
+_MUSIC_START_REASONS = {"trackdone": 0.6, "clickrow": 0.15, "fwdbtn": 0.15, "backbtn": 0.04, "playbtn": 0.04, "appload": 0.02}
+_SPOKEN_START_REASONS = {"clickrow": 0.4, "playbtn": 0.3, "trackdone": 0.2, "appload": 0.1}
+
+
+class ZipfSampler:
+    """Sample catalog items with Zipf-distributed popularity."""
+
+    def __init__(self, items: List[Any], exponent: float, rng: random.Random):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(accumulate(1.0 / (rank ** exponent) for rank in range(1, len(items) + 1)))
+        self.total = self.cum_weights[-1]
+
+    def sample(self) -> Any:
+        return self.items[bisect(self.cum_weights, self.rng.random() * self.total)]
+
+
+def _weighted(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _spotify_id(rng: random.Random) -> str:
+    return "".join(rng.choices(_ID_ALPHABET, k=22))
+
+
+def _title(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).title()
+
+
+def build_catalog(streams: int, rng: random.Random) -> Dict[str, List[Dict[str, Any]]]:
+    """Build track, episode and audiobook chapter catalogs sized for the stream count.
+
+    A heavy listener replays a lot, so the number of distinct tracks grows
+    much more slowly than the number of streams.
+    """
+    track_count = max(500, int(streams ** 0.8))
+    artist_count = max(50, track_count // 8)
+    show_count = max(5, track_count // 400)
+    audiobook_count = max(2, track_count // 2000)
+
+    artists = [_title(rng, rng.randint(1, 2)) for _ in range(artist_count)]
+    albums = {}
+    tracks = []
+    for _ in range(track_count):
+        artist = rng.choice(artists)
+        album = albums.setdefault((artist, rng.randint(0, 4)), _title(rng, rng.randint(1, 3)))
+        tracks.append({
+            "name": _title(rng, rng.randint(1, 4)),
+            "artist": artist,
+            "album": album,
+            "uri": f"spotify:track:{_spotify_id(rng)}",
+            "duration_ms": rng.randint(120_000, 360_000),
+        })
+
+    episodes = []
+    for _ in range(show_count):
+        show = f"The {_title(rng, 2)} Podcast"
+        for number in range(1, rng.randint(20, 200)):
+            episodes.append({
+                "name": f"#{number} {_title(rng, rng.randint(2, 5))}",
+                "show": show,
+                "uri": f"spotify:episode:{_spotify_id(rng)}",
+                "duration_ms": rng.randint(900_000, 5_400_000),
+            })
+
+    chapters = []
+    for _ in range(audiobook_count):
+        title = _title(rng, rng.randint(2, 4))
+        book_uri = f"spotify:show:{_spotify_id(rng)}"
+        for number in range(1, rng.randint(15, 60)):
+            chapters.append({
+                "title": f"Chapter {number}",
+                "audiobook_title": title,
+                "audiobook_uri": book_uri,
+                "uri": f"spotify:episode:{_spotify_id(rng)}",
+                "duration_ms": rng.randint(300_000, 2_400_000),
+            })
+
+    return {"tracks": tracks, "episodes": episodes, "chapters": chapters}
+
+
+def _empty_stream() -> Dict[str, Any]:
+    return {
+        "master_metadata_track_name": None,
+        "master_metadata_album_artist_name": None,
+        "master_metadata_album_album_name": None,
+        "spotify_track_uri": None,
+        "episode_name": None,
+        "episode_show_name": None,
+        "spotify_episode_uri": None,
+        "audiobook_title": None,
+        "audiobook_uri": None,
+        "audiobook_chapter_uri": None,
+        "audiobook_chapter_title": None,
+    }
+
+
+def generate_streams(streams: int, start: datetime, streams_per_day: int,
+                     podcast_share: float, audiobook_share: float, seed: int):
+    """Yield synthetic stream records in chronological order."""
+    rng = random.Random(seed)
+    catalog = build_catalog(streams, rng)
+    tracks = ZipfSampler(catalog["tracks"], 1.1, rng)
+    episodes = ZipfSampler(catalog["episodes"], 0.9, rng)
+    chapters = ZipfSampler(catalog["chapters"], 0.7, rng)
+    platforms = rng.sample(_PLATFORMS, 3)
+    ips = {country: [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+                     for _ in range(3)] for country in _COUNTRIES}
+
+    # Average session length chosen so the daily stream count comes out right
+    sessions_per_day = 4
+    session_length = max(1, streams_per_day // sessions_per_day)
+    ts = start
+    remaining_in_session = 0
+    shuffle = False
+    platform = platforms[0]
+    country = "DE"
+
+    for _ in range(streams):
+        if remaining_in_session == 0:
+            # Sessions start mostly between morning and late evening
+            ts += timedelta(hours=rng.expovariate(sessions_per_day / 24.0))
+            if ts.hour < 7:
+                ts = ts.replace(hour=rng.randint(7, 10), minute=rng.randint(0, 59))
+            remaining_in_session = max(1, int(rng.expovariate(1.0 / session_length)))
+            shuffle = rng.random() < 0.4
+            platform = rng.choices(platforms, weights=[0.7, 0.2, 0.1])[0]
+            country = _weighted(rng, _COUNTRIES)
+        remaining_in_session -= 1
+
+        record = {"ts": None, "platform": platform, "ms_played": 0, "conn_country": country,
+                  "ip_addr": rng.choice(ips[country])}
+        record.update(_empty_stream())
+
+        kind = rng.random()
+        if kind < audiobook_share:
+            chapter = chapters.sample()
+            duration = chapter["duration_ms"]
+            skipped = rng.random() < 0.03
+            reason_start = _weighted(rng, _SPOKEN_START_REASONS)
+            record.update(audiobook_title=chapter["audiobook_title"], audiobook_uri=chapter["audiobook_uri"],
+                          audiobook_chapter_uri=chapter["uri"], audiobook_chapter_title=chapter["title"])
+        elif kind < audiobook_share + podcast_share:
+            episode = episodes.sample()
+            duration = episode["duration_ms"]
+            skipped = rng.random() < 0.05
+            reason_start = _weighted(rng, _SPOKEN_START_REASONS)
+            record.update(episode_name=episode["name"], episode_show_name=episode["show"],
+                          spotify_episode_uri=episode["uri"])
+        else:
+            track = tracks.sample()
+            duration = track["duration_ms"]
+            skipped = rng.random() < (0.3 if shuffle else 0.15)
+            reason_start = _weighted(rng, _MUSIC_START_REASONS)
+            record.update(master_metadata_track_name=track["name"],
+                          master_metadata_album_artist_name=track["artist"],
+                          master_metadata_album_album_name=track["album"],
+                          spotify_track_uri=track["uri"])
+
+        if skipped:
+            ms_played = rng.randint(0, min(duration, 30_000))
+            reason_end = "fwdbtn"
+        elif rng.random() < 0.1:
+            ms_played = rng.randint(0, duration)
+            reason_end = rng.choice(["endplay", "logout", "unexpected-exit", "remote"])
+        else:
+            ms_played = duration
+            reason_end = "trackdone"
+
+        offline = rng.random() < 0.05
+        record.update(
+            ts=ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            ms_played=ms_played,
+            reason_start=reason_start,
+            reason_end=reason_end,
+            shuffle=shuffle,
+            skipped=skipped,
+            offline=offline,
+            offline_timestamp=int(ts.timestamp()) if offline else 0,
+            incognito_mode=rng.random() < 0.01,
+        )
+        yield record
+
+        ts += timedelta(milliseconds=ms_played + rng.randint(0, 5_000))
+
+
+def _file_name(records: List[Dict[str, Any]], index: int) -> str:
+    first_year = records[0]["ts"][:4]
+    last_year = records[-1]["ts"][:4]
+    years = first_year if first_year == last_year else f"{first_year}-{last_year}"
+    return f"Streaming_History_Audio_{years}_{index}.json"
+
+
+def generate_export(output_dir: Path, streams: int, per_file: int = 20000, start_year: int = 2015,
+                    streams_per_day: int = 60, podcast_share: float = 0.08,
+                    audiobook_share: float = 0.02, seed: int = 42) -> List[Path]:
+    """Write a synthetic export to output_dir and return the audio files written."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = datetime(start_year, 1, 1, 8, tzinfo=timezone.utc)
+    written = []
+    batch = []
+
+    def flush():
+        path = output_dir / _file_name(batch, len(written))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(batch, f, indent=2)
+        written.append(path)
+        batch.clear()
+
+    for record in generate_streams(streams, start, streams_per_day, podcast_share, audiobook_share, seed):
+        batch.append(record)
+        if len(batch) >= per_file:
+            flush()
+    if batch:
+        flush()
+
+    # Real exports also contain video history, which the loader ignores
+    with open(output_dir / "Streaming_History_Video_2015-2025.json", "w", encoding="utf-8") as f:
+        json.dump([], f)
+
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic Spotify streaming history export.")
+    parser.add_argument("output_dir", type=Path, help="Directory to write the export files to")
+    parser.add_argument("--streams", type=int, default=100000, help="Total number of streams (default: 100000)")
+    parser.add_argument("--per-file", type=int, default=20000, help="Streams per export file (default: 20000)")
+    parser.add_argument("--start-year", type=int, default=2015, help="Year of the first stream (default: 2015)")
+    parser.add_argument("--streams-per-day", type=int, default=60, help="Average streams per day (default: 60)")
+    parser.add_argument("--podcast-share", type=float, default=0.08, help="Share of podcast streams (default: 0.08)")
+    parser.add_argument("--audiobook-share", type=float, default=0.02, help="Share of audiobook streams (default: 0.02)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args(argv)
+
+    if args.podcast_share + args.audiobook_share > 1:
+        parser.error("--podcast-share and --audiobook-share must add up to at most 1")
+
+    print(f"Generating {args.streams} synthetic streams in {args.output_dir}...")
+    files = generate_export(args.output_dir, args.streams, args.per_file, args.start_year,
+                            args.streams_per_day, args.podcast_share, args.audiobook_share, args.seed)
+    print(f"Wrote {len(files)} audio history files")
+
+
+if __name__ == "__main__":
+    main()
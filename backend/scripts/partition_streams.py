@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Script to convert an existing spotify_streams table into yearly partitions.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import create_engine
+
+from config.settings import get_settings
+from database.migrations import run_migrations, partition_streams_by_year
+from database.index_management import analyze_tables
+
+
+def main():
+    """Main function to partition the streams table."""
+    print("Partitioning spotify_streams by year...")
+
+    engine = create_engine(get_settings().database.connection_string)
+
+    try:
+        run_migrations(engine)
+        with engine.begin() as connection:
+            copied = partition_streams_by_year(connection)
+        if copied:
+            analyze_tables(engine, ["spotify_streams"])
+            print(f"Copied {copied} streams into yearly partitions.")
+        else:
+            print("Nothing to do: spotify_streams is already partitioned or empty.")
+
+    except Exception as e:
+        print(f"Error during partitioning: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
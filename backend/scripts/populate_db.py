@@ -3,6 +3,7 @@
 Script to populate the database with Spotify streaming data.
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -15,19 +16,63 @@ from loaders.streaming_data_loader import SpotifyDataLoader
 
 def main():
     """Main function to populate the database."""
-    print("Starting Spotify data loading...")
+    parser = argparse.ArgumentParser(description="Load Spotify streaming history into the database.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue interrupted files after their last committed batch")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="Only recompute stream_facts, the daily rollup tables and the dataset catalog from all loaded streams")
+    args = parser.parse_args()
+    
+    if args.rebuild_rollups:
+        try:
+            rows = SpotifyDataLoader().rebuild_rollups()
+            print(f"Rebuilt stream facts and daily rollups ({rows} rows)")
+        except Exception as e:
+            print(f"Error rebuilding rollups: {e}")
+            sys.exit(1)
+        return
+    
+    print("Resuming Spotify data loading..." if args.resume else "Starting Spotify data loading...")
     
     loader = SpotifyDataLoader()
     
     try:
-        stats = loader.load_all_files()
+        stats = loader.load_all_files(resume=args.resume)
         
         print("\n" + "="*50)
         print("LOAD SUMMARY")
         print("="*50)
         print(f"Files processed: {stats.get('files_processed', 0)}")
+        print(f"Files skipped (already ingested): {stats.get('files_skipped', 0)}")
         print(f"Total records found: {stats.get('total_records', 0)}")
         print(f"Total records loaded: {stats.get('total_loaded', 0)}")
+        print(f"Duplicate records skipped: {stats.get('total_duplicates', 0)}")
+        if loader.write_counters["failed"]:
+            print(f"Records failed after retries: {loader.write_counters['failed']} (run again with --resume)")
+        print(f"Write throughput: {stats.get('rows_per_sec', 0)} rows/sec ({stats.get('write_method', 'n/a')})")
+        print(f"Stream fact and rollup rows refreshed: {stats.get('rollup_rows', 0)}")
+        if stats.get('bulk_load'):
+            print(f"Index rebuild after bulk load: {stats.get('index_rebuild_seconds', 0)}s")
+        
+        pipeline = stats.get('pipeline')
+        if pipeline:
+            print(f"\nPipeline stages (bottleneck: {pipeline['bottleneck']}):")
+            for stage, stage_stats in pipeline.items():
+                if stage == 'bottleneck':
+                    continue
+                print(f"  {stage:<12} {stage_stats['rows_per_sec']:>10} rows/sec  "
+                      f"busy {stage_stats['busy_seconds']}s  "
+                      f"queue depth avg {stage_stats['avg_queue_depth']} / max {stage_stats['max_queue_depth']}")
+        
+        profile = stats.get('profile')
+        if profile:
+            print(f"\nStage breakdown (wall {profile['wall_seconds']}s, cpu {profile['cpu_seconds']}s):")
+            print(f"  {'stage':<18} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'rows in':>10} {'rows out':>10} {'peak MB':>9}")
+            for stage, stage_stats in profile['stages'].items():
+                peak = stage_stats['peak_memory_mb']
+                print(f"  {stage:<18} {stage_stats['calls']:>7} {stage_stats['wall_seconds']:>9} "
+                      f"{stage_stats['cpu_seconds']:>9} {stage_stats['rows_in']:>10} {stage_stats['rows_out']:>10} "
+                      f"{'-' if peak is None else peak:>9}")
         
         print("\nData loading completed successfully!")
         
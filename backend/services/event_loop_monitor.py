@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopMonitor:
+    """Measure event loop lag: how late a sleeping task wakes up.
+
+    A background task sleeps for `interval` seconds at a time and records how
+    much longer than that it actually took to be resumed. Anything running
+    on the loop without yielding (e.g. a blocking database call in an
+    `async def` route) shows up directly as lag.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120, warn_threshold_ms: float = 250.0):
+        self.interval = interval
+        self.warn_threshold_ms = warn_threshold_ms
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._max_lag_ms = 0.0
+        self._sample_count = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop sampling."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, (loop.time() - start - self.interval) * 1000))
+
+    def record(self, lag_ms: float) -> None:
+        self._samples.append(lag_ms)
+        self._sample_count += 1
+        self._max_lag_ms = max(self._max_lag_ms, lag_ms)
+        if lag_ms >= self.warn_threshold_ms:
+            logger.warning(f"Event loop was blocked for {lag_ms:.0f}ms")
+
+    def get_stats(self) -> Dict[str, float]:
+        """Lag over the recent window (in ms), plus the maximum since startup."""
+        samples = sorted(self._samples)
+        if not samples:
+            return {"current_ms": 0.0, "avg_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "samples": 0}
+        return {
+            "current_ms": round(self._samples[-1], 2),
+            "avg_ms": round(sum(samples) / len(samples), 2),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+            "max_ms": round(self._max_lag_ms, 2),
+            "samples": self._sample_count
+        }
+
+
+event_loop_monitor = EventLoopMonitor()
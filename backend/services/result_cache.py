@@ -0,0 +1,218 @@
+import functools
+import inspect
+import logging
+import threading
+import time
+import zoneinfo
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from pydantic.fields import FieldInfo
+
+from config.settings import get_settings
+from database.connection import run_db
+from database.dataset_catalog import current_dataset_version
+from database.period_filters import get_cutoff_date
+
+logger = logging.getLogger(__name__)
+
+# Route arguments that never become part of a cache key
+UNKEYED_ARGUMENTS = {"db"}
+# Route arguments that recompute the result and replace the cached one when true. Routes
+# take refresh_cache to fetch their Spotify images again, which they only do when they
+# run, so the same flag has to bypass the cached result
+REFRESH_ARGUMENTS = {"refresh_cache"}
+
+# Names Postgres resolves to UTC, like "UTC" itself
+UTC_ALIASES = {"etc/utc", "etc/uct", "etc/universal", "etc/zulu", "uct", "universal", "zulu", "utc"}
+
+
+@functools.lru_cache(maxsize=1)
+def _timezone_names() -> Dict[str, str]:
+    return {name.casefold(): name for name in zoneinfo.available_timezones()}
+
+
+def canonical_timezone(name: str) -> str:
+    """Spell a timezone name like the tz database does, e.g. "europe/zurich" as "Europe/Zurich".
+
+    Postgres matches timezone names case-insensitively, so the spellings give
+    the same results. Unknown names are returned unchanged for the route to reject.
+    """
+    folded = name.casefold()
+    if folded in UTC_ALIASES:
+        return "UTC"
+    return _timezone_names().get(folded, name)
+
+
+# Normalization of the route arguments whose spellings the routes treat alike
+ARGUMENT_NORMALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "timezone": canonical_timezone,
+    "period": str.casefold,
+    "weighting": str.casefold,
+}
+
+
+def _key_value(name: str, value: Any) -> Hashable:
+    if isinstance(value, Enum):
+        value = value.value.casefold() if isinstance(value.value, str) else value.value
+    if name == "period":
+        # A relative period covers different days as time passes
+        cutoff = get_cutoff_date(value)
+        if cutoff is not None:
+            return value, cutoff.date()
+    return value
+
+
+class ResultCache:
+    """LRU cache of analytics results, valid for one dataset version.
+
+    The data only changes when the loader runs, and every load adds a
+    dataset version. Each lookup reads the current version (a primary key
+    lookup) and drops all cached results once it changed, so results are
+    never served for data they were not computed from. Results also expire
+    after max_age seconds, since relative periods such as "7d" move with
+    the clock and Spotify images may have failed to load.
+    """
+
+    def __init__(self, max_entries: int = 512, max_age: float = 3600.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()  # key -> (stored at, result)
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable, version: int) -> Tuple[bool, Any]:
+        """Look up a result computed for the given dataset version; returns (found, result)."""
+        with self._lock:
+            self._sync_version(version)
+            if key in self._entries:
+                stored_at, result = self._entries[key]
+                if time.monotonic() - stored_at < self.max_age:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, result
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return False, None
+
+    def set(self, key: Hashable, version: int, result: Any) -> None:
+        """Store a result computed for the given dataset version, evicting the least recently used ones."""
+        with self._lock:
+            self._sync_version(version)
+            if version != self._version:
+                # Computed from data that is no longer current
+                return
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def _sync_version(self, version: int) -> None:
+        # Versions only grow, so an older one comes from a request that read it before a load
+        if self._version is not None and version <= self._version:
+            return
+        if self._entries:
+            logger.info(f"Dataset version {version}: dropping {len(self._entries)} cached results")
+        self._invalidations += len(self._entries)
+        self._entries.clear()
+        self._version = version
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit and miss counts since startup, plus the current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "dataset_version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups * 100, 1) if lookups else None,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
+
+    def cached(self, route: Callable) -> Callable:
+        """Cache the results of a route per argument values.
+
+        Put it below the router decorator. The route must take its session as
+        `db`; the key is built from all its other arguments, with defaults
+        filled in and normalized by ARGUMENT_NORMALIZERS, so all spellings
+        the route treats alike share one entry. The route itself is called
+        with the arguments as given, so it accepts the same values whether
+        the cache is enabled or not. Relative periods are keyed by the day
+        they start on as well. Works for both plain and
+        `async def` routes. The version is read before the route queries
+        anything, so a result is never older than the version it is stored
+        under.
+        """
+        endpoint = f"{route.__module__}.{route.__qualname__}"
+        defaults = {}
+        for name, parameter in inspect.signature(route).parameters.items():
+            default = parameter.default
+            if isinstance(default, FieldInfo):
+                # Query(...) parameters carry their default inside
+                if default.is_required():
+                    continue
+                default = default.get_default(call_default_factory=True)
+            if default is not parameter.empty and name not in UNKEYED_ARGUMENTS:
+                defaults[name] = default
+
+        def cache_key(arguments: Dict[str, Any]) -> Hashable:
+            arguments = {**defaults, **arguments}
+            for name, normalizer in ARGUMENT_NORMALIZERS.items():
+                if isinstance(arguments.get(name), str):
+                    arguments[name] = normalizer(arguments[name])
+            unkeyed = UNKEYED_ARGUMENTS | REFRESH_ARGUMENTS
+            return endpoint, tuple(sorted(
+                (name, _key_value(name, value)) for name, value in arguments.items() if name not in unkeyed
+            ))
+
+        def refresh(arguments: Dict[str, Any]) -> bool:
+            return any(arguments.get(name) for name in REFRESH_ARGUMENTS)
+
+        if inspect.iscoroutinefunction(route):
+            @functools.wraps(route)
+            async def async_wrapper(**arguments):
+                if not self.enabled:
+                    return await route(**arguments)
+                key = cache_key(arguments)
+                version = await run_db(current_dataset_version, arguments["db"])
+                if not refresh(arguments):
+                    found, result = self.get(key, version)
+                    if found:
+                        return result
+                result = await route(**arguments)
+                self.set(key, version, result)
+                return result
+            return async_wrapper
+
+        @functools.wraps(route)
+        def wrapper(**arguments):
+            if not self.enabled:
+                return route(**arguments)
+            key = cache_key(arguments)
+            version = current_dataset_version(arguments["db"])
+            if not refresh(arguments):
+                found, result = self.get(key, version)
+                if found:
+                    return result
+            result = route(**arguments)
+            self.set(key, version, result)
+            return result
+        return wrapper
+
+
+_settings = get_settings().result_cache
+result_cache = ResultCache(max_entries=_settings.max_entries, max_age=_settings.max_age, enabled=_settings.enabled)
@@ -0,0 +1,145 @@
+import os
+
+import pytest
+
+# config.settings reads the database and Spotify settings at import time;
+# unit tests never connect, so any placeholder values do
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "test")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "test")
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine of a scratch Postgres database given by TEST_DATABASE_URL.
+
+    Tests using it drop and recreate all tables of that database, so never
+    point it at real data. They are skipped if it is not set.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from sqlalchemy import create_engine
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+# Years of streams in stream_db, one partition each
+STREAM_YEARS = range(2019, 2022)
+
+
+@pytest.fixture(scope="session")
+def stream_db(pg_engine):
+    """Engine of the test database with a few years of streams and everything derived from them.
+
+    Holds a stream every two hours: mostly music from a few artists with
+    genres, plus some podcast episodes, audiobook chapters and streams
+    without any content. The rollups, stream facts and
+    dataset catalog are built like after a load, and the tables are
+    vacuumed so the planner sees them as after autovacuum.
+    """
+    from sqlalchemy import text
+    from database.migrations import run_migrations
+    from database.partitioning import create_year_partitions
+    from database.rollups import rebuild_daily_rollups
+    from database.schema import Base
+
+    Base.metadata.drop_all(pg_engine)
+    Base.metadata.create_all(pg_engine)
+    run_migrations(pg_engine)
+    with pg_engine.begin() as connection:
+        create_year_partitions(connection, "spotify_streams", STREAM_YEARS)
+        connection.execute(text("""
+            INSERT INTO artists (spotify_id, name, genres)
+            SELECT 'artist' || a, 'Artist ' || a, json_build_array('genre' || a, 'genre' || (a + 1) % 3)
+            FROM generate_series(0, 2) AS a
+        """))
+        connection.execute(text("""
+            INSERT INTO tracks (spotify_uri, name, artist_name, album_name, artist_spotify_id)
+            SELECT 'spotify:track:' || t, 'Track ' || t, 'Artist ' || t % 3, 'Album', 'artist' || t % 3
+            FROM generate_series(0, 29) AS t
+        """))
+        connection.execute(text("""
+            INSERT INTO episodes (spotify_uri, name, show_name)
+            SELECT 'spotify:episode:' || e, 'Episode ' || e, 'Show ' || e % 2
+            FROM generate_series(0, 3) AS e
+        """))
+        connection.execute(text("""
+            INSERT INTO audiobook_chapters (chapter_uri, chapter_title, audiobook_title, audiobook_uri)
+            SELECT 'spotify:chapter:' || c, 'Chapter ' || c, 'Audiobook', 'spotify:audiobook:0'
+            FROM generate_series(0, 2) AS c
+        """))
+        connection.execute(text("""
+            INSERT INTO spotify_streams (
+                ts, platform, ms_played, conn_country, ip_addr,
+                master_metadata_track_name, master_metadata_album_artist_name,
+                master_metadata_album_album_name, spotify_track_uri,
+                episode_name, episode_show_name, spotify_episode_uri,
+                audiobook_title, audiobook_uri, audiobook_chapter_uri, audiobook_chapter_title,
+                reason_start, reason_end, shuffle, skipped, offline, incognito_mode
+            )
+            SELECT
+                ts, 'android', (n % 300) * 1000, 'NZ', '10.0.0.1',
+                CASE WHEN n % 10 > 0 THEN 'Track ' || n % 30 END,
+                CASE WHEN n % 10 > 0 THEN 'Artist ' || n % 30 % 3 END,
+                CASE WHEN n % 10 > 0 THEN 'Album' END,
+                CASE WHEN n % 10 > 0 THEN 'spotify:track:' || n % 30 END,
+                -- Of the rest, a third are episodes and a third audiobook chapters
+                CASE WHEN n % 30 = 0 THEN 'Episode ' || n / 30 % 4 END,
+                CASE WHEN n % 30 = 0 THEN 'Show ' || n / 30 % 4 % 2 END,
+                CASE WHEN n % 30 = 0 THEN 'spotify:episode:' || n / 30 % 4 END,
+                CASE WHEN n % 30 = 10 THEN 'Audiobook' END,
+                CASE WHEN n % 30 = 10 THEN 'spotify:audiobook:0' END,
+                CASE WHEN n % 30 = 10 THEN 'spotify:chapter:' || n / 30 % 3 END,
+                CASE WHEN n % 30 = 10 THEN 'Chapter ' || n / 30 % 3 END,
+                'trackdone', 'trackdone', false, false, false, false
+            FROM generate_series(
+                timestamptz '2019-01-01 00:00+00', timestamptz '2021-12-31 22:00+00', interval '2 hours'
+            ) WITH ORDINALITY AS s(ts, n)
+        """))
+        rebuild_daily_rollups(connection)
+
+    with pg_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM (ANALYZE)"))
+    return pg_engine
+
+
+@pytest.fixture
+def explain():
+    """Return a function giving the text plan of a statement, or of raw SQL and its parameters."""
+    def explain(connection, statement, parameters=None):
+        if parameters is None:
+            compiled = statement.compile(dialect=connection.dialect)
+            statement, parameters = str(compiled), compiled.params
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            return "\n".join(line for (line,) in cursor.fetchall())
+        finally:
+            cursor.close()
+    return explain
+
+
+@pytest.fixture
+def empty_db(pg_engine):
+    """Engine of an empty schema of the test database, with all tables created.
+
+    For tests that load or restructure data; the schema is recreated for every
+    test and kept apart from the tables of stream_db.
+    """
+    from sqlalchemy import create_engine, text
+    from database.migrations import run_migrations
+    from database.schema import Base
+
+    with pg_engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA IF EXISTS empty_db CASCADE"))
+        connection.execute(text("CREATE SCHEMA empty_db"))
+    engine = create_engine(pg_engine.url, connect_args={"options": "-c search_path=empty_db"})
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
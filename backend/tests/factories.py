@@ -0,0 +1,29 @@
+def make_record(i, **fields):
+    """A valid export record of a music stream, distinct per i; fields override its values."""
+    record = {
+        "ts": f"2020-01-{i % 28 + 1:02d}T{i % 24:02d}:00:00Z",
+        "platform": "android",
+        "ms_played": 1000 + i,
+        "conn_country": "NZ",
+        "ip_addr": "10.0.0.1",
+        "master_metadata_track_name": f"Track {i}",
+        "master_metadata_album_artist_name": "Artist",
+        "master_metadata_album_album_name": "Album",
+        "spotify_track_uri": f"spotify:track:{i:022d}",
+        "episode_name": None,
+        "episode_show_name": None,
+        "spotify_episode_uri": None,
+        "audiobook_title": None,
+        "audiobook_uri": None,
+        "audiobook_chapter_uri": None,
+        "audiobook_chapter_title": None,
+        "reason_start": "trackdone",
+        "reason_end": "trackdone",
+        "shuffle": False,
+        "skipped": False,
+        "offline": False,
+        "offline_timestamp": None,
+        "incognito_mode": False,
+    }
+    record.update(fields)
+    return record
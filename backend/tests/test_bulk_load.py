@@ -0,0 +1,78 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from database.index_management import secondary_indexes
+from database.migrations import index_exists
+from database.partitioning import create_year_partitions
+from database.schema import SpotifyStream
+from loaders.streaming_data_loader import SpotifyDataLoader
+from tests.factories import make_record
+
+BULK_INDEXES = [index.name for index in secondary_indexes(SpotifyStream.__table__)]
+
+
+@pytest.fixture
+def db_loader(empty_db):
+    """A loader writing to the empty test schema."""
+    loader = SpotifyDataLoader()
+    loader.engine = empty_db
+    loader.Session = sessionmaker(bind=empty_db)
+    loader.start_load()
+    return loader
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    (tmp_path / "Streaming_History_Audio_2020.json").write_text(json.dumps([make_record(i) for i in range(10)]))
+    return tmp_path
+
+
+def existing_indexes(engine):
+    with engine.connect() as connection:
+        return [name for name in BULK_INDEXES if index_exists(connection, name)]
+
+
+def test_auto_mode_drops_indexes_only_for_an_empty_table(db_loader, empty_db):
+    assert BULK_INDEXES and existing_indexes(empty_db) == BULK_INDEXES
+
+    dropped = db_loader.drop_indexes_for_bulk_load()
+
+    assert [index.name for index in dropped] == BULK_INDEXES
+    assert existing_indexes(empty_db) == []
+    assert [index.name for index in db_loader.missing_secondary_indexes()] == BULK_INDEXES
+
+    db_loader.rebuild_bulk_load_indexes(dropped)
+    assert existing_indexes(empty_db) == BULK_INDEXES
+
+    with empty_db.begin() as connection:
+        create_year_partitions(connection, "spotify_streams", [2020])
+        connection.execute(text(
+            "INSERT INTO spotify_streams (ts, platform, ms_played, conn_country, ip_addr, reason_start, reason_end, "
+            "shuffle, skipped, offline, incognito_mode) "
+            "VALUES ('2020-01-01 00:00+00', 'android', 1000, 'NZ', '10.0.0.1', 'trackdone', 'trackdone', "
+            "false, false, false, false)"
+        ))
+    assert db_loader.drop_indexes_for_bulk_load() == []
+    assert existing_indexes(empty_db) == BULK_INDEXES
+
+
+def test_load_into_an_empty_table_rebuilds_the_dropped_indexes(db_loader, empty_db, export_dir):
+    stats = db_loader.load_all_files(export_dir)
+
+    assert stats["bulk_load"] and stats["total_loaded"] == 10
+    assert existing_indexes(empty_db) == BULK_INDEXES
+
+
+def test_failed_load_still_rebuilds_the_dropped_indexes(db_loader, empty_db, export_dir, monkeypatch):
+    def fail(*args, **kwargs):
+        assert existing_indexes(empty_db) == []
+        raise RuntimeError("load failed")
+    monkeypatch.setattr(db_loader, "load_files_merged", fail)
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        db_loader.load_all_files(export_dir)
+
+    assert existing_indexes(empty_db) == BULK_INDEXES
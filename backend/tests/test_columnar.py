@@ -0,0 +1,55 @@
+import pickle
+
+from loaders.columnar import DICTIONARY_COLUMNS, PLAIN_COLUMNS, STRING_COLUMNS, StreamColumns
+from models.models import SpotifyStreamRecord
+from tests.factories import make_record
+
+COLUMNS = ("ts", "ms_played", "offline_timestamp", "shuffle", *STRING_COLUMNS)
+
+
+def record(i, hour, **fields):
+    return SpotifyStreamRecord.model_validate(make_record(i, ts=f"2020-01-01T{hour:02d}:00:00Z", **fields))
+
+
+def decoded(columns: StreamColumns):
+    return list(columns.rows(COLUMNS))
+
+
+def test_columns_round_trip_records():
+    records = [record(i, i % 3, offline_timestamp=None if i % 2 else i) for i in range(5)]
+    columns = StreamColumns.from_records(records)
+
+    appended = StreamColumns()
+    for stream in records:
+        appended.append(stream)
+
+    assert decoded(appended) == decoded(columns)
+    assert [columns.value("offline_timestamp", row) for row in range(5)] == [0, None, 2, None, 4]
+    assert columns.first_rows("master_metadata_album_artist_name") == {"Artist": 0}
+    assert columns.first_rows("master_metadata_track_name") == {f"Track {i}": i for i in range(5)}
+
+
+def test_only_low_cardinality_columns_are_dictionary_encoded():
+    columns = StreamColumns.from_records([record(i, 0, platform=f"platform {i % 2}") for i in range(4)])
+
+    assert set(DICTIONARY_COLUMNS) | set(PLAIN_COLUMNS) == set(STRING_COLUMNS)
+    assert set(columns.dictionaries) == set(columns.codes) == set(DICTIONARY_COLUMNS)
+    assert columns.dictionaries["platform"] == ["platform 0", "platform 1"]
+    assert list(columns.codes["platform"]) == [0, 1, 0, 1]
+    assert columns.text["spotify_track_uri"] == [make_record(i)["spotify_track_uri"] for i in range(4)]
+
+
+def test_slices_share_dictionaries_and_pickle_without_lookups():
+    columns = StreamColumns.from_records([record(i, i) for i in range(6)])
+    part = columns.slice(2, 10)
+    part.append(record(50, 20))
+
+    assert part.dictionaries is columns.dictionaries
+    assert decoded(part)[:4] == decoded(columns)[2:6]
+    # Slices copy their rows, so appending to one leaves the source as it was
+    assert len(columns) == 6 and columns.text["ip_addr"] is not part.text["ip_addr"]
+    assert decoded(columns.take([5, 0])) == [decoded(columns)[5], decoded(columns)[0]]
+
+    copy = pickle.loads(pickle.dumps(part))
+    assert copy._lookups is None
+    assert decoded(copy) == decoded(part)
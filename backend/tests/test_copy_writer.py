@@ -0,0 +1,76 @@
+import csv
+
+from sqlalchemy import text
+
+from loaders.columnar import StreamColumns
+from loaders.copy_writer import STREAM_COLUMNS, build_stream_csv_buffer, copy_buffer_skip_existing
+from models.models import SpotifyStreamRecord
+from tests.factories import make_record
+
+AWKWARD_NAME = 'Say "Hello", Goodbye\nPart 2'
+
+
+def columns_of(*records):
+    return StreamColumns.from_records(SpotifyStreamRecord.model_validate(record) for record in records)
+
+
+def awkward_records():
+    # Tracks of the seeded test database, at half past the hour where it has no streams
+    return [
+        make_record(0, ts="2020-01-01T00:30:00Z", spotify_track_uri="spotify:track:1",
+                    master_metadata_track_name=AWKWARD_NAME, offline_timestamp=1577836800),
+        make_record(1, ts="2020-01-01T01:30:00Z", spotify_track_uri="spotify:track:2",
+                    master_metadata_album_album_name="", shuffle=True),
+    ]
+
+
+def test_buffer_round_trips_through_csv():
+    columns = columns_of(*awkward_records())
+
+    rows = list(csv.reader(build_stream_csv_buffer(columns)))
+
+    assert [len(row) for row in rows] == [len(STREAM_COLUMNS)] * 2
+    first = dict(zip(STREAM_COLUMNS, rows[0]))
+    assert first["master_metadata_track_name"] == AWKWARD_NAME
+    assert first["ts"] == "2020-01-01T00:30:00+00:00"
+    assert first["offline_timestamp"] == "1577836800"
+    assert (first["shuffle"], dict(zip(STREAM_COLUMNS, rows[1]))["shuffle"]) == ("f", "t")
+
+
+def test_none_is_unquoted_and_empty_strings_are_quoted():
+    columns = columns_of(*awkward_records())
+
+    lines = build_stream_csv_buffer(columns).getvalue().splitlines()
+
+    # Unquoted empty fields are NULL to COPY, quoted ones empty strings
+    second = lines[-1].split(",")
+    album = STREAM_COLUMNS.index("master_metadata_album_album_name")
+    episode = STREAM_COLUMNS.index("episode_name")
+    assert second[album] == '""'
+    assert second[episode] == ""
+
+
+def test_source_order_column_comes_first():
+    columns = columns_of(make_record(0), make_record(1))
+    rows = list(csv.reader(build_stream_csv_buffer(columns, source_order_start=41)))
+    assert [row[0] for row in rows] == ["41", "42"]
+    assert [len(row) for row in rows] == [len(STREAM_COLUMNS) + 1] * 2
+
+
+def test_copy_skips_streams_that_already_exist(stream_db):
+    columns = columns_of(*awkward_records())
+    count = text("SELECT count(*) FROM spotify_streams")
+
+    # Rolled back when the connection closes, so the seeded data is left as it was
+    with stream_db.connect() as connection:
+        before = connection.execute(count).scalar_one()
+        first = copy_buffer_skip_existing(connection, "spotify_streams", STREAM_COLUMNS, build_stream_csv_buffer(columns))
+        again = copy_buffer_skip_existing(connection, "spotify_streams", STREAM_COLUMNS, build_stream_csv_buffer(columns))
+        after = connection.execute(count).scalar_one()
+        stored = connection.execute(text(
+            "SELECT master_metadata_track_name, master_metadata_album_album_name, episode_name "
+            "FROM spotify_streams WHERE extract(minute FROM ts) = 30 ORDER BY ts"
+        )).all()
+
+    assert (first, again, after - before) == (2, 0, 2)
+    assert [tuple(row) for row in stored] == [(AWKWARD_NAME, "Album", None), ("Track 1", "", None)]
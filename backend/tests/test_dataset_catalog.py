@@ -0,0 +1,76 @@
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from database.dataset_catalog import refresh_dataset_catalog
+from database.schema import ContentType, DatasetCatalog
+from routers import basicAnalytics
+
+# Totals per UTC year and content type, straight from the streams
+RAW_TOTALS = """
+    SELECT
+        extract(year FROM ts AT TIME ZONE 'UTC')::int AS year,
+        CASE
+            WHEN spotify_track_uri IS NOT NULL THEN 1
+            WHEN spotify_episode_uri IS NOT NULL THEN 2
+            WHEN audiobook_chapter_uri IS NOT NULL THEN 3
+            ELSE 0
+        END AS content_type,
+        count(*), sum(ms_played), min(ts), max(ts)
+    FROM spotify_streams
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+CATALOG_TOTALS = select(
+    DatasetCatalog.year, DatasetCatalog.content_type, DatasetCatalog.stream_count,
+    DatasetCatalog.total_ms, DatasetCatalog.first_ts, DatasetCatalog.last_ts
+).order_by(DatasetCatalog.year, DatasetCatalog.content_type)
+
+
+def raw_totals(connection):
+    return [tuple(row) for row in connection.execute(text(RAW_TOTALS))]
+
+
+def test_catalog_matches_the_streams(stream_db):
+    with stream_db.connect() as connection:
+        expected = raw_totals(connection)
+        assert {content_type for _, content_type, *_ in expected} == set(ContentType)
+        assert [tuple(row) for row in connection.execute(CATALOG_TOTALS)] == expected
+
+        # Refreshing a single year leaves the catalog as it was; rolled back when the connection closes
+        refresh_dataset_catalog(connection, 2020, 2020)
+        assert [tuple(row) for row in connection.execute(CATALOG_TOTALS)] == expected
+
+
+def test_overview_by_year_matches_the_streams(stream_db):
+    with stream_db.connect() as connection:
+        raw = raw_totals(connection)
+    with Session(stream_db) as db:
+        overview = basicAnalytics.get_stats_overview_by_year.__wrapped__(db=db)
+
+    def expected(rows):
+        def totals(*content_types):
+            selected = [row for row in rows if row[1] in content_types]
+            return sum(row[2] for row in selected), sum(row[3] for row in selected)
+        return {
+            "first_stream": min(row[4] for row in rows).isoformat(),
+            "last_stream": max(row[5] for row in rows).isoformat(),
+            "total": totals(*ContentType),
+            "music": totals(ContentType.MUSIC),
+            "episodes": totals(ContentType.EPISODE),
+            "audiobooks": totals(ContentType.AUDIOBOOK),
+        }
+
+    def actual(stats):
+        return {
+            "first_stream": stats.time_period.first_stream,
+            "last_stream": stats.time_period.last_stream,
+            **{label: (getattr(stats, label).stream_count, getattr(stats, label).total_ms)
+               for label in ("total", "music", "episodes", "audiobooks")},
+        }
+
+    years = sorted({row[0] for row in raw}, reverse=True)
+    assert [year_stats.year for year_stats in overview.years] == years
+    assert actual(overview.all_time) == expected(raw)
+    for year_stats in overview.years:
+        assert actual(year_stats) == expected([row for row in raw if row[0] == year_stats.year])
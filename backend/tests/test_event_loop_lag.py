@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import threading
+import time
+
+from database.connection import run_db
+from services.event_loop_monitor import EventLoopMonitor
+
+BLOCK_SECONDS = 0.3
+
+
+def blocking_query(seconds, result=None):
+    time.sleep(seconds)
+    return result, threading.current_thread()
+
+
+async def lag_while(work):
+    """Run work with a fast-sampling monitor on the loop, returning its result and the lag stats."""
+    monitor = EventLoopMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    result = await work()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return result, monitor.get_stats()
+
+
+def test_run_db_runs_work_off_the_event_loop():
+    async def offloaded():
+        return await run_db(blocking_query, BLOCK_SECONDS, result="rows")
+
+    (result, thread), stats = asyncio.run(lag_while(offloaded))
+
+    assert result == "rows"
+    assert thread is not threading.main_thread()
+    assert stats["samples"] > 10
+    assert stats["max_ms"] < BLOCK_SECONDS * 1000 / 2
+
+
+def test_blocking_work_on_the_loop_shows_up_as_lag(caplog):
+    async def blocking():
+        return blocking_query(BLOCK_SECONDS)
+
+    with caplog.at_level(logging.WARNING, logger="services.event_loop_monitor"):
+        (_, thread), stats = asyncio.run(lag_while(blocking))
+
+    assert thread is threading.main_thread()
+    assert stats["max_ms"] >= BLOCK_SECONDS * 1000 * 0.9
+    assert "Event loop was blocked" in caplog.text
+
+
+def test_stats_cover_the_recent_window():
+    monitor = EventLoopMonitor(window=3)
+    assert monitor.get_stats()["samples"] == 0
+
+    for lag_ms in (500.0, 1.0, 2.0, 3.0):
+        monitor.record(lag_ms)
+
+    assert monitor.get_stats() == {"current_ms": 3.0, "avg_ms": 2.0, "p99_ms": 3.0, "max_ms": 500.0, "samples": 4}
@@ -0,0 +1,68 @@
+import io
+import json
+import pickle
+import zipfile
+
+import pytest
+
+from loaders.export_archive import ArchiveMember, is_export_archive, list_json_members
+from loaders.json_stream import iter_json_file
+from tests.factories import make_record
+
+HISTORY = [make_record(i) for i in range(3)]
+
+
+def export_zip(fp):
+    """Write an export archive like Spotify's, with the clutter macOS adds when re-zipping it."""
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("Spotify Extended Streaming History/", "")
+        archive.writestr("Spotify Extended Streaming History/Streaming_History_Audio_2020_0.json", json.dumps(HISTORY))
+        archive.writestr("Spotify Extended Streaming History/nested/Streaming_History_Audio_2021_1.json", "[]")
+        archive.writestr("Spotify Extended Streaming History/ReadMeFirst.pdf", b"%PDF")
+        archive.writestr("Spotify Extended Streaming History/._Streaming_History_Audio_2020_0.json", b"\0\5\26\7")
+        archive.writestr("__MACOSX/Spotify Extended Streaming History/._Streaming_History_Audio_2020_0.json", b"\0")
+    return fp
+
+
+@pytest.fixture
+def archive():
+    return export_zip(io.BytesIO())
+
+
+def test_lists_json_members_at_any_depth(archive):
+    members = list_json_members(archive)
+
+    assert [member.member for member in members] == [
+        "Spotify Extended Streaming History/Streaming_History_Audio_2020_0.json",
+        "Spotify Extended Streaming History/nested/Streaming_History_Audio_2021_1.json",
+    ]
+    assert [member.name for member in members] == ["Streaming_History_Audio_2020_0.json", "Streaming_History_Audio_2021_1.json"]
+
+
+def test_members_read_like_files(archive):
+    member = list_json_members(archive)[0]
+    data = json.dumps(HISTORY).encode()
+
+    assert member.stat().st_size == len(data)
+    assert member.read_bytes() == data
+    with member.open() as f:
+        assert json.load(f) == HISTORY
+    assert list(iter_json_file(member)) == HISTORY
+
+
+def test_members_are_read_only(archive):
+    with pytest.raises(ValueError):
+        list_json_members(archive)[0].open("w")
+
+
+def test_archive_files_are_recognized_and_members_pickle(tmp_path):
+    path = export_zip(tmp_path / "my_spotify_data.zip")
+    (tmp_path / "Streaming_History_Audio_2020_0.json").write_text("[]")
+
+    assert is_export_archive(path)
+    assert not is_export_archive(tmp_path / "Streaming_History_Audio_2020_0.json")
+    assert not is_export_archive(tmp_path)
+    # Members are sent to parse worker processes
+    member = pickle.loads(pickle.dumps(list_json_members(path)[0]))
+    assert member == ArchiveMember(path, "Spotify Extended Streaming History/Streaming_History_Audio_2020_0.json")
+    assert member.read_bytes() == json.dumps(HISTORY).encode()
@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+from loaders.json_stream import iter_json_array, iter_json_batches
+
+CHUNK_SIZES = [1, 2, 3, 5, 7, 64, 1 << 16]
+
+
+def parse(text: str, chunk_size: int):
+    return list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    "[]",
+    " [ ] ",
+    "[1.5e10]",
+    "[1234, -56]",
+    "[0, 12.75, -3e-2]",
+    '[{"ts": "2024-01-01T00:00:00Z", "ms_played": 1234}, {"nested": [1, [2, 3]], "s": "a,]b"}]',
+    '[null, true, false, "\\u00e9\\"x"]',
+    "[\n  {\n    \"a\": 1\n  },\n  {\n    \"a\": 2\n  }\n]\n",
+])
+def test_matches_json_loads_at_any_chunk_boundary(text, chunk_size):
+    assert parse(text, chunk_size) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("text", [
+    "",
+    "   ",
+    "{}",
+    "[",
+    "[1",
+    "[1,",
+    "[1 2]",
+    "[1,,2]",
+    "[,1]",
+    "[1,]",
+    "[1]garbage",
+    "[1] [2]",
+    '["a" "b"]',
+    "[nul]",
+    "[1.]",
+])
+def test_rejects_malformed_arrays(text, chunk_size):
+    with pytest.raises(ValueError):
+        parse(text, chunk_size)
+
+
+@pytest.mark.parametrize("text", ['["a"x', "[1x", "[{}{}", "[1.5x", "[true1"])
+def test_rejects_a_bad_delimiter_without_reading_on(text):
+    reads = []
+
+    class Reader(io.StringIO):
+        def read(self, size=-1):
+            reads.append(size)
+            return super().read(size)
+
+    # The rest of the document is never needed to reject it
+    with pytest.raises(ValueError):
+        list(iter_json_array(Reader(text + " " * 1000 + "]"), chunk_size=len(text)))
+    assert len(reads) == 1
+
+
+def test_batches_skip_start_records(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps([{"i": i} for i in range(7)]), encoding="utf-8")
+
+    batches = list(iter_json_batches(path, batch_size=3, start=2))
+
+    assert [[record["i"] for record in batch] for batch in batches] == [[2, 3, 4], [5, 6]]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from loaders import parse_stage
+from loaders.profiling import LoadProfiler
+from tests.factories import make_record
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    records = [make_record(i) for i in range(25)]
+    records[7]["ms_played"] = "not a number"
+    path = tmp_path / "Streaming_History_Audio_2020.json"
+    path.write_text(json.dumps(records))
+    return path
+
+
+def validated_batches(path, run_size):
+    quarantine = []
+    batches = list(parse_stage._iter_validated_batches(path, run_size, True, quarantine, LoadProfiler()))
+    return batches, quarantine
+
+
+def test_record_size_lower_bound():
+    record = {key: None for key in make_record(0)}
+    assert len(json.dumps(record, separators=(",", ":"))) >= parse_stage.MIN_RECORD_BYTES
+
+
+def test_small_file_is_validated_from_bytes(export_file, monkeypatch):
+    calls = []
+    validate_json_bytes = parse_stage.validate_json_bytes
+    monkeypatch.setattr(parse_stage, "validate_json_bytes",
+                        lambda *args, **kwargs: calls.append(1) or validate_json_bytes(*args, **kwargs))
+
+    batches, quarantine = validated_batches(export_file, run_size=100)
+
+    assert calls == [1]
+    assert sum(raw_count for raw_count, _ in batches) == 25
+    assert [q.index for q in quarantine] == [7]
+
+
+def test_large_file_is_validated_one_run_at_a_time(export_file, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("whole file validated at once")
+    monkeypatch.setattr(parse_stage, "validate_json_bytes", fail)
+
+    batches, quarantine = validated_batches(export_file, run_size=10)
+
+    assert [raw_count for raw_count, _ in batches] == [10, 10, 5]
+    assert [len(records) for _, records in batches] == [9, 10, 5]
+    assert [q.index for q in quarantine] == [7]
+
+
+def test_both_paths_validate_the_same_records(export_file):
+    small, _ = validated_batches(export_file, run_size=100)
+    large, _ = validated_batches(export_file, run_size=10)
+
+    def flatten(batches):
+        return [record for _, records in batches for record in records]
+    assert flatten(small) == flatten(large)
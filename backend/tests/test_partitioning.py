@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+from database.migrations import index_exists, partition_streams_by_year, run_migrations
+from database.partitioning import create_year_partitions, is_partitioned, partition_years, years_between
+
+UTC = timezone.utc
+
+
+@pytest.mark.parametrize("first, last, years", [
+    (datetime(2020, 3, 1, tzinfo=UTC), datetime(2020, 9, 1, tzinfo=UTC), [2020]),
+    (datetime(2019, 12, 31, tzinfo=UTC), datetime(2022, 1, 1, tzinfo=UTC), [2019, 2020, 2021, 2022]),
+    # Years are UTC years, whatever the offset of the timestamps
+    (datetime(2020, 12, 31, 20, tzinfo=timezone(timedelta(hours=-5))), datetime(2021, 6, 1, tzinfo=UTC), [2021]),
+    (datetime(2021, 1, 1, 8, tzinfo=timezone(timedelta(hours=13))), datetime(2021, 6, 1, tzinfo=UTC), [2020, 2021]),
+])
+def test_years_between(first, last, years):
+    assert list(years_between(first, last)) == years
+
+
+def test_create_year_partitions_is_idempotent(empty_db):
+    with empty_db.begin() as connection:
+        assert create_year_partitions(connection, "spotify_streams", [2021, 2020]) == [
+            "spotify_streams_y2020", "spotify_streams_y2021"
+        ]
+        create_year_partitions(connection, "spotify_streams", [2021, 2022])
+        years = partition_years(connection, "spotify_streams")
+    assert years == {2020, 2021, 2022}
+
+
+INSERT_STREAMS = """
+    INSERT INTO spotify_streams (
+        ts, platform, ms_played, conn_country, ip_addr, reason_start, reason_end, shuffle, skipped, offline, incognito_mode
+    )
+    SELECT ts, 'android', 1000, 'NZ', '10.0.0.1', 'trackdone', 'trackdone', false, false, false, false
+    FROM {timestamps} AS s(ts)
+"""
+LEGACY_STREAMS = INSERT_STREAMS.format(
+    timestamps="generate_series(timestamptz '2019-12-31 12:00+00', timestamptz '2021-01-01 12:00+00', interval '6 hours')"
+)
+
+
+@pytest.fixture
+def legacy_db(empty_db):
+    """The empty test schema with spotify_streams as created before partitioning and the BRIN index."""
+    with empty_db.begin() as connection:
+        connection.execute(text("CREATE TABLE legacy_streams (LIKE spotify_streams INCLUDING CONSTRAINTS)"))
+        connection.execute(text("DROP TABLE spotify_streams"))
+        connection.execute(text("ALTER TABLE legacy_streams RENAME TO spotify_streams"))
+        connection.execute(text("CREATE SEQUENCE spotify_streams_id_seq OWNED BY spotify_streams.id"))
+        connection.execute(text("ALTER TABLE spotify_streams ALTER COLUMN id SET DEFAULT nextval('spotify_streams_id_seq')"))
+        connection.execute(text("ALTER TABLE spotify_streams ADD CONSTRAINT spotify_streams_pkey PRIMARY KEY (id)"))
+        connection.execute(text("CREATE INDEX idx_spotify_streams_ts ON spotify_streams (ts)"))
+        connection.execute(text("CREATE INDEX idx_spotify_streams_platform ON spotify_streams (platform)"))
+        connection.execute(text(LEGACY_STREAMS))
+    return empty_db
+
+
+def test_migration_replaces_the_ts_btree_with_brin(legacy_db):
+    run_migrations(legacy_db)
+
+    with legacy_db.connect() as connection:
+        assert index_exists(connection, "idx_spotify_streams_ts_brin")
+        assert not index_exists(connection, "idx_spotify_streams_ts")
+
+
+def test_conversion_copies_all_streams_into_yearly_partitions(legacy_db):
+    run_migrations(legacy_db)
+    with legacy_db.connect() as connection:
+        before = connection.execute(text("SELECT id, ts FROM spotify_streams ORDER BY id")).all()
+
+    with legacy_db.begin() as connection:
+        copied = partition_streams_by_year(connection)
+
+    with legacy_db.begin() as connection:
+        assert copied == len(before)
+        assert is_partitioned(connection, "spotify_streams")
+        assert partition_years(connection, "spotify_streams") == {2019, 2020, 2021}
+        # Streams keep their ids, and new ones continue after them
+        assert connection.execute(text("SELECT id, ts FROM spotify_streams ORDER BY id")).all() == before
+        new_id = connection.execute(text(
+            INSERT_STREAMS.format(timestamps="(VALUES (timestamptz '2021-06-01 00:00+00'))") + " RETURNING id"
+        )).scalar_one()
+        assert new_id == before[-1].id + 1
+        for index_name in ("spotify_streams_pkey", "idx_spotify_streams_ts_brin", "idx_spotify_streams_platform",
+                           "uq_spotify_streams_natural_key"):
+            assert index_exists(connection, index_name)
+        assert connection.execute(text(
+            "SELECT 1 FROM pg_namespace WHERE nspname = 'spotify_streams_unpartitioned'"
+        )).first() is None
+        # Converting again is a no-op
+        assert partition_streams_by_year(connection) == 0
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from database.period_filters import filter_year, get_cutoff_date, period_bounds, ts_range, year_bounds
+from database.schema import SpotifyStream
+from routers import listeningPatternsAnalytics, musicAnalytics
+
+UTC = timezone.utc
+
+
+def test_utc_year_bounds_are_literal_timestamps():
+    start, end = year_bounds(2020)
+    assert start == datetime(2020, 1, 1, tzinfo=UTC)
+    assert end == datetime(2021, 1, 1, tzinfo=UTC)
+
+
+@pytest.mark.parametrize("year", [1970, 1999, 2024])
+def test_year_bounds_cover_exactly_one_year(year):
+    start, end = year_bounds(year)
+    assert (start.year, start.month, start.day) == (year, 1, 1)
+    assert end == year_bounds(year + 1)[0]
+    last_moment = end - timedelta(microseconds=1)
+    assert (last_moment.year, last_moment.month, last_moment.day) == (year, 12, 31)
+
+
+def test_non_utc_year_bounds_resolve_local_midnight_in_postgres():
+    start, end = year_bounds(2020, "Pacific/Auckland")
+    for bound, year in ((start, 2020), (end, 2021)):
+        assert bound.name == "make_timestamptz"
+        assert [argument.value for argument in bound.clauses] == [year, 1, 1, 0, 0, 0, "Pacific/Auckland"]
+
+
+def test_ts_range_compares_the_bare_column():
+    start, end = year_bounds(2020)
+    predicate = ts_range(start, end)
+    sql = str(predicate.compile())
+    assert sql == "spotify_streams.ts >= :ts_1 AND spotify_streams.ts < :ts_2"
+    assert predicate.compile().params == {"ts_1": start, "ts_2": end}
+
+
+def test_ts_range_leaves_out_open_bounds():
+    start = datetime(2020, 1, 1, tzinfo=UTC)
+    assert ts_range(None, None) is None
+    assert str(ts_range(start, None).compile()) == "spotify_streams.ts >= :ts_1"
+    assert str(ts_range(None, start).compile()) == "spotify_streams.ts < :ts_1"
+
+
+def test_period_bounds():
+    now = datetime(2024, 3, 1, tzinfo=UTC)
+    assert period_bounds("2019", now) == year_bounds(2019)
+    assert period_bounds("7d", now) == (now - timedelta(days=7), None)
+    assert period_bounds("all_time", now) == (None, None)
+    assert get_cutoff_date("all_time", now) is None
+
+
+def year_query(year, timezone="UTC"):
+    return filter_year(select(func.count()).select_from(SpotifyStream), year, timezone)
+
+
+def scanned_partitions(plan):
+    return {f"y{year}" for year in range(2018, 2023) if f"spotify_streams_y{year}" in plan}
+
+
+def test_utc_year_filter_prunes_other_partitions(stream_db, explain):
+    with stream_db.connect() as connection:
+        plan = explain(connection, year_query(2020))
+    assert scanned_partitions(plan) == {"y2020"}
+
+
+def test_local_year_filter_prunes_partitions_at_executor_startup(stream_db, explain):
+    # 2020 in Auckland starts on 2019-12-31 in UTC, so it reaches into the 2019 partition
+    with stream_db.connect() as connection:
+        plan = explain(connection, year_query(2020, "Pacific/Auckland"))
+    assert scanned_partitions(plan) == {"y2019", "y2020"}
+    assert "Subplans Removed: 1" in plan
+
+
+def test_year_filter_matches_the_streams_of_that_year(stream_db):
+    with stream_db.connect() as connection:
+        count = connection.execute(year_query(2020)).scalar_one()
+    # A stream every two hours of the leap year 2020
+    assert count == 366 * 12
+
+
+# Plays and played time per track over [start, end), straight from the streams
+RAW_TRACK_TOTALS = """
+    SELECT master_metadata_track_name, count(*), sum(ms_played)
+    FROM spotify_streams
+    WHERE spotify_track_uri IS NOT NULL AND ts >= :start AND ts < :end
+    GROUP BY 1
+"""
+RAW_LOCAL_MONTHS = """
+    SELECT extract(year FROM local_ts)::int, extract(month FROM local_ts)::int, count(*), sum(ms_played)
+    FROM (SELECT ts AT TIME ZONE :timezone AS local_ts, ms_played FROM spotify_streams
+          WHERE spotify_track_uri IS NOT NULL) AS s
+    WHERE extract(year FROM local_ts) = :year
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+
+def top_tracks(db, period):
+    return asyncio.run(musicAnalytics.get_top_tracks.__wrapped__(
+        db=db, period=period, limit=500, include_images=False, refresh_cache=False
+    ))
+
+
+@pytest.mark.parametrize("period, start, end", [
+    ("2020", datetime(2020, 1, 1, tzinfo=UTC), datetime(2021, 1, 1, tzinfo=UTC)),
+    ("all_time", datetime(1970, 1, 1, tzinfo=UTC), datetime(2100, 1, 1, tzinfo=UTC)),
+    # The streams end in 2021, long before any relative period
+    ("7d", datetime.now(UTC) - timedelta(days=7), datetime(2100, 1, 1, tzinfo=UTC)),
+])
+def test_top_tracks_route_totals_the_period(stream_db, period, start, end):
+    with stream_db.connect() as connection:
+        expected = {
+            name: (plays, total_ms)
+            for name, plays, total_ms in connection.execute(text(RAW_TRACK_TOTALS), {"start": start, "end": end})
+        }
+    with Session(stream_db) as db:
+        tracks = top_tracks(db, period)
+
+    assert {track.track_name: (track.play_count, track.total_ms) for track in tracks} == expected
+    assert [track.total_ms for track in tracks] == sorted((track.total_ms for track in tracks), reverse=True)
+
+
+def test_top_tracks_route_rejects_unknown_periods(stream_db):
+    with Session(stream_db) as db, pytest.raises(HTTPException) as error:
+        top_tracks(db, "2020-01")
+    assert error.value.status_code == 422
+
+
+@pytest.mark.parametrize("timezone", ["UTC", "Australia/Sydney", "Asia/Kolkata"])
+def test_monthly_trends_route_covers_the_local_year(stream_db, timezone):
+    with stream_db.connect() as connection:
+        expected = [tuple(row) for row in connection.execute(
+            text(RAW_LOCAL_MONTHS), {"timezone": timezone, "year": 2020}
+        )]
+    with Session(stream_db) as db:
+        trends = listeningPatternsAnalytics.get_monthly_trends.__wrapped__(year=2020, timezone=timezone, db=db)
+
+    assert len(expected) == 12
+    assert [(month.year, month.month, month.stream_count, month.total_ms)
+            for month in trends.monthly_trends] == expected
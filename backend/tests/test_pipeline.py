@@ -0,0 +1,81 @@
+import itertools
+import threading
+
+import pytest
+
+from loaders.pipeline import Pipeline
+
+
+def run(pipeline, timeout=10):
+    """Run a pipeline on a helper thread, failing instead of hanging if it never finishes."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["stats"] = pipeline.run()
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not finish"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["stats"]
+
+
+def test_items_pass_every_stage_in_order():
+    received = []
+    pipeline = Pipeline("source", range(10), [
+        ("double", lambda item: item * 2),
+        ("drop_ten", lambda item: None if item == 10 else item),
+        ("sink", received.append),
+    ], queue_size=2)
+
+    stats = run(pipeline)
+
+    assert received == [0, 2, 4, 6, 8, 12, 14, 16, 18]
+    assert stats["source"]["items"] == 10
+    assert stats["double"]["items"] == 10
+    assert stats["sink"]["items"] == 9
+    assert stats["bottleneck"] in {"source", "double", "drop_ten", "sink"}
+
+
+def test_stage_error_stops_the_pipeline_and_is_raised():
+    def fail_on_three(item):
+        if item == 3:
+            raise ValueError("bad item")
+        return item
+
+    # An endless source only stops because the failing stage stops the pipeline
+    pipeline = Pipeline("source", itertools.count(), [("validate", fail_on_three), ("sink", lambda item: None)],
+                        queue_size=1)
+
+    with pytest.raises(ValueError, match="bad item"):
+        run(pipeline)
+
+
+def test_sink_error_does_not_deadlock_a_full_upstream():
+    def sink(item):
+        raise RuntimeError("write failed")
+
+    pipeline = Pipeline("source", itertools.count(), [("extract", lambda item: item), ("sink", sink)],
+                        queue_size=1)
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        run(pipeline)
+
+
+def test_source_error_is_raised():
+    def source():
+        yield 1
+        raise OSError("read failed")
+
+    received = []
+    pipeline = Pipeline("source", source(), [("sink", received.append)])
+
+    with pytest.raises(OSError, match="read failed"):
+        run(pipeline)
+    assert received in ([], [1])
+
@@ -0,0 +1,49 @@
+import json
+import pickle
+
+from loaders.parse_stage import parse_file
+from loaders.profiling import LoadProfiler, StageProfile
+from tests.factories import make_record
+
+
+def test_merge_adds_worker_totals_to_the_same_stages():
+    profiler = LoadProfiler()
+    profiler.record(StageProfile("validate", calls=2, wall_seconds=1.0, cpu_seconds=0.5,
+                                 rows_in=20, rows_out=19, peak_memory_bytes=100))
+    worker = [
+        StageProfile("validate", calls=3, wall_seconds=2.0, cpu_seconds=1.5, rows_in=30, rows_out=30,
+                     peak_memory_bytes=50),
+        StageProfile("sort", calls=1, wall_seconds=0.25, rows_in=30, rows_out=30),
+    ]
+
+    profiler.merge(worker)
+    profiler.merge(worker)
+
+    stages = profiler.to_dict()["stages"]
+    assert list(stages) == ["validate", "sort"]
+    assert stages["validate"] == {
+        "calls": 8, "wall_seconds": 5.0, "cpu_seconds": 3.5, "rows_in": 80, "rows_out": 79,
+        "rows_per_sec": 16.0, "peak_memory_mb": round(100 / (1024 * 1024), 2),
+    }
+    assert stages["sort"]["calls"] == 2 and stages["sort"]["rows_out"] == 60
+    assert stages["sort"]["peak_memory_mb"] is None
+    # Merging copies the totals, so the worker's profiles are left as they were
+    assert worker[0].calls == 3
+
+
+def test_parse_worker_profile_merges_into_the_load_profile(tmp_path):
+    path = tmp_path / "Streaming_History_Audio_2020.json"
+    path.write_text(json.dumps([make_record(i) for i in range(25)]))
+
+    # The profile comes back from a parse worker process, so it goes through pickle
+    parsed = pickle.loads(pickle.dumps(parse_file(path, 10, tmp_path)))
+    profiler = LoadProfiler()
+    with profiler.stage("discover"):
+        pass
+    profiler.merge(parsed.profile)
+
+    stages = profiler.to_dict()["stages"]
+    assert list(stages)[0] == "discover"
+    assert {"json_parse", "validate", "columnar", "sort", "spill"} <= set(stages)
+    assert stages["validate"]["rows_out"] == 25
+    assert stages["sort"]["rows_out"] == 25
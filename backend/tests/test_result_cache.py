@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+import pytest
+from fastapi import Query
+
+from services import result_cache as result_cache_module
+from services.result_cache import ResultCache, canonical_timezone
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.monotonic in the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def dataset_version(monkeypatch):
+    """Controllable dataset version seen by cached routes."""
+    version = [1]
+    monkeypatch.setattr(result_cache_module, "current_dataset_version", lambda db: version[0])
+    return version
+
+
+def test_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1, "A")
+    cache.set("b", 1, "B")
+    assert cache.get("a", 1) == (True, "A")
+
+    cache.set("c", 1, "C")
+
+    assert cache.get("b", 1) == (False, None)
+    assert cache.get("a", 1) == (True, "A")
+    assert cache.get("c", 1) == (True, "C")
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_new_dataset_version_drops_all_results():
+    cache = ResultCache()
+    cache.set("a", 1, "A")
+    cache.set("b", 1, "B")
+
+    assert cache.get("a", 2) == (False, None)
+    assert cache.get("b", 2) == (False, None)
+    assert cache.get_stats()["invalidations"] == 2
+    assert cache.get_stats()["dataset_version"] == 2
+
+
+def test_results_of_an_older_version_are_not_stored():
+    cache = ResultCache()
+    cache.get("a", 2)
+    # E.g. a request that read version 1 before a load finished
+    cache.set("a", 1, "stale")
+    assert cache.get("a", 2) == (False, None)
+    assert cache.get("a", 1) == (False, None)
+
+
+def test_results_expire(clock):
+    cache = ResultCache(max_age=60)
+    cache.set("a", 1, "A")
+    clock[0] += 59
+    assert cache.get("a", 1) == (True, "A")
+    clock[0] += 1
+    assert cache.get("a", 1) == (False, None)
+    assert cache.get_stats()["expirations"] == 1
+
+
+@pytest.mark.parametrize("name, canonical", [
+    ("Europe/Zurich", "Europe/Zurich"),
+    ("europe/zurich", "Europe/Zurich"),
+    ("AMERICA/NEW_YORK", "America/New_York"),
+    ("utc", "UTC"),
+    ("Etc/UTC", "UTC"),
+    ("Mars/Olympus_Mons", "Mars/Olympus_Mons"),
+])
+def test_canonical_timezone(name, canonical):
+    assert canonical_timezone(name) == canonical
+
+
+def counting_route(cache):
+    calls = []
+
+    @cache.cached
+    def route(year: Optional[int] = None, timezone: str = "UTC", period: str = Query("all_time"),
+              refresh_cache: bool = False, db=None):
+        calls.append((year, timezone))
+        return len(calls)
+    return route, calls
+
+
+def test_equivalent_arguments_share_an_entry(dataset_version):
+    route, calls = counting_route(ResultCache())
+
+    first = route(db=None)
+    assert route(year=None, timezone="Etc/UTC", period="ALL_TIME", db=None) == first
+    assert route(timezone="europe/zurich", db=None) == route(timezone="Europe/Zurich", db=None)
+    # Misses call the route with the arguments as given
+    assert calls == [(None, "UTC"), (None, "europe/zurich")]
+
+
+def test_refresh_and_new_versions_recompute(dataset_version):
+    route, calls = counting_route(ResultCache())
+
+    assert route(year=2020, db=None) == 1
+    assert route(year=2020, refresh_cache=True, db=None) == 2
+    assert route(year=2020, db=None) == 2
+    dataset_version[0] += 1
+    assert route(year=2020, db=None) == 3
+
+
+def test_relative_periods_are_keyed_by_their_start_day(dataset_version, monkeypatch):
+    route, calls = counting_route(ResultCache())
+    cutoff = [datetime(2024, 3, 1, 9, tzinfo=timezone.utc)]
+    monkeypatch.setattr(result_cache_module, "get_cutoff_date",
+                        lambda period: cutoff[0] if period == "7d" else None)
+
+    assert route(period="7d", db=None) == 1
+    cutoff[0] = datetime(2024, 3, 1, 17, tzinfo=timezone.utc)
+    assert route(period="7d", db=None) == 1
+    cutoff[0] = datetime(2024, 3, 2, 9, tzinfo=timezone.utc)
+    assert route(period="7d", db=None) == 2
+
+
+def test_async_routes_are_cached(dataset_version):
+    cache = ResultCache()
+    calls = []
+
+    @cache.cached
+    async def route(limit: int = 50, db=None):
+        calls.append(limit)
+        return limit
+
+    assert asyncio.run(route(db=None)) == asyncio.run(route(limit=50, db=None)) == 50
+    assert calls == [50]
+
+
+def test_disabled_cache_always_calls_the_route(dataset_version):
+    route, calls = counting_route(ResultCache(enabled=False))
+    route(db=None)
+    route(db=None)
+    assert len(calls) == 2
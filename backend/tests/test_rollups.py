@@ -0,0 +1,107 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from database.period_filters import filter_year
+from database.rollups import local_hour_totals, merge_day_ranges, split_days, year_days
+from database.schema import ContentType, StreamFact
+from routers import listeningPatternsAnalytics
+
+UTC = timezone.utc
+
+
+def at(day, hour=0, minute=0, tz=UTC):
+    return datetime(2024, 3, day, hour, minute, tzinfo=tz)
+
+
+@pytest.mark.parametrize("start, end, days, partial", [
+    # Open on both ends: everything from the rollups
+    (None, None, (None, None), []),
+    # Whole days only
+    (at(1), at(4), (date(2024, 3, 1), date(2024, 3, 4)), []),
+    (at(1), None, (date(2024, 3, 1), None), []),
+    (None, at(4), (None, date(2024, 3, 4)), []),
+    # A relative period starting mid-day
+    (at(1, 10, 30), None, (date(2024, 3, 2), None), [(at(1, 10, 30), at(2))]),
+    # Partial days on both ends
+    (at(1, 10), at(4, 6), (date(2024, 3, 2), date(2024, 3, 4)), [(at(1, 10), at(2)), (at(4), at(4, 6))]),
+    # Within a single day, or ending the day after a partial start
+    (at(1, 10), at(1, 12), None, [(at(1, 10), at(1, 12))]),
+    (at(1, 10), at(2), None, [(at(1, 10), at(2))]),
+    (at(1, 10), at(2, 5), None, [(at(1, 10), at(2, 5))]),
+])
+def test_split_days(start, end, days, partial):
+    assert split_days(start, end) == (days, partial)
+
+
+def test_split_days_uses_utc_days():
+    # Midnight in Zurich is 23:00 UTC the day before, so neither end is a whole UTC day
+    zurich = timezone(timedelta(hours=1))
+    days, partial = split_days(at(2, tz=zurich), at(4, tz=zurich))
+    assert days == (date(2024, 3, 2), date(2024, 3, 3))
+    assert partial == [(at(2, tz=zurich), at(2)), (at(3), at(4, tz=zurich))]
+
+
+def test_split_days_covers_the_range_exactly():
+    start, end = at(1, 7, 15), at(9, 22, 45)
+    (first_day, end_day), partial = split_days(start, end)
+    pieces = sorted(partial + [(datetime.combine(first_day, datetime.min.time(), UTC),
+                                datetime.combine(end_day, datetime.min.time(), UTC))])
+    assert pieces[0][0] == start and pieces[-1][1] == end
+    assert all(a[1] == b[0] for a, b in zip(pieces, pieces[1:]))
+
+
+def test_year_days():
+    assert year_days(None) == (None, None)
+    assert year_days(2024) == (date(2024, 1, 1), date(2025, 1, 1))
+
+
+def test_merge_day_ranges_joins_overlapping_and_adjacent_ranges():
+    ranges = [(date(2024, 3, 5), date(2024, 3, 6)), (date(2024, 3, 1), date(2024, 3, 2)),
+              (date(2024, 3, 3), date(2024, 3, 3)), (date(2024, 3, 10), date(2024, 3, 12)),
+              (date(2024, 3, 11), date(2024, 3, 11))]
+    assert merge_day_ranges(ranges) == [
+        (date(2024, 3, 1), date(2024, 3, 3)), (date(2024, 3, 5), date(2024, 3, 6)),
+        (date(2024, 3, 10), date(2024, 3, 12))
+    ]
+
+
+HEATMAP_FIELDS = {"day_of_week": "dow", "hour_of_day": "hour"}
+MONTH_FIELDS = {"year": "year", "month": "month"}
+
+
+def fact_totals(db, year, timezone, fields):
+    """Aggregate the music facts themselves by local calendar fields."""
+    local = func.timezone(timezone, StreamFact.ts)
+    parts = [extract(field, local).label(label) for label, field in fields.items()]
+    query = db.query(*parts, func.count(), func.sum(StreamFact.ms_played)).filter(
+        StreamFact.content_type == ContentType.MUSIC
+    )
+    return [tuple(row) for row in filter_year(query, year, timezone, column=StreamFact.ts).group_by(*parts).order_by(*parts)]
+
+
+@pytest.mark.parametrize("fields", [HEATMAP_FIELDS, MONTH_FIELDS])
+@pytest.mark.parametrize("timezone", ["Europe/Zurich", "America/New_York", "Pacific/Auckland"])
+def test_local_hour_totals_match_the_facts_across_dst_changes(stream_db, timezone, fields):
+    # The streams are two hours apart at even UTC hours, so they fall on odd and even local hours as DST starts and ends
+    with Session(stream_db) as db:
+        rows = local_hour_totals(db, ContentType.MUSIC, 2020, timezone, fields)
+        expected = fact_totals(db, 2020, timezone, fields)
+    assert [(*(getattr(row, label) for label in fields), row.stream_count, row.total_ms) for row in rows] == expected
+
+
+@pytest.mark.parametrize("timezone", ["Asia/Kolkata", "Asia/Kathmandu"])
+def test_sub_hour_offsets_fall_back_to_the_facts(stream_db, timezone):
+    with Session(stream_db) as db:
+        assert local_hour_totals(db, ContentType.MUSIC, 2020, timezone, HEATMAP_FIELDS) is None
+        heatmap = listeningPatternsAnalytics.get_listening_heatmap.__wrapped__(year=2020, timezone=timezone, db=db)
+        expected = fact_totals(db, 2020, timezone, HEATMAP_FIELDS)
+
+    # The heatmap lists Monday first, Postgres numbers Sunday 0
+    cells = {
+        ((day + 1) % 7, hour): (cell.stream_count, cell.total_ms)
+        for day, hours in enumerate(heatmap.heatmap_data) for hour, cell in enumerate(hours) if cell.stream_count
+    }
+    assert cells == {(dow, hour): (count, total) for dow, hour, count, total in expected}
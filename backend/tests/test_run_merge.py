@@ -0,0 +1,81 @@
+import pytest
+
+from loaders import run_merge
+from loaders.columnar import STRING_COLUMNS, StreamColumns
+from loaders.run_merge import SortedRun, merge_runs
+from models.models import SpotifyStreamRecord
+from tests.factories import make_record
+
+COLUMNS = ("ts", "ms_played", "offline_timestamp", "shuffle", *STRING_COLUMNS)
+
+
+def record(i, hour, **fields):
+    return SpotifyStreamRecord.model_validate(make_record(i, ts=f"2020-01-01T{hour:02d}:00:00Z", **fields))
+
+
+def decoded(columns: StreamColumns):
+    return list(columns.rows(COLUMNS))
+
+
+def run_of(records):
+    return SortedRun(StreamColumns.from_records(records))
+
+
+@pytest.fixture
+def runs():
+    """Three runs with interleaved, partly equal timestamps and their own text dictionaries."""
+    return [
+        run_of([record(i, hour, platform=f"platform {i % 2}") for i, hour in enumerate([5, 1, 3, 7, 3, 9, 11])]),
+        run_of([record(100 + i, hour, offline_timestamp=1577836800 + i) for i, hour in enumerate([2, 3, 8, 0])]),
+        run_of([record(200 + i, hour, shuffle=True, conn_country="CH") for i, hour in enumerate([3, 4, 6, 10, 12])]),
+    ]
+
+
+def test_runs_are_sorted_stably():
+    run = run_of([record(0, 5), record(1, 1), record(2, 5), record(3, 0)])
+    assert [row[1] for row in decoded(run.columns)] == [1003, 1001, 1000, 1002]
+
+
+@pytest.mark.parametrize("spilled", [[], [0], [0, 1, 2]])
+def test_merge_yields_all_rows_in_time_order(runs, spilled, tmp_path, monkeypatch):
+    # Small chunks, so spilled runs are read back over several chunks
+    monkeypatch.setattr(run_merge, "SPILL_CHUNK_SIZE", 2)
+    expected = sorted(
+        (row for index, run in enumerate(runs) for row in [(index, values) for values in decoded(run.columns)]),
+        key=lambda item: item[1][0]
+    )
+    for index in spilled:
+        runs[index].spill(tmp_path)
+
+    merged = StreamColumns.gather((chunk, row) for _, chunk, row in merge_runs(runs))
+
+    # Equal timestamps keep the order of their runs
+    assert decoded(merged) == [values for _, values in expected]
+
+
+def test_gather_merges_the_dictionaries_of_its_sources(runs):
+    rows = [(runs[2].columns, 0), (runs[0].columns, 1), (runs[1].columns, 0), (runs[0].columns, 0)]
+
+    gathered = StreamColumns.gather(rows)
+
+    assert decoded(gathered) == [decoded(source)[row] for source, row in rows]
+    # Only values of gathered rows are kept, once each, in first-seen order
+    assert gathered.dictionaries["conn_country"] == ["CH", "NZ"]
+    assert list(gathered.codes["conn_country"]) == [0, 1, 1, 1]
+    assert gathered.dictionaries["platform"] == ["android", "platform 0", "platform 1"]
+    assert len(StreamColumns.gather([])) == 0
+
+
+def test_spill_releases_rows_and_reads_them_back_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_merge, "SPILL_CHUNK_SIZE", 3)
+    run = run_of([record(i, i) for i in range(7)])
+    rows = decoded(run.columns)
+
+    run.spill(tmp_path)
+
+    assert run.spilled and run.columns is None
+    assert run.path.parent == tmp_path
+    chunks = list(run.chunks())
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [values for chunk in chunks for values in decoded(chunk)] == rows
+    assert [ts for ts, _, _ in run] == sorted(ts for ts, _, _ in run)
@@ -0,0 +1,53 @@
+from sqlalchemy import text
+
+from database.partitioning import create_year_partitions
+from loaders.columnar import StreamColumns
+from loaders.staging_merge import copy_to_staging, merge_staging, prepare_staging_table, staged_ts_range
+from models.models import SpotifyStreamRecord
+from tests.factories import make_record
+
+TRACK = "spotify:track:a"
+
+
+def columns_of(*records):
+    return StreamColumns.from_records(SpotifyStreamRecord.model_validate(record) for record in records)
+
+
+def test_merge_dedupes_and_keeps_export_order(empty_db):
+    # In export order: a track stream at 03:00 under its first name, then the same track at 01:00 renamed,
+    # two streams sharing 02:00, and a repeat of the 03:00 stream from an overlapping export
+    first = make_record(0, ts="2020-01-01T03:00:00Z", spotify_track_uri=TRACK, master_metadata_track_name="First name")
+    renamed = make_record(1, ts="2020-01-01T01:00:00Z", spotify_track_uri=TRACK, master_metadata_track_name="Renamed")
+    tied = [make_record(i, ts="2020-01-01T02:00:00Z") for i in (2, 3)]
+    existing = make_record(4, ts="2020-01-01T04:00:00Z")
+
+    with empty_db.begin() as connection:
+        create_year_partitions(connection, "spotify_streams", [2020])
+        prepare_staging_table(connection)
+        copy_to_staging(connection, columns_of(existing), 0)
+        merge_staging(connection)
+
+        prepare_staging_table(connection)
+        copy_to_staging(connection, columns_of(first, renamed, *tied), 0)
+        copy_to_staging(connection, columns_of(first, existing), 4)
+        assert [ts.hour for ts in staged_ts_range(connection)] == [1, 4]
+        inserted = merge_staging(connection)
+
+        tracks = connection.execute(text("SELECT spotify_uri, name FROM tracks ORDER BY spotify_uri")).all()
+        streams = connection.execute(text(
+            "SELECT extract(hour FROM ts AT TIME ZONE 'UTC')::int, spotify_track_uri FROM spotify_streams ORDER BY id"
+        )).all()
+        staged = connection.execute(text("SELECT count(*) FROM spotify_streams_staging")).scalar_one()
+
+    # Each track takes the metadata of its first stream in export order, not in time order
+    assert (TRACK, "First name") in tracks
+    assert inserted == {"tracks": 3, "episodes": 0, "audiobook_chapters": 0, "streams": 4}
+    # Ids follow time, ties keep export order, and repeated or already loaded streams are skipped
+    assert [tuple(row) for row in streams] == [
+        (4, existing["spotify_track_uri"]),
+        (1, TRACK),
+        (2, tied[0]["spotify_track_uri"]),
+        (2, tied[1]["spotify_track_uri"]),
+        (3, TRACK),
+    ]
+    assert staged == 0
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.rollups import ARTIST_ROLLUP, AUDIOBOOK_ROLLUP, EPISODE_ROLLUP, TRACK_ROLLUP, rollup_aggregate
+from routers import discoveryAndVarietyAnalytics, listeningPatternsAnalytics, musicAnalytics, podcastAnalytics
+from routers.listeningPatternsAnalytics import Season
+
+
+def top_genres(db):
+    return asyncio.run(discoveryAndVarietyAnalytics.get_top_genres.__wrapped__(
+        year=2020, limit=50, weighting="even", db=db
+    ))
+
+
+def seasonal_top_content(db):
+    return asyncio.run(listeningPatternsAnalytics.get_seasonal_top_content.__wrapped__(
+        season=Season.SUMMER, year=2020, include_images=False, refresh_cache=False, db=db
+    ))
+
+
+def listening_heatmap(db):
+    # Kolkata is 5:30 ahead of UTC, so the hourly rollup cannot serve it
+    return listeningPatternsAnalytics.get_listening_heatmap.__wrapped__(year=2020, timezone="Asia/Kolkata", db=db)
+
+
+def monthly_trends(db):
+    return listeningPatternsAnalytics.get_monthly_trends.__wrapped__(year=2020, timezone="Asia/Kolkata", db=db)
+
+
+# Top-N routes over a relative period aggregate its partial first and last days from stream_facts
+def top_tracks(db):
+    return asyncio.run(musicAnalytics.get_top_tracks.__wrapped__(
+        period="7d", limit=50, include_images=False, refresh_cache=False, db=db
+    ))
+
+
+def top_episodes(db):
+    return asyncio.run(podcastAnalytics.get_top_episodes.__wrapped__(period="7d", limit=50, include_images=False, db=db))
+
+
+def top_shows(db):
+    return asyncio.run(podcastAnalytics.get_top_shows.__wrapped__(period="7d", limit=50, include_images=False, db=db))
+
+
+def top_audiobooks(db):
+    return podcastAnalytics.get_top_audiobooks.__wrapped__(period="7d", limit=50, db=db)
+
+
+@pytest.fixture
+def fact_statements(stream_db):
+    """Run a route on the test database and return the statements it ran on stream_facts."""
+    def run(route):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if "stream_facts" in statement:
+                statements.append((statement, parameters))
+
+        event.listen(stream_db, "before_cursor_execute", record)
+        try:
+            with Session(stream_db) as db:
+                route(db)
+        finally:
+            event.remove(stream_db, "before_cursor_execute", record)
+        return statements
+    return run
+
+
+@pytest.mark.parametrize("route, index", [
+    (top_genres, "idx_stream_facts_music_ts"),
+    (seasonal_top_content, "idx_stream_facts_music_ts"),
+    (listening_heatmap, "idx_stream_facts_music_ts"),
+    (monthly_trends, "idx_stream_facts_music_ts"),
+    (top_tracks, "idx_stream_facts_music_ts"),
+    (top_episodes, "idx_stream_facts_episode_ts"),
+    (top_shows, "idx_stream_facts_episode_ts"),
+    (top_audiobooks, "idx_stream_facts_audiobook_ts"),
+])
+def test_fact_queries_are_index_only_scans(route, index, stream_db, fact_statements, explain):
+    statements = fact_statements(route)
+    assert statements, "the route did not query stream_facts"
+    with stream_db.connect() as connection:
+        for statement, parameters in statements:
+            plan = explain(connection, statement, parameters)
+            assert f"Index Only Scan using {index}" in plan, plan
+            assert "Seq Scan on stream_facts" not in plan, plan
+
+
+@pytest.mark.parametrize("rollup, index", [
+    (TRACK_ROLLUP, "idx_stream_facts_music_ts"),
+    (ARTIST_ROLLUP, "idx_stream_facts_music_ts"),
+    (EPISODE_ROLLUP, "idx_stream_facts_episode_ts"),
+    (AUDIOBOOK_ROLLUP, "idx_stream_facts_audiobook_ts"),
+])
+def test_rollup_refreshes_read_the_partial_index_of_their_content(rollup, index, stream_db, explain):
+    # The days a load touched, like a month of new streams
+    start, end = datetime(2020, 6, 1, tzinfo=timezone.utc), datetime(2020, 7, 1, tzinfo=timezone.utc)
+    with stream_db.connect() as connection:
+        plan = explain(connection, rollup_aggregate(rollup, start, end))
+    assert f"Index Only Scan using {index}" in plan, plan
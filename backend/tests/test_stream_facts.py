@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from database.partitioning import create_year_partitions
+from database.schema import ContentType
+from database.stream_facts import refresh_stream_facts
+from loaders.columnar import StreamColumns
+from loaders.staging_merge import copy_to_staging, merge_staging, prepare_staging_table
+from models.models import SpotifyStreamRecord
+from tests.factories import make_record
+
+UTC = timezone.utc
+YEAR_2020 = (datetime(2020, 1, 1, tzinfo=UTC), datetime(2021, 1, 1, tzinfo=UTC))
+
+NO_MUSIC = dict(master_metadata_track_name=None, master_metadata_album_artist_name=None,
+                master_metadata_album_album_name=None, spotify_track_uri=None)
+
+RECORDS = [
+    make_record(0, ts="2020-01-01T00:00:00Z", platform="ios", conn_country="DE", reason_end="fwdbtn"),
+    make_record(1, ts="2020-01-01T01:00:00Z", master_metadata_album_artist_name="Other artist"),
+    make_record(2, ts="2020-01-01T02:00:00Z", **NO_MUSIC, episode_name="Episode", episode_show_name="Show",
+                spotify_episode_uri="spotify:episode:0", reason_start="clickrow"),
+    make_record(3, ts="2020-01-01T03:00:00Z", **NO_MUSIC, audiobook_title="Audiobook",
+                audiobook_uri="spotify:audiobook:0", audiobook_chapter_uri="spotify:chapter:0",
+                audiobook_chapter_title="Chapter"),
+    make_record(4, ts="2020-01-01T04:00:00Z", **NO_MUSIC),
+]
+
+# Facts with their keys resolved back to names, and the same columns straight from the streams
+RESOLVED_FACTS = """
+    SELECT f.id, f.ts, f.ms_played, t.spotify_uri, a.name, e.spotify_uri, sh.name, c.chapter_uri,
+           p.name, co.name, rs.name, re.name, f.content_type, f.shuffle, f.skipped, f.offline, f.incognito_mode
+    FROM stream_facts f
+    LEFT JOIN tracks t ON t.id = f.track_id
+    LEFT JOIN stream_artists a ON a.id = f.artist_id
+    LEFT JOIN episodes e ON e.id = f.episode_id
+    LEFT JOIN podcast_shows sh ON sh.id = f.show_id
+    LEFT JOIN audiobook_chapters c ON c.id = f.chapter_id
+    JOIN platforms p ON p.id = f.platform_id
+    JOIN countries co ON co.id = f.country_id
+    JOIN playback_reasons rs ON rs.id = f.reason_start_id
+    JOIN playback_reasons re ON re.id = f.reason_end_id
+    ORDER BY f.id
+"""
+STREAMS = """
+    SELECT id, ts, ms_played, spotify_track_uri, master_metadata_album_artist_name, spotify_episode_uri,
+           episode_show_name, audiobook_chapter_uri, platform, conn_country, reason_start, reason_end,
+           shuffle, skipped, offline, incognito_mode
+    FROM spotify_streams
+    ORDER BY id
+"""
+
+
+def lookup_names(connection):
+    return {
+        table: dict(connection.execute(text(f"SELECT name, id FROM {table}")).all())
+        for table in ("stream_artists", "podcast_shows", "platforms", "countries", "playback_reasons")
+    }
+
+
+def load(connection, records):
+    prepare_staging_table(connection)
+    copy_to_staging(connection, StreamColumns.from_records(
+        SpotifyStreamRecord.model_validate(record) for record in records
+    ), 0)
+    merge_staging(connection)
+
+
+def test_facts_reference_streams_by_integer_keys(empty_db):
+    with empty_db.begin() as connection:
+        create_year_partitions(connection, "spotify_streams", [2020])
+        load(connection, RECORDS)
+
+        assert refresh_stream_facts(connection, *YEAR_2020) == len(RECORDS)
+        names = lookup_names(connection)
+        facts = connection.execute(text(RESOLVED_FACTS)).all()
+        streams = connection.execute(text(STREAMS)).all()
+        key_types = connection.execute(text(
+            "SELECT DISTINCT data_type FROM information_schema.columns "
+            "WHERE table_schema = 'empty_db' AND table_name = 'stream_facts' AND column_name LIKE '%\\_id'"
+        )).scalars().all()
+
+    assert {table: set(values) for table, values in names.items()} == {
+        "stream_artists": {"Artist", "Other artist"},
+        "podcast_shows": {"Show"},
+        "platforms": {"android", "ios"},
+        "countries": {"NZ", "DE"},
+        "playback_reasons": {"trackdone", "fwdbtn", "clickrow"},
+    }
+    assert set(key_types) == {"integer", "smallint"}
+    # Each fact resolves to the values of its stream, and is classified by the first URI it has
+    assert [tuple(fact[:12]) + tuple(fact[13:]) for fact in facts] == [tuple(stream) for stream in streams]
+    assert [fact.content_type for fact in facts] == [
+        ContentType.MUSIC, ContentType.MUSIC, ContentType.EPISODE, ContentType.AUDIOBOOK, ContentType.OTHER
+    ]
+
+
+def test_refresh_replaces_the_range_and_keeps_lookup_keys(empty_db):
+    with empty_db.begin() as connection:
+        create_year_partitions(connection, "spotify_streams", [2020])
+        load(connection, RECORDS)
+        refresh_stream_facts(connection, *YEAR_2020)
+        names = lookup_names(connection)
+
+        load(connection, [make_record(5, ts="2020-01-02T00:00:00Z", platform="web")])
+        assert refresh_stream_facts(connection, *YEAR_2020) == len(RECORDS) + 1
+        refreshed = lookup_names(connection)
+        fact_count = connection.execute(text("SELECT count(*) FROM stream_facts")).scalar_one()
+
+    assert fact_count == len(RECORDS) + 1
+    # Known names keep their keys, and only the new one is added, right after them
+    assert refreshed["platforms"] == {**names["platforms"], "web": max(names["platforms"].values()) + 1}
+    assert {table: values for table, values in refreshed.items() if table != "platforms"} == {
+        table: values for table, values in names.items() if table != "platforms"
+    }
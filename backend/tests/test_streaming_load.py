@@ -0,0 +1,122 @@
+import json
+from contextlib import nullcontext
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from loaders.streaming_data_loader import SpotifyDataLoader
+from tests.factories import make_record
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    """A loader whose database writes are replaced, so streamed loads run without a database."""
+    loader = SpotifyDataLoader()
+    monkeypatch.setattr(loader.settings.etl, "batch_size", 2)
+    monkeypatch.setattr(loader, "Session", lambda: nullcontext(None))
+    monkeypatch.setattr(loader, "load_stream_data", lambda session, columns: len(columns))
+    monkeypatch.setattr(loader, "save_checkpoint", lambda *args, **kwargs: None)
+    monkeypatch.setattr(loader, "write_quarantine", lambda quarantined: 0)
+    monkeypatch.setattr(loader, "record_ingested_files", lambda entries: None)
+    monkeypatch.setattr(loader, "clear_checkpoints", lambda hashes: None)
+    return loader
+
+
+def test_dimension_rows_are_written_again_after_a_failed_upsert(loader, tmp_path, monkeypatch):
+    uris = ["spotify:track:a", "spotify:track:b"]
+    path = tmp_path / "Streaming_History_Audio_2020.json"
+    path.write_text(json.dumps([make_record(i, spotify_track_uri=uris[i % 2]) for i in range(6)]))
+    upserts = []
+
+    def load_dimension_tables(session, tracks, episodes, audiobook_chapters):
+        upserts.append(sorted(track.spotify_uri for track in tracks))
+        # The first upsert is rolled back
+        return len(upserts) > 1
+    monkeypatch.setattr(loader, "load_dimension_tables", load_dimension_tables)
+
+    stats = loader.load_files_streaming([path], {path: "hash"})
+
+    # The second batch writes the tracks again, the third one finds them committed
+    assert upserts == [uris, uris]
+    assert stats["tracks"] == 2
+    assert stats["total_loaded"] == 6
+
+
+@pytest.fixture
+def db_loader(empty_db, monkeypatch):
+    """A loader writing to the empty test schema in batches of two records."""
+    loader = SpotifyDataLoader()
+    monkeypatch.setattr(loader.settings.etl, "batch_size", 2)
+    loader.engine = empty_db
+    loader.Session = sessionmaker(bind=empty_db)
+    loader.start_load()
+    return loader
+
+
+@pytest.fixture
+def export_file(tmp_path):
+    """Ten records in chronological order, the fourth of them invalid."""
+    records = [make_record(i) for i in range(10)]
+    records[3]["ms_played"] = "not a number"
+    path = tmp_path / "Streaming_History_Audio_2020.json"
+    path.write_text(json.dumps(records))
+    return path
+
+
+def load_state(engine):
+    with engine.connect() as connection:
+        return {
+            "streams": connection.execute(text("SELECT count(*) FROM spotify_streams")).scalar_one(),
+            "checkpoints": connection.execute(text(
+                "SELECT committed_offset, record_count, valid_count FROM ingest_checkpoints"
+            )).all(),
+            "manifest": connection.execute(text("SELECT record_count, valid_count FROM ingest_manifest")).all(),
+        }
+
+
+def fail_third_write(loader, monkeypatch, error=None):
+    """Make the third fact batch written by the loader fail, by raising error or as if its retries ran out."""
+    write_stream_batch = loader._write_stream_batch
+    calls = []
+
+    def write(session, batch):
+        calls.append(1)
+        if len(calls) == 3:
+            if error:
+                raise error
+            return None
+        return write_stream_batch(session, batch)
+    monkeypatch.setattr(loader, "_write_stream_batch", write)
+
+
+def test_interrupted_load_resumes_after_its_checkpoint(db_loader, export_file, empty_db, monkeypatch):
+    file_hashes = {export_file: db_loader.file_content_hash(export_file)}
+    fail_third_write(db_loader, monkeypatch, RuntimeError("connection lost"))
+
+    with pytest.raises(RuntimeError, match="connection lost"):
+        db_loader.load_files_streaming([export_file], file_hashes)
+
+    # Two batches of four records are committed, three of them valid
+    assert load_state(empty_db) == {"streams": 3, "checkpoints": [(4, 4, 3)], "manifest": []}
+
+    stats = db_loader.load_files_streaming([export_file], file_hashes, resume=True)
+
+    assert load_state(empty_db) == {"streams": 9, "checkpoints": [], "manifest": [(10, 9)]}
+    assert (stats["total_loaded"], stats["total_duplicates"]) == (6, 0)
+
+
+def test_batches_after_a_failed_one_wait_for_the_resume(db_loader, export_file, empty_db, monkeypatch):
+    file_hashes = {export_file: db_loader.file_content_hash(export_file)}
+    fail_third_write(db_loader, monkeypatch)
+
+    stats = db_loader.load_files_streaming([export_file], file_hashes)
+
+    # The batches after the failed one are not written, so the checkpoint covers all committed streams
+    assert stats["total_loaded"] == 3
+    assert load_state(empty_db) == {"streams": 3, "checkpoints": [(4, 4, 3)], "manifest": []}
+
+    stats = db_loader.load_files_streaming([export_file], file_hashes, resume=True)
+
+    assert load_state(empty_db) == {"streams": 9, "checkpoints": [], "manifest": [(10, 9)]}
+    assert (stats["total_loaded"], stats["total_duplicates"]) == (6, 0)
@@ -1,9 +1,21 @@
 import { http } from './http/client';
 
 export const basicStatsService = {
-  getStatsOverview(period = null) {
-    const params = period && period !== 'all_time' ? { year: period } : undefined;
-    return http.get('/basicStats/stats/overview', { params, cacheTtlMs: 60000 });
+  async getStatsOverview(period = null) {
+    // Every year comes with one cached request, so switching years needs no round trip
+    const overview = await this.getStatsOverviewByYear();
+    if (!period || period === 'all_time') {
+      return overview.all_time;
+    }
+    const yearOverview = overview.years.find((entry) => String(entry.year) === String(period));
+    if (yearOverview) {
+      return yearOverview;
+    }
+    return http.get('/basicStats/stats/overview', { params: { year: period }, cacheTtlMs: 60000 });
+  },
+
+  getStatsOverviewByYear() {
+    return http.get('/basicStats/stats/overview/by-year', { cacheTtlMs: 60000 });
   },
 
   getAvailableYears() {